@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness: times and measures peak memory of each pipeline stage on synthetic data
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import openpyxl
+
+from near_duplicates import synthetic_names
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+ALL_SCALES = [1000, 10000, 100000, 1000000]
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+
+# A result regresses when it exceeds the baseline by more than these factors;
+# timings are noisy across runs, so they get more slack than memory
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+
+# Timings below this are dominated by noise and never count as regressions
+MIN_COMPARABLE_SECONDS = 0.05
+
+ROWS_PER_WORKBOOK = 50000
+
+CONTENT_SENTENCES = [
+    "{name} is a leading public health organization based in India.",
+    "Welcome to our website.",
+    "The organization works with communities to improve maternal and child health outcomes.",
+    "Click here to subscribe to our newsletter.",
+    "Our mission is to strengthen health systems through research and training.",
+    "Copyright 2025. All rights reserved.",
+    "We focus on tuberculosis, nutrition and sanitation programmes across rural districts.",
+    "Contact us for partnership opportunities.",
+]
+
+# The stand-in web server listens on this many loopback addresses, so the
+# fetcher's per-host limits apply as they would across real sites
+STAND_IN_HOSTS = 32
+
+# Size of each chunk the stand-in server writes for chunked responses
+CHUNK_SIZE = 4096
+
+DOMAINS = ['org', 'org.in', 'in', 'gov.in', 'ac.in', 'com', 'ngo']
+SKIPPED_HOSTS = ['www.linkedin.com', 'www.facebook.com', 'www.naukri.com', 'in.indeed.com']
+
+
+# Synthetic data generators
+
+def synthetic_institutions(count: int) -> List[Dict[str, str]]:
+    return [{'name': name, 'source_file': f"synthetic_{i // ROWS_PER_WORKBOOK:04d}.xlsx"}
+            for i, name in enumerate(synthetic_names(count))]
+
+
+def write_synthetic_workbooks(docs_dir: Path, count: int) -> List[Path]:
+    """Write workbooks shaped like the docs/ batches: a name column among a few others"""
+    docs_dir.mkdir(parents=True, exist_ok=True)
+    names = synthetic_names(count)
+    rng = random.Random(11)
+    paths = []
+    for start in range(0, count, ROWS_PER_WORKBOOK):
+        path = docs_dir / f"synthetic_{start // ROWS_PER_WORKBOOK:04d}.xlsx"
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Employers')
+        sheet.append(['S.No', 'Institution Name', 'Type', 'City', 'Website'])
+        for i, name in enumerate(names[start:start + ROWS_PER_WORKBOOK], start + 1):
+            sheet.append([i, name, rng.choice(['NGO', 'Government', 'Academic']),
+                          rng.choice(['Delhi', 'Pune', 'Patna']), None])
+        workbook.save(path)
+        paths.append(path)
+    return paths
+
+
+def synthetic_content(names: List[str], seed: int = 5) -> List[str]:
+    """Scraped-page text blobs of 5-40 sentences mixing descriptive and boilerplate lines"""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(CONTENT_SENTENCES).format(name=name) for _ in range(rng.randint(5, 40)))
+            for name in names]
+
+
+def synthetic_search_results(names: List[str], seed: int = 9) -> List[List[Dict[str, str]]]:
+    """Search result lists of 3-8 results, with job boards and social sites mixed in"""
+    rng = random.Random(seed)
+    result_lists = []
+    for name in names:
+        slug = ''.join(ch for ch in name.lower() if ch.isalnum())[:20]
+        results = []
+        for position in range(rng.randint(3, 8)):
+            if rng.random() < 0.3:
+                host = rng.choice(SKIPPED_HOSTS)
+            else:
+                host = f"{rng.choice(['www.', 'careers.', ''])}{slug}{position}.{rng.choice(DOMAINS)}"
+            results.append({
+                'url': f"https://{host}/{rng.choice(['', 'about', 'jobs/123'])}",
+                'title': f"{name} - {rng.choice(['Official Website', 'Jobs', 'Profile', 'About Us'])}",
+                'description': rng.choice(['Homepage of the institution', 'Apply now', 'Read more']),
+            })
+        result_lists.append(results)
+    return result_lists
+
+
+def synthetic_pages(names: List[str], seed: int = 13) -> List[bytes]:
+    """Institution home pages: head, navigation, a few content blocks and a footer"""
+    rng = random.Random(seed)
+    pages = []
+    for name, content in zip(names, synthetic_content(names, seed)):
+        paragraphs = ''.join(f"<p>{sentence.strip()}.</p>" for sentence in content.split('.') if sentence.strip())
+        pages.append((
+            f"<!DOCTYPE html><html><head><title>{name}</title>"
+            f"<meta name=\"viewport\" content=\"width=device-width\">"
+            f"<script>window.dataLayer = [];</script><style>body {{ margin: 0 }}</style></head>"
+            f"<body><nav><a href=\"/\">Home</a><a href=\"/about\">About</a></nav>"
+            f"<main><h1>{name}</h1>{paragraphs}</main>"
+            f"<footer>Copyright {rng.randint(2000, 2025)}</footer></body></html>"
+        ).encode('utf-8'))
+    return pages
+
+
+class StandInServer:
+    """Local HTTP/1.1 server standing in for institution websites
+
+    Serves pages by path with keep-alive, ETags (answering If-None-Match with
+    304) and gzip, on STAND_IN_HOSTS loopback addresses from a background thread.
+    Paths in redirects answer 301 to their location, and pages in chunked are
+    sent with chunked transfer encoding. Response statuses are counted in served.
+    """
+
+    def __init__(self, pages: Dict[str, bytes], hosts: int = STAND_IN_HOSTS,
+                 redirects: Optional[Dict[str, str]] = None, chunked: Iterable[str] = ()):
+        self.pages = pages
+        self.redirects = redirects or {}
+        self.chunked = set(chunked)
+        self.served: Counter = Counter()
+        self.hosts = [f"127.0.0.{i}" for i in range(1, hosts + 1)]
+        self.addresses: List[str] = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.servers: List[asyncio.AbstractServer] = []
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    block = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = block.decode('latin-1').split('\r\n')
+                path = lines[0].split(' ')[1]
+                headers = {name.strip().lower(): value.strip()
+                           for name, _, value in (line.partition(':') for line in lines[1:])}
+
+                body = self.pages.get(path)
+                etag = f'"{zlib.crc32(body):08x}"' if body is not None else ''
+                if path in self.redirects:
+                    head = f"HTTP/1.1 301 Moved Permanently\r\nLocation: {self.redirects[path]}\r\nContent-Length: 0"
+                    payload = b''
+                elif body is None:
+                    head, payload = "HTTP/1.1 404 Not Found\r\nContent-Length: 0", b''
+                elif headers.get('if-none-match') == etag:
+                    head, payload = f"HTTP/1.1 304 Not Modified\r\nETag: {etag}", b''
+                else:
+                    payload = body
+                    head = f"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\nETag: {etag}"
+                    if 'gzip' in headers.get('accept-encoding', ''):
+                        payload = gzip.compress(body, compresslevel=1)
+                        head += "\r\nContent-Encoding: gzip"
+                    if path in self.chunked:
+                        head += "\r\nTransfer-Encoding: chunked"
+                        payload = b''.join(b'%x\r\n%s\r\n' % (len(chunk), chunk) for chunk in
+                                           (payload[i:i + CHUNK_SIZE] for i in range(0, len(payload), CHUNK_SIZE)))
+                        payload += b'0\r\n\r\n'
+                    else:
+                        head += f"\r\nContent-Length: {len(payload)}"
+                self.served[int(head.split(' ', 2)[1])] += 1
+                writer.write(f"{head}\r\n\r\n".encode('latin-1') + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def start(self) -> 'StandInServer':
+        self.thread.start()
+        for host in self.hosts:
+            server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self.handle, host, 0), self.loop).result()
+            self.servers.append(server)
+            self.addresses.append(f"{host}:{server.sockets[0].getsockname()[1]}")
+        return self
+
+    def url(self, index: int, path: str) -> str:
+        return f"http://{self.addresses[index % len(self.addresses)]}{path}"
+
+    def stop(self):
+        async def close():
+            for server in self.servers:
+                server.close()
+                await server.wait_closed()
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+# Servers and other resources benchmarks hold until their measurements finish
+teardown = contextlib.ExitStack()
+
+
+# Benchmarks. Each takes the scale and a scratch directory and returns a
+# zero-argument callable; data generation happens outside the measured call.
+
+@contextlib.contextmanager
+def working_directory(path: Path) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def bench_extract_institutions(scale: int, workdir: Path) -> Callable[[], Any]:
+    from extract_institutions import extract_institutions_from_excel
+    write_synthetic_workbooks(workdir / 'docs', scale)
+
+    def run():
+        # force=True skips the Parquet cache so every run parses the workbooks
+        with working_directory(workdir):
+            return extract_institutions_from_excel(force=True)
+    return run
+
+
+def bench_create_institution_entry(scale: int, workdir: Path) -> Callable[[], Any]:
+    from create_institution_data import create_institution_entry
+    institutions = synthetic_institutions(scale)
+    return lambda: [create_institution_entry(inst) for inst in institutions]
+
+
+def bench_extract_description(scale: int, workdir: Path) -> Callable[[], Any]:
+    # scrape_all_institutions and create_institution_data share this implementation
+    from description_extractor import extract_description_from_content
+    names = synthetic_names(scale)
+    contents = synthetic_content(names)
+    return lambda: [extract_description_from_content(content, name) for content, name in zip(contents, names)]
+
+
+def bench_extract_descriptions_batch(scale: int, workdir: Path) -> Callable[[], Any]:
+    from description_extractor import extract_descriptions_batch
+    names = synthetic_names(scale)
+    items = list(zip(synthetic_content(names), names))
+    return lambda: extract_descriptions_batch(items)
+
+
+def bench_extract_website(scale: int, workdir: Path) -> Callable[[], Any]:
+    from scrape_institution_websites import extract_website_from_search_results
+    result_lists = synthetic_search_results(synthetic_names(scale))
+    return lambda: [extract_website_from_search_results(results) for results in result_lists]
+
+
+def bench_update_websites(scale: int, workdir: Path) -> Callable[[], Any]:
+    from update_institutions_with_websites import get_registry, update_institutions_with_websites
+    get_registry()
+    records = [{'companyName': name} for name in synthetic_names(scale)]
+    return lambda: update_institutions_with_websites(records=[dict(record) for record in records])
+
+
+def bench_plan_queries(scale: int, workdir: Path) -> Callable[[], Any]:
+    from query_planner import QueryPlanner, QueryYield, run_planned
+    from scrape_all_institutions import create_search_queries
+    from website_registry import best_website
+    from website_resolver import StubSearchBackend
+    names = synthetic_names(scale)
+    # Every other institution is answered by its second query and the rest by none,
+    # so the planner runs its full rounds
+    results = {create_search_queries(name)[1]: result_list
+               for name, result_list in zip(names[::2], synthetic_search_results(names[::2]))}
+    records = [{'companyName': name} for name in names]
+
+    def run():
+        backend = StubSearchBackend(results, max_batch=50)
+        planner = QueryPlanner(QueryYield(path=None))
+        return run_planned([dict(record) for record in records], backend, best_website,
+                           planner=planner, rate=1e9)
+    return run
+
+
+def bench_institution_record_store(scale: int, workdir: Path) -> Callable[[], Any]:
+    from create_institution_data import create_institution_entry
+    from institution_records import RecordStore
+    institutions = synthetic_institutions(scale)
+    # Entries are built one at a time, so the peak is the store rather than the dicts
+    return lambda: RecordStore(create_institution_entry(inst) for inst in institutions)
+
+
+def bench_query_server(scale: int, workdir: Path) -> Callable[[], Any]:
+    from create_institution_data import create_institution_entry
+    from query_server import Collection, default_specs
+    spec = default_specs()[0]
+    records = [create_institution_entry(inst) for inst in synthetic_institutions(scale)]
+    queries = [' '.join(name.split()[:2]) for name in synthetic_names(100)]
+
+    def run():
+        # A cold start: index the records, then answer searches with facets that no cache has seen
+        collection = Collection(spec, records)
+        return [(collection.search(query, {}, None, 1, 20), collection.facet_counts(query, {}))
+                for query in queries]
+    return run
+
+
+def bench_fetch_pages(scale: int, workdir: Path) -> Callable[[], Any]:
+    from fetch_institution_pages import run_fetch_pages
+    names = synthetic_names(scale)
+    server = StandInServer({f"/site/{i}": page for i, page in enumerate(synthetic_pages(names))}).start()
+    teardown.callback(server.stop)
+    institutions = [{'companyName': name, 'website': server.url(i, f"/site/{i}")} for i, name in enumerate(names)]
+    # Without a response cache every run fetches and parses every page
+    return lambda: run_fetch_pages([dict(inst) for inst in institutions])
+
+
+BENCHMARKS: Dict[str, Callable[[int, Path], Callable[[], Any]]] = {
+    'extract_institutions_from_excel': bench_extract_institutions,
+    'create_institution_entry': bench_create_institution_entry,
+    'extract_description_from_content': bench_extract_description,
+    'extract_descriptions_batch': bench_extract_descriptions_batch,
+    'extract_website_from_search_results': bench_extract_website,
+    'update_institutions_with_websites': bench_update_websites,
+    'plan_queries': bench_plan_queries,
+    'institution_record_store': bench_institution_record_store,
+    'fetch_pages': bench_fetch_pages,
+    'query_server': bench_query_server,
+}
+
+
+def measure(run: Callable[[], Any]) -> Dict[str, float]:
+    """Time one run, then measure peak traced memory in a second run
+
+    tracemalloc slows allocation-heavy code several times over, so the two are
+    kept apart. Memory allocated in worker processes is not traced.
+    """
+    gc.collect()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': round(elapsed, 4), 'peak_bytes': peak}
+
+
+def run_benchmarks(names: List[str], scales: List[int]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name in names:
+        results[name] = {}
+        for scale in scales:
+            workdir = Path(tempfile.mkdtemp(prefix='bench_'))
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run = BENCHMARKS[name](scale, workdir)
+                result = measure(run)
+            finally:
+                teardown.close()
+                shutil.rmtree(workdir, ignore_errors=True)
+            results[name][str(scale)] = result
+            print(f"  {name:<38} {scale:>9,}  {result['seconds']:>9.3f}s  "
+                  f"{result['peak_bytes'] / 2**20:>9.1f} MiB", flush=True)
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+
+def find_regressions(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Compare results present in both runs; returns human-readable regressions"""
+    regressions = []
+    for name, by_scale in current['results'].items():
+        for scale, result in by_scale.items():
+            base = baseline.get('results', {}).get(name, {}).get(scale)
+            if base is None:
+                continue
+            if (result['seconds'] >= MIN_COMPARABLE_SECONDS
+                    and result['seconds'] > base['seconds'] * TIME_TOLERANCE):
+                regressions.append(f"{name} @ {scale}: {result['seconds']:.3f}s vs baseline "
+                                   f"{base['seconds']:.3f}s (>{TIME_TOLERANCE}x)")
+            if result['peak_bytes'] > base['peak_bytes'] * MEMORY_TOLERANCE:
+                regressions.append(f"{name} @ {scale}: {result['peak_bytes'] / 2**20:.1f} MiB vs baseline "
+                                   f"{base['peak_bytes'] / 2**20:.1f} MiB (>{MEMORY_TOLERANCE}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help=f"Record counts to benchmark (default {DEFAULT_SCALES}; up to {ALL_SCALES[-1]:,})")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    print(f"Benchmarking at scales {', '.join(f'{scale:,}' for scale in args.scales)}")
+    current = run_benchmarks(args.only or list(BENCHMARKS), args.scales)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    regressions = find_regressions(current, baseline)
+    if regressions:
+        print(f"\n{len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of fetch_institution_pages against the benchmark's stand-in server:
+ETag revalidation, chunked bodies, redirects and the MAX_BODY_BYTES cap
+"""
+
+import asyncio
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmark_pipeline import StandInServer, synthetic_pages
+from fetch_institution_pages import MAX_BODY_BYTES, HttpClient, HttpError, run_fetch_pages
+from response_cache import ResponseCache
+
+NAME = "Public Health Foundation of India"
+
+# Text placed after the body cap, which the fetcher must never read
+PAST_CAP = "This sentence lies past the body cap."
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def expect(condition: bool, message: str):
+    if not condition:
+        raise CheckFailed(message)
+
+
+def fetch(url: str) -> Tuple[int, Optional[str], str, int]:
+    """GET a URL with a fresh client; returns (status, page text, final url, idle connections left)"""
+    async def run():
+        client = HttpClient()
+        try:
+            status, _, text, final_url = await client.get(url, {})
+            return status, text, final_url, sum(len(idle) for idle in client.pool.idle.values())
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+
+def check_revalidation(server: StandInServer):
+    cache = ResponseCache(':memory:')
+    try:
+        first = [{'companyName': NAME, 'website': server.url(0, '/page')}]
+        stats = run_fetch_pages(first, cache=cache)
+        expect(stats['fetched'] == 1 and stats['described'] == 1, f"first fetch: {stats}")
+
+        second = [{'companyName': NAME, 'website': server.url(0, '/page')}]
+        stats = run_fetch_pages(second, cache=cache)
+        expect(stats['revalidated'] == 1 and server.served[304] == 1, f"revalidation: {stats}")
+        expect(second[0].get('description') == first[0]['description'],
+               "the description from the cached text differs from the fetched one")
+    finally:
+        cache.close()
+
+
+def check_chunked(server: StandInServer):
+    status, text, _, idle = fetch(server.url(0, '/chunked'))
+    expect(status == 200, f"status {status}")
+    expect(text == fetch(server.url(0, '/page'))[1], "chunked text differs from the same page sent whole")
+    expect(idle == 1, "connection not kept after reading the last chunk")
+
+
+def check_redirects(server: StandInServer):
+    status, text, final_url, _ = fetch(server.url(0, '/moved'))
+    expect(status == 200 and text and final_url == server.url(0, '/page'),
+           f"relative redirect ended at {final_url} with {status}")
+
+    status, text, final_url, _ = fetch(server.url(0, '/elsewhere'))
+    expect(status == 200 and text and final_url == server.url(1, '/page'),
+           f"redirect to another host ended at {final_url} with {status}")
+
+    try:
+        fetch(server.url(0, '/loop'))
+    except HttpError:
+        pass
+    else:
+        raise CheckFailed("a redirect loop was followed without error")
+
+
+def check_body_cap(server: StandInServer):
+    status, text, _, idle = fetch(server.url(0, '/large'))
+    expect(status == 200 and text is not None and NAME in text, f"status {status}, text {text!r:.80}")
+    expect(PAST_CAP not in text, "text past MAX_BODY_BYTES was read")
+    # The rest of the body is left unread, so the connection cannot carry another request
+    expect(idle == 0, "connection kept with an unread body")
+
+
+CHECKS: Dict[str, Callable[[StandInServer], None]] = {
+    'revalidation': check_revalidation,
+    'chunked': check_chunked,
+    'redirects': check_redirects,
+    'body_cap': check_body_cap,
+}
+
+
+def main():
+    page = synthetic_pages([NAME])[0]
+    # Script text is skipped by the page parser, so only the byte cap stops the read
+    large = (f"<html><body><h1>{NAME}</h1><script>".encode('utf-8') + b'x' * MAX_BODY_BYTES
+             + f"</script><p>{PAST_CAP}</p></body></html>".encode('utf-8'))
+    server = StandInServer({'/page': page, '/chunked': page, '/large': large}, hosts=2,
+                           redirects={'/moved': '/page', '/loop': '/loop'}, chunked=['/chunked']).start()
+    server.redirects['/elsewhere'] = server.url(1, '/page')
+
+    failures: List[str] = []
+    try:
+        for name, check in CHECKS.items():
+            try:
+                check(server)
+            except CheckFailed as e:
+                failures.append(name)
+                print(f"{name:<14} FAIL  {e}")
+            except Exception as e:
+                failures.append(name)
+                print(f"{name:<14} FAIL  {e!r}")
+            else:
+                print(f"{name:<14} ok")
+    finally:
+        server.stop()
+
+    if failures:
+        sys.exit(f"{len(failures)} fetch check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
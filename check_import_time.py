@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Cold-start import budget: times each script's import in a fresh interpreter with
+`python -X importtime` and fails when one runs over budget or pulls in a heavy dependency
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BUDGET_FILE = Path("import_budget.json")
+
+# Dependencies that must only be imported by the functions that use them
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow')
+
+# Budget recorded by --update, as a multiple of the measured time
+HEADROOM = 2.0
+MIN_BUDGET_MS = 50
+
+# Imports are timed this many times and the fastest is kept, to damp noise from the machine
+DEFAULT_RUNS = 3
+
+PROBE = "import sys, {module}; print(' '.join(sorted(m for m in {heavy!r} if m in sys.modules)))"
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """Cumulative import time of a module in milliseconds, and the heavy modules it loaded"""
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"; the top-level line is unindented
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module and not parts[2].startswith('  ', 1):
+            return int(parts[1]) / 1000, result.stdout.split()
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def measure_best(module: str, runs: int = DEFAULT_RUNS) -> Tuple[float, List[str]]:
+    results = [measure(module) for _ in range(runs)]
+    return min(ms for ms, _ in results), results[0][1]
+
+
+def load_budget(path: Path = BUDGET_FILE) -> Dict[str, int]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['modules']
+
+
+def save_budget(budget: Dict[str, int], path: Path = BUDGET_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'heavy_modules': list(HEAVY_MODULES), 'modules': budget}, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check script import times against the tracked budget")
+    parser.add_argument('modules', nargs='*', help="Modules to check (default: every module in the budget)")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="Imports per module; the fastest counts")
+    parser.add_argument('--budget', type=Path, default=BUDGET_FILE, help="Budget file")
+    parser.add_argument('--update', action='store_true',
+                        help=f"Record {HEADROOM:g}x the measured times as the new budget")
+    args = parser.parse_args()
+
+    budget = load_budget(args.budget) if args.budget.exists() else {}
+    modules = args.modules or list(budget)
+    if not modules:
+        parser.error(f"{args.budget} not found; name the modules to check")
+
+    failures = 0
+    measured: Dict[str, int] = {}
+    print(f"{'module':<36} {'ms':>8} {'budget':>8}")
+    for module in modules:
+        ms, heavy = measure_best(module, args.runs)
+        measured[module] = max(MIN_BUDGET_MS, round(ms * HEADROOM))
+        limit = budget.get(module)
+        problems = []
+        if limit is not None and ms > limit:
+            problems.append("over budget")
+        if heavy:
+            problems.append(f"imports {', '.join(heavy)}")
+        failures += bool(problems)
+        print(f"{module:<36} {ms:>8.1f} {limit if limit is not None else '-':>8}  {'; '.join(problems)}")
+
+    if args.update:
+        save_budget({**budget, **measured}, args.budget)
+        print(f"Budget written to {args.budget}")
+    elif failures:
+        sys.exit(f"{failures} module(s) failed the import budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the institution scripts: `python cli.py <command> [args]`
+
+Commands map to script modules, which are only imported once their command
+is chosen, so `--help` and short commands do not pay for pandas or numpy.
+"""
+
+import runpy
+import sys
+from typing import List, Optional
+
+# Command -> (script module, summary)
+COMMANDS = {
+    'run': ('run_pipeline', "Run the pipeline stages that are out of date"),
+    'extract': ('extract_institutions', "Extract institution names from the Excel workbooks"),
+    'extract-jobs': ('extract_jobs', "Extract job postings from the Excel workbooks"),
+    'scrape-all': ('scrape_all_institutions', "Clean names and build search queries"),
+    'create-data': ('create_institution_data', "Build institution entries for the app"),
+    'scrape-websites': ('scrape_institution_websites', "Resolve institution websites by search"),
+    'update-websites': ('update_institutions_with_websites', "Merge resolved websites into the institutions"),
+    'fetch-pages': ('fetch_institution_pages', "Fetch institution pages for descriptions"),
+    'link-jobs': ('link_jobs', "Link job postings to institutions"),
+    'registry': ('website_registry', "Query and maintain the website registry"),
+    'search-index': ('search_index', "Build the static search index"),
+    'publish': ('publish_institutions', "Publish institution shards for the app"),
+    'serve': ('query_server', "Serve search, facets and lookups over the outputs"),
+    'loadtest': ('query_load', "Measure the query server's latency and throughput"),
+    'records': ('institution_records', "Compare the memory of dict and compact records"),
+    'benchmark': ('benchmark_pipeline', "Benchmark the pipeline's hot paths"),
+    'importtime': ('check_import_time', "Check module import times against the budget"),
+    'check-fetch': ('check_fetch_pages', "Check page fetching against a local stand-in server"),
+}
+
+
+def usage() -> str:
+    width = max(len(command) for command in COMMANDS)
+    lines = ["usage: cli.py <command> [args...]", "", "commands:"]
+    lines += [f"  {command:<{width}}  {summary}" for command, (_, summary) in COMMANDS.items()]
+    lines += ["", "Run `cli.py <command> --help` for a command's options."]
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        sys.exit(f"cli.py: unknown command '{command}'")
+
+    module, _ = COMMANDS[command]
+    # Run the script as __main__ so scripts without a main() behave as when run directly
+    sys.argv = [f"cli.py {command}", *rest]
+    runpy.run_module(module, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Shared description extractor for scraped institution pages
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from instrumentation import timed
+
+# Keywords marking a sentence that introduces the organization; the sentence
+# that follows it is taken as the description
+KEYWORD_PATTERN = re.compile(
+    r'about|mission|vision|who\s+we\s+are'
+    r'|founded|established|created'
+    r'|works?|focuses?|aims?'
+    r'|organization|foundation|institute'
+    r'|dedicated|committed'
+    r'|healthcare|health|public\s+health',
+    re.IGNORECASE
+)
+
+EMPTY_FALLBACK = "{name} is a public health organization working to improve community health and well-being."
+FINAL_FALLBACK = "{name} is a public health organization dedicated to improving health outcomes and community well-being through various programs and initiatives."
+
+# Below this many documents a process pool costs more than it saves
+MIN_PARALLEL_BATCH = 256
+
+
+def iter_sentences(content: str):
+    """Yield (sentence, terminated) pairs split on '.', without copying the whole document"""
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.find('.', start)
+        if end == -1:
+            yield content[start:], False
+            return
+        yield content[start:end], True
+        start = end + 1
+
+
+@timed('extract_description')
+def extract_description_from_content(content: str, institution_name: str) -> str:
+    """Extract a meaningful description from scraped content"""
+    if not content:
+        return EMPTY_FALLBACK.format(name=institution_name)
+
+    fallback: Optional[str] = None
+    after_keyword = False
+
+    for raw, terminated in iter_sentences(content):
+        sentence = ' '.join(raw.split())
+
+        # The sentence right after a keyword sentence is the preferred description
+        if after_keyword and terminated and 50 < len(sentence) + 1 < 500:
+            return sentence + '.'
+
+        if fallback is None and 50 < len(sentence) < 300:
+            fallback = sentence + '.'
+
+        after_keyword = terminated and KEYWORD_PATTERN.search(raw) is not None
+
+    if fallback is not None:
+        return fallback
+
+    return FINAL_FALLBACK.format(name=institution_name)
+
+
+def _extract_pair(item: Tuple[str, str]) -> str:
+    return extract_description_from_content(item[0], item[1])
+
+
+def extract_descriptions_batch(items: Iterable[Tuple[str, str]], workers: Optional[int] = None,
+                               chunksize: int = 64) -> List[str]:
+    """Extract descriptions for (content, institution_name) pairs, fanning large batches out over processes"""
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(items) < MIN_PARALLEL_BATCH:
+        return [_extract_pair(item) for item in items]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_extract_pair, items, chunksize=chunksize))
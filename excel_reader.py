@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Parallel, column-projected workbook reader with a Parquet cache keyed by content hash
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+PARQUET_CACHE_DIR = Path(".cache/xlsx")
+
+# Checked in priority order so that e.g. "Institution" wins over "Programme Name"
+NAME_COLUMN_KEYWORDS = ['institution', 'organization', 'organisation', 'company', 'employer', 'name']
+
+ROW_COLUMNS = ['name', 'source_file']
+
+
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_name_column(headers: List[object]) -> Optional[int]:
+    """Return the index of the institution name column in a header row"""
+    labels = [str(header).lower() if header is not None else '' for header in headers]
+    for keyword in NAME_COLUMN_KEYWORDS:
+        for idx, label in enumerate(labels):
+            if keyword in label:
+                return idx
+    return None
+
+
+def read_workbook(path: Path) -> List[Dict[str, str]]:
+    """Stream every sheet of a workbook, reading only the detected name column"""
+    # openpyxl and pandas are imported where used, so callers that only hash files stay light
+    import openpyxl
+    rows = []
+    seen = set()
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            headers = next(sheet.iter_rows(max_row=1, values_only=True), None)
+            column = find_name_column(list(headers)) if headers else None
+            if column is None:
+                logger.warning("Could not identify institution name column in %s [%s]", path.name, sheet.title)
+                continue
+
+            # Projection: openpyxl only materializes cells in the requested column
+            for (value,) in sheet.iter_rows(min_row=2, min_col=column + 1, max_col=column + 1,
+                                             values_only=True):
+                if value is None:
+                    continue
+                name = str(value).strip()
+                if name and name not in seen:
+                    seen.add(name)
+                    rows.append({'name': name, 'source_file': path.name})
+    finally:
+        workbook.close()
+    return rows
+
+
+def cache_path(sha: str) -> Path:
+    return PARQUET_CACHE_DIR / f"{sha}.parquet"
+
+
+def load_cached_rows(sha: str) -> Optional[List[Dict[str, str]]]:
+    """Return the rows of a previously parsed workbook, or None if not cached"""
+    import pandas as pd
+    path = cache_path(sha)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path).to_dict('records')
+
+
+def save_cached_rows(sha: str, rows: List[Dict[str, str]]):
+    """Cache parsed rows as Parquet under the workbook's content hash"""
+    import pandas as pd
+    PARQUET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path(sha).with_suffix('.tmp')
+    pd.DataFrame(rows, columns=ROW_COLUMNS).to_parquet(tmp, index=False)
+    os.replace(tmp, cache_path(sha))
+
+
+def try_read_workbook(path: Path) -> Optional[List[Dict[str, str]]]:
+    """read_workbook, logging and returning None for a workbook that cannot be read"""
+    try:
+        return read_workbook(path)
+    except Exception as e:
+        logger.error("Error processing %s: %s", path.name, e)
+        return None
+
+
+def read_workbooks(paths: List[Path], workers: Optional[int] = None) -> Dict[Path, List[Dict[str, str]]]:
+    """Parse several workbooks in parallel processes; workbooks that fail to parse are left out"""
+    if not paths:
+        return {}
+    if workers is None:
+        workers = min(len(paths), os.cpu_count() or 1)
+    if workers <= 1 or len(paths) == 1:
+        results = [try_read_workbook(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(try_read_workbook, paths))
+    return {path: rows for path, rows in zip(paths, results) if rows is not None}
@@ -3,82 +3,166 @@
 Script to extract institution data from Excel files in the docs/ directory
 """
 
-import pandas as pd
 import json
-import os
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
 
-def extract_institutions_from_excel():
-    """Extract institutions from all Excel files in docs/ directory"""
+from excel_reader import file_sha256, load_cached_rows, read_workbooks, save_cached_rows
+from instrumentation import METRICS, configure_logging, get_logger
+from near_duplicates import NearDuplicateIndex
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = Path(".cache/extract/manifest.json")
+
+# Institution workbooks; docs/Courses holds programmes and is converted separately
+SOURCE_GLOBS = ["*.xlsx", "categories/*.xlsx"]
+DELTA_FILE = "extracted_institutions_delta.json"
+CLUSTERS_FILE = "extracted_institutions_clusters.json"
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Load the source manifest mapping workbook names to hash, mtime and size"""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest: Dict[str, Dict[str, Any]]):
+    """Write the source manifest"""
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+def workbook_sha256(excel_file: Path, manifest: Dict[str, Dict[str, Any]]) -> str:
+    """Return a workbook's content hash, trusting the manifest when mtime and size match"""
+    stat = excel_file.stat()
+    entry = manifest.get(str(excel_file))
+    
+    # Cheap check first: identical mtime and size means the file is untouched
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry['sha256']
+    
+    sha = file_sha256(excel_file)
+    manifest[str(excel_file)] = {'sha256': sha, 'mtime': stat.st_mtime, 'size': stat.st_size}
+    return sha
+
+def load_workbook_rows(excel_files: List[Path], manifest: Dict[str, Dict[str, Any]], force: bool = False) -> Tuple[Dict[Path, List[Dict[str, str]]], List[Path]]:
+    """Return every workbook's rows, parsing only new or changed ones (in parallel)"""
+    hashes = {excel_file: workbook_sha256(excel_file, manifest) for excel_file in excel_files}
+    
+    rows_by_file = {}
+    to_parse = []
+    for excel_file in excel_files:
+        rows = None if force else load_cached_rows(hashes[excel_file])
+        if rows is None:
+            to_parse.append(excel_file)
+        else:
+            rows_by_file[excel_file] = rows
+    
+    for excel_file in to_parse:
+        logger.info("Processing %s...", excel_file)
+    
+    parsed = read_workbooks(to_parse)
+    for excel_file in to_parse:
+        rows = parsed.get(excel_file)
+        if rows is None:
+            # Unreadable: left out of the manifest so it is retried on the next run
+            METRICS.count('workbooks_failed')
+            manifest.pop(str(excel_file), None)
+            continue
+        logger.info("%s: %d unique institutions", excel_file.name, len(rows))
+        METRICS.count('workbooks_parsed')
+        save_cached_rows(hashes[excel_file], rows)
+        rows_by_file[excel_file] = rows
+    
+    return rows_by_file, list(parsed)
+
+def compute_delta(previous: List[Dict[str, str]], current: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Compare two institution lists by normalized name"""
+    old = {inst['name'].lower().strip(): inst for inst in previous}
+    new = {inst['name'].lower().strip(): inst for inst in current}
+    
+    return {
+        'added': [inst for key, inst in new.items() if key not in old],
+        'removed': [inst for key, inst in old.items() if key not in new],
+        'changed': [inst for key, inst in new.items() if key in old and old[key] != inst]
+    }
+
+def iter_institutions_from_excel(force: bool = False) -> Iterator[Dict[str, str]]:
+    """Yield unique institutions from all Excel files in docs/ directory, one workbook at a time"""
     
     docs_dir = Path("docs")
-    all_institutions = []
     
-    # Get all Excel files in docs directory
-    excel_files = list(docs_dir.glob("*.xlsx"))
+    # Get all Excel files in docs directory and its institution subdirectories
+    excel_files = [path for pattern in SOURCE_GLOBS for path in sorted(docs_dir.glob(pattern))]
     
     print(f"Found {len(excel_files)} Excel files:")
     for file in excel_files:
-        print(f"  - {file.name}")
+        print(f"  - {file.relative_to(docs_dir)}")
+    
+    manifest = load_manifest()
+    
+    # Forget workbooks that have been removed from docs/
+    current_names = {str(file) for file in excel_files}
+    for name in list(manifest):
+        if name not in current_names:
+            del manifest[name]
+    
+    rows_by_file, parsed_files = load_workbook_rows(excel_files, manifest, force)
+    save_manifest(manifest)
+    
+    # Remove exact and near-duplicate names; the first occurrence is kept
+    dedupe_index = NearDuplicateIndex()
+    unique_count = 0
     
     for excel_file in excel_files:
-        print(f"\nProcessing {excel_file.name}...")
-        
-        try:
-            # Read the Excel file
-            df = pd.read_excel(excel_file)
-            
-            print(f"  Columns: {list(df.columns)}")
-            print(f"  Shape: {df.shape}")
-            print(f"  First few rows:")
-            print(df.head())
-            
-            # Try to identify institution name column
-            name_columns = [col for col in df.columns if any(keyword in col.lower() for keyword in ['name', 'institution', 'organization', 'company', 'employer'])]
-            
-            if name_columns:
-                name_col = name_columns[0]
-                print(f"  Using '{name_col}' as institution name column")
-                
-                # Extract unique institution names
-                institutions = df[name_col].dropna().unique()
-                print(f"  Found {len(institutions)} unique institutions")
-                
-                for institution in institutions:
-                    if pd.notna(institution) and str(institution).strip():
-                        all_institutions.append({
-                            'name': str(institution).strip(),
-                            'source_file': excel_file.name
-                        })
-            else:
-                print(f"  Warning: Could not identify institution name column in {excel_file.name}")
-                print(f"  Available columns: {list(df.columns)}")
-                
-        except Exception as e:
-            print(f"  Error processing {excel_file.name}: {e}")
-    
-    # Remove duplicates based on name
-    unique_institutions = []
-    seen_names = set()
-    
-    for inst in all_institutions:
-        name_lower = inst['name'].lower().strip()
-        if name_lower not in seen_names:
-            seen_names.add(name_lower)
-            unique_institutions.append(inst)
-    
-    print(f"\nTotal unique institutions found: {len(unique_institutions)}")
-    
-    # Save to JSON file
+        for inst in rows_by_file.get(excel_file, []):
+            if dedupe_index.add(inst['name']) == len(dedupe_index.names) - 1:
+                unique_count += 1
+                yield inst
+    
+    failed = len(excel_files) - len(rows_by_file)
+    print(f"\nParsed {len(parsed_files)} new or changed workbooks, reused {len(rows_by_file) - len(parsed_files)} from cache"
+          + (f", skipped {failed} that could not be read" if failed else ""))
+    clusters = dedupe_index.clusters()
+    with open(CLUSTERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(clusters, f, indent=2, ensure_ascii=False)
+    
+    print(f"\nTotal unique institutions found: {unique_count}")
+    print(f"Merged {len(dedupe_index.names) - unique_count} duplicate names into {len(clusters)} clusters (saved to {CLUSTERS_FILE})")
+
+def extract_institutions_from_excel(force: bool = False):
+    """Extract institutions from all Excel files in docs/ directory"""
+    
+    unique_institutions = list(iter_institutions_from_excel(force))
+    
     output_file = "extracted_institutions.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_institutions, f, indent=2, ensure_ascii=False)
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            previous_institutions = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous_institutions = []
+    
+    # Emit the delta so downstream stages can process only affected institutions
+    delta = compute_delta(previous_institutions, unique_institutions)
+    with open(DELTA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, indent=2, ensure_ascii=False)
+    
+    print(f"Delta: {len(delta['added'])} added, {len(delta['removed'])} removed, {len(delta['changed'])} changed (saved to {DELTA_FILE})")
     
-    print(f"Saved institutions to {output_file}")
+    # Save to JSON file, unless nothing changed
+    if unique_institutions != previous_institutions:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(unique_institutions, f, indent=2, ensure_ascii=False)
+        print(f"Saved institutions to {output_file}")
+    else:
+        print(f"{output_file} is up to date")
     
     return unique_institutions
 
 if __name__ == "__main__":
+    configure_logging()
     institutions = extract_institutions_from_excel()
     
     print("\nFirst 10 institutions:")
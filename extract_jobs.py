@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Script to merge job postings from every scraped feed into one deduplicated job feed
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from excel_reader import file_sha256
+from instrumentation import METRICS, configure_logging, get_logger
+from near_duplicates import normalize_institution_name
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = Path(".cache/jobs/manifest.json")
+
+# Feeds are read in this order; the first source to post a job keeps its id
+FEED_GLOBS = ["data/*.json", "public/data/*.json"]
+OUTPUT_FILE = "public/data/jobs_merged.json"
+
+# Field names of the frontend's UnifiedJob, mapped from each feed's candidate
+# fields in priority order; the first non-empty value wins
+FIELD_MAP = {
+    'title': ['job_title'],
+    'company': ['company_name'],
+    'location': ['location', 'job_location'],
+    'description': ['description_text', 'description', 'job_summary', 'job_description_formatted'],
+    'postedDate': ['date_posted_parsed', 'job_posted_date', 'date_posted', 'job_posted_time'],
+    'jobType': ['job_type', 'job_employment_type'],
+    'url': ['url'],
+    'applyLink': ['apply_link'],
+    'companyLogo': ['company_logo', 'logo_url'],
+    'salary': ['salary_formatted'],
+    'benefits': ['benefits'],
+    'companyRating': ['company_rating'],
+    'companyReviewsCount': ['company_reviews_count'],
+    'seniorityLevel': ['job_seniority_level', 'level'],
+    'function': ['job_function', 'function'],
+    'industries': ['job_industries', 'sector'],
+    'applicantsCount': ['job_num_applicants'],
+    'closingDate': ['last_date', 'closing_date'],
+}
+
+ID_FIELDS = ['jobid', 'job_posting_id']
+DATE_FIELDS = ['date_posted_parsed', 'job_posted_date']
+
+# Scrapers stringify missing values and Python lists
+MISSING_VALUES = {'', 'None', 'null', 'Not specified', 'Not disclosed', 'N/A'}
+
+CITY_ALIASES = {
+    'bengaluru': 'bangalore', 'gurugram': 'gurgaon', 'bombay': 'mumbai', 'madras': 'chennai',
+    'calcutta': 'kolkata', 'new delhi': 'delhi', 'mysuru': 'mysore', 'trivandrum': 'thiruvananthapuram'
+}
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+def clean_value(value: Any) -> Any:
+    """Turn scraper placeholders into None and stringified lists into lists"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value in MISSING_VALUES:
+            return None
+        if value.startswith('[') and value.endswith(']'):
+            try:
+                return ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                return value
+    return value
+
+def to_number(value: Any, cast: Callable[[Any], Any]) -> Optional[Any]:
+    try:
+        return cast(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def parse_posted_date(value: Any) -> Optional[str]:
+    """Normalize an ISO date or timestamp to 'YYYY-MM-DDTHH:MM:SS', or None if it is relative text"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=None).isoformat(timespec='seconds')
+
+def feed_source(path: Path, record: Dict[str, Any]) -> str:
+    """Name the source of a posting, e.g. 'devnet' for devnet_public_health_jobs_october_2025.json"""
+    return str(record.get('source') or path.stem.split('_')[0]).lower()
+
+def is_job_feed(records: Any) -> bool:
+    """Job feeds are arrays of postings; courses and organization files are skipped"""
+    return (isinstance(records, list) and bool(records) and isinstance(records[0], dict)
+            and 'job_title' in records[0] and any(field in records[0] for field in ID_FIELDS))
+
+def first_value(record: Dict[str, Any], candidates: List[str]) -> Any:
+    """Cleaned value of the first candidate field that is not missing, or None"""
+    return next((clean_value(record[name]) for name in candidates
+                 if clean_value(record.get(name)) is not None), None)
+
+def posting_id(record: Dict[str, Any]) -> str:
+    """The feed's id for a posting, or a hash of its title, company and posting date when it has none"""
+    feed_id = next((record[field] for field in ID_FIELDS if record.get(field)), None)
+    if feed_id is not None:
+        return str(feed_id)
+    METRICS.count('jobs_without_id')
+    parts = [normalize_text(first_value(record, FIELD_MAP[field])) for field in ('title', 'company', 'postedDate')]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def map_posting(record: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Map one feed record onto the unified job schema"""
+    job: Dict[str, Any] = {'id': f"{source}-{posting_id(record)}"}
+    for field, candidates in FIELD_MAP.items():
+        value = first_value(record, candidates)
+        if value is not None:
+            job[field] = value
+
+    for field, cast in (('companyRating', float), ('companyReviewsCount', int), ('applicantsCount', int)):
+        if field in job:
+            job[field] = to_number(job[field], cast)
+
+    # Prefer the machine-readable date; relative text like "18 days ago" stays as posted
+    parsed = next((parse_posted_date(record.get(field)) for field in DATE_FIELDS
+                   if parse_posted_date(record.get(field))), None)
+    if parsed:
+        job['postedDate'] = parsed
+    job['source'] = source
+    job['sources'] = [source]
+    return job
+
+def normalize_text(text: Any) -> str:
+    return ' '.join(WORD_PATTERN.findall(str(text or '').lower()))
+
+def normalize_location(location: Any) -> str:
+    """Reduce a location to its city, e.g. 'Bengaluru, Karnataka' -> 'bangalore'"""
+    city = normalize_text(str(location or '').split(',')[0])
+    return CITY_ALIASES.get(city, city)
+
+def posting_key(job: Dict[str, Any]) -> str:
+    """Hash of the normalized (company, title, location) that identifies a posting across sources"""
+    parts = (normalize_institution_name(job.get('company') or ''), normalize_text(job.get('title')),
+             normalize_location(job.get('location')))
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Load the feed manifest mapping files to content hash and newest posting date"""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def write_json_atomic(path: Path, data: Any, **dump_args):
+    """Write JSON through a temporary file, so a crash never leaves a partial file behind"""
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_args)
+    os.replace(tmp, path)
+
+def save_manifest(manifest: Dict[str, Dict[str, Any]]):
+    """Write the feed manifest"""
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(MANIFEST_FILE, manifest, indent=2, ensure_ascii=False)
+
+def load_previous_feed(output_file: str = OUTPUT_FILE) -> List[Dict[str, Any]]:
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+def iter_new_postings(feed_files: List[Path], manifest: Dict[str, Dict[str, Any]],
+                      force: bool = False) -> Iterator[Dict[str, Any]]:
+    """Stream mapped postings from new or changed feeds, skipping ones at or before each feed's watermark
+
+    Postings without a parseable date are always processed; the deduper drops
+    the ones already merged.
+    """
+    for feed_file in feed_files:
+        sha = file_sha256(feed_file)
+        entry = manifest.get(str(feed_file), {})
+        if not force and entry.get('sha256') == sha:
+            continue
+
+        with open(feed_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if not is_job_feed(records):
+            manifest[str(feed_file)] = {'sha256': sha, 'watermark': None}
+            continue
+
+        watermark = None if force else entry.get('watermark')
+        newest = watermark
+        count = 0
+        for record in records:
+            job = map_posting(record, feed_source(feed_file, record))
+            posted = parse_posted_date(job.get('postedDate'))
+            if posted and watermark and posted <= watermark:
+                continue
+            if posted and (newest is None or posted > newest):
+                newest = posted
+            count += 1
+            yield job
+
+        manifest[str(feed_file)] = {'sha256': sha, 'watermark': newest}
+        METRICS.count('postings', count)
+        logger.info("%s: %d new postings", feed_file, count)
+
+def merge_postings(previous: Iterable[Dict[str, Any]], new: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Dedupe postings by key; duplicates fill in missing fields and record their source"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for job in previous:
+        merged.setdefault(posting_key(job), job)
+
+    added = duplicates = 0
+    for job in new:
+        key = posting_key(job)
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = job
+            added += 1
+            continue
+        if job['id'] == existing['id']:
+            # The same posting read again, e.g. from both data/ and public/data/
+            continue
+        duplicates += 1
+        for field, value in job.items():
+            existing.setdefault(field, value)
+        if job['source'] not in existing['sources']:
+            existing['sources'].append(job['source'])
+    return list(merged.values()), added, duplicates
+
+def iter_jobs(manifest: Dict[str, Dict[str, Any]], force: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield the merged, deduplicated job feed, processing only new postings
+
+    The manifest is updated in place; the caller saves it once the feed is written,
+    so an interrupted run reads the same postings again instead of losing them.
+    """
+    feed_files = [path for pattern in FEED_GLOBS for path in sorted(Path('.').glob(pattern))
+                  if path != Path(OUTPUT_FILE)]
+
+    # Forget feeds that have been removed
+    current_names = {str(path) for path in feed_files}
+    for name in list(manifest):
+        if name not in current_names:
+            del manifest[name]
+
+    previous = [] if force else load_previous_feed()
+    if not previous:
+        # Without the previous output every posting must be merged again
+        manifest.clear()
+
+    logger.info("Scanning %d feed files", len(feed_files))
+    jobs, added, duplicates = merge_postings(previous, iter_new_postings(feed_files, manifest, force))
+    logger.info("Merged feed: %d postings (%d new, %d cross-source duplicates merged)", len(jobs), added, duplicates)
+    yield from jobs
+
+def extract_jobs(force: bool = False) -> List[Dict[str, Any]]:
+    """Merge all job feeds into one compact feed file"""
+    manifest = load_manifest()
+    jobs = list(iter_jobs(manifest, force))
+    # Newest first, as the job board lists them; undated postings go last
+    jobs.sort(key=lambda job: parse_posted_date(job.get('postedDate')) or '', reverse=True)
+
+    if jobs != load_previous_feed():
+        write_json_atomic(Path(OUTPUT_FILE), jobs, ensure_ascii=False, separators=(',', ':'))
+        logger.info("Saved %d postings to %s", len(jobs), OUTPUT_FILE)
+    else:
+        logger.info("%s is up to date", OUTPUT_FILE)
+    # Only now are the manifest's watermarks covered by the feed on disk
+    save_manifest(manifest)
+    return jobs
+
+if __name__ == "__main__":
+    configure_logging()
+    jobs = extract_jobs()
+
+    print("\nLatest 10 postings:")
+    for i, job in enumerate(jobs[:10]):
+        print(f"{i+1}. {job.get('title')} at {job.get('company')} ({', '.join(job['sources'])})")
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Fetch institution websites and extract descriptions from their page text
+"""
+
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import ssl
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from description_extractor import EMPTY_FALLBACK, FINAL_FALLBACK, extract_description_from_content
+from instrumentation import METRICS, configure_logging, get_logger
+from institution_entries import short_description
+from ndjson_stream import write_json_array
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache
+
+logger = get_logger(__name__)
+
+INPUT_FILE = 'institutions_with_websites.json'
+
+USER_AGENT = "PublicHealthJobsBot/1.0 (+institution directory)"
+CONCURRENCY = 64
+PER_HOST_LIMIT = 2
+TIMEOUT = 15.0
+MAX_REDIRECTS = 5
+
+# Bodies are read up to this many decoded bytes; parsing also stops once
+# enough text has been collected for the description extractor
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 20000
+READ_SIZE = 64 * 1024
+
+# Tasks created ahead per concurrency slot, so slots freed by one host can go to the next
+ADMITTED_PER_SLOT = 4
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Elements whose text is never page content
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'title', 'nav', 'footer'}
+
+# Elements that end a run of text; each run becomes its own sentence
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'header', 'aside', 'li', 'ul', 'ol', 'table', 'tr',
+              'td', 'th', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'blockquote', 'dd', 'dt', 'form'}
+
+META_DESCRIPTIONS = {'description', 'og:description', 'twitter:description'}
+
+
+class HttpError(Exception):
+    """Raised for malformed responses, unsupported content and too many redirects"""
+
+
+class PageTextParser(HTMLParser):
+    """Incremental HTML-to-text parser that keeps visible text runs and the meta description"""
+
+    def __init__(self, max_chars: int = MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.skip_depth = 0
+        self.run: List[str] = []
+        self.runs: List[str] = []
+        self.chars = 0
+        self.meta_description: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == 'meta' and self.meta_description is None:
+            values = dict(attrs)
+            if (values.get('name') or values.get('property') or '').lower() in META_DESCRIPTIONS:
+                self.meta_description = ' '.join((values.get('content') or '').split()) or None
+        if tag in BLOCK_TAGS:
+            self.end_run()
+
+    def handle_endtag(self, tag: str):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        if tag in BLOCK_TAGS:
+            self.end_run()
+
+    def handle_data(self, data: str):
+        if not self.skip_depth:
+            self.run.append(data)
+
+    def end_run(self):
+        text = ' '.join(''.join(self.run).split())
+        self.run = []
+        if text:
+            # Terminate headings and menu items so they do not merge into the next sentence
+            self.runs.append(text if text[-1] in '.!?' else text + '.')
+            self.chars += len(text) + 1
+
+    @property
+    def full(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def text(self) -> str:
+        self.end_run()
+        runs = self.runs
+        if self.meta_description:
+            description = self.meta_description
+            runs = [description if description[-1] in '.!?' else description + '.'] + runs
+        return ' '.join(runs)[:self.max_chars]
+
+
+def parse_header_block(block: bytes) -> Tuple[str, int, Dict[str, str]]:
+    """Parse a status line and headers into (version, status, lower-cased headers)"""
+    lines = block.decode('latin-1').split('\r\n')
+    try:
+        version, status = lines[0].split(' ', 2)[:2]
+        status_code = int(status)
+    except ValueError:
+        raise HttpError(f"Malformed status line: {lines[0]!r}")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return version, status_code, headers
+
+
+def content_charset(content_type: str) -> str:
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            charset = value.strip().strip('"\'')
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                break
+    return 'utf-8'
+
+
+class ConnectionPool:
+    """Keep-alive connections per (scheme, host, port), reused across requests"""
+
+    def __init__(self, max_idle_per_host: int = PER_HOST_LIMIT):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle: Dict[Tuple[str, str, int], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = defaultdict(list)
+        self.ssl_context = ssl.create_default_context()
+
+    async def acquire(self, key: Tuple[str, str, int],
+                      fresh: bool = False) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        """Return (reader, writer, reused), preferring an idle connection unless fresh is set"""
+        idle = self.idle[key]
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                METRICS.count('connections_reused')
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        METRICS.count('connections_opened')
+        reader, writer = await asyncio.open_connection(host, port, limit=READ_SIZE,
+                                                       ssl=self.ssl_context if scheme == 'https' else None)
+        return reader, writer, False
+
+    def release(self, key: Tuple[str, str, int], reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                reusable: bool):
+        if reusable and len(self.idle[key]) < self.max_idle_per_host:
+            self.idle[key].append((reader, writer))
+        else:
+            writer.close()
+
+    async def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+async def read_body(reader: asyncio.StreamReader, headers: Dict[str, str],
+                    consume: Callable[[bytes], bool]) -> bool:
+    """Pass the body to consume until it returns False; True if the body was read to its end"""
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        while True:
+            size_line = await reader.readline()
+            try:
+                remaining = int(size_line.split(b';')[0], 16)
+            except ValueError:
+                raise HttpError(f"Malformed chunk size: {size_line!r}")
+            if remaining == 0:
+                # Skip trailers up to the blank line that ends the message
+                while (await reader.readline()).strip():
+                    pass
+                return True
+            while remaining:
+                data = await reader.read(min(remaining, READ_SIZE))
+                if not data:
+                    raise HttpError("Connection closed inside a chunk")
+                remaining -= len(data)
+                if not consume(data):
+                    return False
+            await reader.readexactly(2)
+
+    if 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        while remaining:
+            data = await reader.read(min(remaining, READ_SIZE))
+            if not data:
+                raise HttpError("Connection closed before the end of the body")
+            remaining -= len(data)
+            if not consume(data):
+                return False
+        return True
+
+    # No framing: the body runs to the end of the connection, which cannot be reused
+    while True:
+        data = await reader.read(READ_SIZE)
+        if not data or not consume(data):
+            return False
+
+
+class BodyDecoder:
+    """Undo Content-Encoding and feed the page text parser, stopping at the size or text cap"""
+
+    def __init__(self, headers: Dict[str, str], max_bytes: int = MAX_BODY_BYTES):
+        encoding = headers.get('content-encoding', '').lower()
+        # wbits | 32 accepts both gzip and zlib-wrapped deflate
+        self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32) if encoding in ('gzip', 'deflate') else None
+        self.decoder = codecs.getincrementaldecoder(content_charset(headers.get('content-type', '')))('replace')
+        self.parser = PageTextParser()
+        self.remaining = max_bytes
+        self.truncated = False
+
+    def feed(self, data: bytes) -> bool:
+        if self.decompressor is not None:
+            data = self.decompressor.decompress(data, self.remaining + 1)
+        if len(data) > self.remaining:
+            data = data[:self.remaining]
+            self.truncated = True
+        self.remaining -= len(data)
+        self.parser.feed(self.decoder.decode(data))
+        if self.parser.full:
+            self.truncated = True
+        return not self.truncated
+
+    def text(self) -> str:
+        self.parser.feed(self.decoder.decode(b'', final=True))
+        self.parser.close()
+        return self.parser.text()
+
+
+class HttpClient:
+    """Minimal pooled HTTP/1.1 client that streams GET responses through a BodyDecoder"""
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self.pool = pool or ConnectionPool()
+
+    async def get(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], Optional[str], str]:
+        """Follow redirects and return (status, headers, page text or None, final url)"""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, text = await self.request(url, headers)
+            location = response_headers.get('location')
+            if status in REDIRECT_STATUSES and location:
+                url = urljoin(url, location)
+                continue
+            return status, response_headers, text, url
+        raise HttpError(f"More than {MAX_REDIRECTS} redirects")
+
+    async def request(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], Optional[str]]:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.hostname:
+            raise HttpError(f"Unsupported URL: {url}")
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, host, port)
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        host_header = host if parts.port is None else f"{host}:{port}"
+
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host_header}", f"User-Agent: {USER_AGENT}",
+                 "Accept: text/html,application/xhtml+xml", "Accept-Encoding: gzip, deflate",
+                 "Connection: keep-alive"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        fresh = False
+        while True:
+            reader, writer, reused = await self.pool.acquire(key, fresh)
+            try:
+                writer.write(request)
+                await writer.drain()
+                block = await reader.readuntil(b'\r\n\r\n')
+                break
+            except asyncio.LimitOverrunError:
+                writer.close()
+                raise HttpError("Response headers too large")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                writer.close()
+                # The server may close an idle keep-alive connection at any time; retry once on a new one
+                if not reused:
+                    raise
+                fresh = True
+            except BaseException:
+                writer.close()
+                raise
+
+        reusable = False
+        try:
+            version, status, response_headers = parse_header_block(block[:-4])
+            keep_alive = (version == 'HTTP/1.1'
+                          and response_headers.get('connection', '').lower() != 'close')
+
+            text = None
+            if status in (204, 304) or 100 <= status < 200:
+                complete = True
+            elif status == 200:
+                content_type = response_headers.get('content-type', 'text/html').lower()
+                if not content_type.startswith(HTML_TYPES):
+                    raise HttpError(f"Not an HTML page: {content_type}")
+                decoder = BodyDecoder(response_headers)
+                complete = await read_body(reader, response_headers, decoder.feed)
+                text = decoder.text()
+                METRICS.count('bytes_decoded', MAX_BODY_BYTES - decoder.remaining)
+            else:
+                # Drain small error and redirect bodies so the connection can be reused
+                budget = [READ_SIZE]
+
+                def discard(data: bytes) -> bool:
+                    budget[0] -= len(data)
+                    return budget[0] > 0
+                complete = await read_body(reader, response_headers, discard)
+            reusable = complete and keep_alive
+            return status, response_headers, text
+        finally:
+            self.pool.release(key, reader, writer, reusable)
+
+    async def close(self):
+        await self.pool.close()
+
+
+def conditional_headers(cached: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Revalidation headers for a cached page"""
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+
+def apply_description(inst: Dict[str, Any], description: str) -> bool:
+    """Replace the institution's description with one extracted from its page; False if none was found"""
+    name = inst['companyName']
+    if description in (EMPTY_FALLBACK.format(name=name), FINAL_FALLBACK.format(name=name)):
+        return False
+    inst['description'] = description
+    inst['shortDescription'] = short_description(description)
+    return True
+
+
+async def fetch_pages(institutions: List[Dict[str, Any]], cache: Optional[ResponseCache] = None,
+                      concurrency: int = CONCURRENCY, per_host: int = PER_HOST_LIMIT,
+                      timeout: float = TIMEOUT, client: Optional[HttpClient] = None) -> Dict[str, Any]:
+    """Fetch each institution's website and set its description from the page text
+
+    Pages are revalidated with ETag/Last-Modified when cached; a 304 reuses the
+    cached text. In cache-only mode uncached sites are skipped.
+    """
+    own_client = client is None
+    client = client or HttpClient(ConnectionPool(per_host))
+    # Extraction is CPU-bound, so it runs off the event loop: in worker processes when
+    # there are CPUs to spare, else in the default thread pool
+    loop = asyncio.get_running_loop()
+    workers = os.cpu_count() or 1
+    extractor = ProcessPoolExecutor(workers) if workers > 1 else None
+    overall = asyncio.Semaphore(concurrency)
+    hosts: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host))
+    stats = {'total': 0, 'fetched': 0, 'revalidated': 0, 'cached': 0, 'failed': 0, 'described': 0}
+
+    async def fetch_one(inst: Dict[str, Any]):
+        url = inst['website']
+        cached = cache.get_url(url) if cache is not None else None
+        if cache is not None and cache.offline:
+            text = cached['text'] if cached else None
+            stats['cached' if cached else 'failed'] += 1
+        else:
+            # Wait for the host before taking a global slot, so one slow host cannot hold them all
+            async with hosts[urlsplit(url).hostname or ''], overall:
+                try:
+                    status, headers, text, final_url = await asyncio.wait_for(
+                        client.get(url, conditional_headers(cached)), timeout)
+                except (OSError, EOFError, asyncio.TimeoutError, HttpError, ValueError, zlib.error) as e:
+                    logger.debug("Fetching %s failed: %r", url, e)
+                    METRICS.count('fetch_errors')
+                    stats['failed'] += 1
+                    return
+
+            if status == 304 and cached:
+                stats['revalidated'] += 1
+                text = cached['text']
+                if cache is not None:
+                    cache.set_url(url, cached)
+            elif status == 200 and text is not None:
+                stats['fetched'] += 1
+                if cache is not None:
+                    cache.set_url(url, {'url': final_url, 'etag': headers.get('etag'),
+                                        'last_modified': headers.get('last-modified'), 'text': text})
+            else:
+                logger.debug("Fetching %s returned HTTP %d", url, status)
+                stats['failed'] += 1
+                return
+
+        if text:
+            description = await loop.run_in_executor(
+                extractor, extract_description_from_content, text, inst['companyName'])
+            if apply_description(inst, description):
+                stats['described'] += 1
+
+    targets = [inst for inst in institutions if inst.get('website')]
+    stats['total'] = len(targets)
+    # Only a few tasks per request slot exist at once, so memory stays flat however many sites there are
+    admitted = asyncio.Semaphore(concurrency * ADMITTED_PER_SLOT)
+    pending = set()
+    try:
+        for inst in targets:
+            await admitted.acquire()
+            task = asyncio.ensure_future(fetch_one(inst))
+            task.add_done_callback(lambda _: admitted.release())
+            pending.add(task)
+            for done in [task for task in pending if task.done()]:
+                pending.discard(done)
+                done.result()
+        await asyncio.gather(*pending)
+    finally:
+        if extractor is not None:
+            extractor.shutdown()
+        if own_client:
+            await client.close()
+    return stats
+
+
+def run_fetch_pages(institutions: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """Synchronous wrapper around fetch_pages for use from scripts"""
+    stats = asyncio.run(fetch_pages(institutions, **kwargs))
+    logger.info("Pages: %d fetched, %d revalidated, %d from cache, %d failed of %d; %d descriptions extracted",
+                stats['fetched'], stats['revalidated'], stats['cached'], stats['failed'], stats['total'],
+                stats['described'])
+    return stats
+
+
+def iter_fetched_institutions(records: Iterable[Dict[str, Any]], cache: Optional[ResponseCache] = None,
+                              window: int = 500, **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield institutions with page descriptions applied, keeping at most one window in memory"""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, window))
+        if not chunk:
+            return
+        run_fetch_pages(chunk, cache=cache, **kwargs)
+        yield from chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch institution websites and extract descriptions")
+    parser.add_argument('--input', default=INPUT_FILE, help="Institution JSON array with website URLs")
+    parser.add_argument('--output', default=INPUT_FILE, help="Where to write the updated institutions")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="Path to the response cache")
+    parser.add_argument('--no-cache', action='store_true', help="Fetch every page without revalidation")
+    parser.add_argument('--offline', action='store_true', help="Use cached pages only")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="Maximum requests in flight")
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT, help="Maximum requests per host")
+    args = parser.parse_args()
+    configure_logging()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        institutions = json.load(f)
+
+    cache = None if args.no_cache else ResponseCache(args.cache, offline=args.offline)
+    try:
+        run_fetch_pages(institutions, cache=cache, concurrency=args.concurrency, per_host=args.per_host)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    count = write_json_array(institutions, args.output, ensure_ascii=True)
+    print(f"Saved {count} institutions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
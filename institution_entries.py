@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Institution entry fields and id rule shared by the scripts that build institution records
+"""
+
+from typing import Iterable, Set
+
+from instrumentation import METRICS, get_logger
+
+logger = get_logger(__name__)
+
+ID_PREFIX = 'extracted_'
+NAME_PLACEHOLDER = '{name}'
+SHORT_DESCRIPTION_LENGTH = 100
+SHORT_DESCRIPTION_SUFFIX = '...'
+
+DEFAULT_DESCRIPTION = "{name} is a public health organization working to improve community health and well-being."
+DEFAULT_VISION = "{name} envisions a healthier future for all communities through innovative public health solutions."
+DEFAULT_RATING = 4.0
+DEFAULT_CATEGORY = "Public Health Organization"
+UNKNOWN_SOURCE = 'Unknown'
+
+# Characters dropped from ids; spaces and hyphens become underscores
+ID_STRIP_CHARS = '.,'
+
+
+def institution_id(name: str) -> str:
+    """Id slug of an institution name, e.g. 'St. John's Medical College' -> 'extracted_st_john's_medical_college'"""
+    # ID_STRIP_CHARS unrolled: chained str.replace is several times faster than re.sub
+    # or str.translate on short names, and this runs once per record
+    return ID_PREFIX + name.lower().replace('.', '').replace(',', '').replace(' ', '_').replace('-', '_')
+
+
+def fill_template(template: str, name: str) -> str:
+    """Substitute the name into a template; several times faster than str.format for these short strings"""
+    return template.replace(NAME_PLACEHOLDER, name)
+
+
+def short_description(description: str, length: int = SHORT_DESCRIPTION_LENGTH) -> str:
+    return description[:length] + SHORT_DESCRIPTION_SUFFIX if len(description) > length else description
+
+
+class IdAllocator:
+    """Hands out unique ids; a repeated id gets the first free _2, _3, ... suffix
+
+    Ids handed out earlier, e.g. by an interrupted run, can be passed in as taken.
+    """
+
+    def __init__(self, taken: Iterable[str] = ()):
+        self.seen: Set[str] = set(taken)
+        self.collisions = 0
+
+    def allocate(self, base: str) -> str:
+        candidate, n = base, 1
+        while candidate in self.seen:
+            n += 1
+            candidate = f"{base}_{n}"
+        if n > 1:
+            self.collisions += 1
+            METRICS.count('id_collisions')
+            logger.warning("Id collision: %s renamed to %s", base, candidate)
+        self.seen.add(candidate)
+        return candidate
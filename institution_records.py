@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Memory-compact institution records: slotted objects with interned values and shared name templates
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from institution_entries import NAME_PLACEHOLDER, short_description
+from ndjson_stream import read_records
+
+# Schema of the institution records, in the order the JSON artifacts list them
+FIELDS = ('id', 'companyName', 'shortDescription', 'description', 'vision', 'overallRating',
+          'totalComments', 'comments', 'source', 'category', 'extracted', 'search_queries',
+          'website', 'website_domain', 'openJobs', 'jobIds')
+
+# Fields with few distinct values; equal values share one object across records
+INTERNED_FIELDS = ('overallRating', 'source', 'category')
+
+# Text fields that usually differ between records only by the institution name
+TEMPLATED_FIELDS = ('description', 'vision', 'search_queries')
+
+# Marks a shortDescription that is the truncated description
+DERIVED = object()
+
+
+class NameTemplate:
+    """Text with the institution name replaced by a placeholder, shared by every record it fits"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def render(self, name: str) -> str:
+        return self.text.replace(NAME_PLACEHOLDER, name)
+
+
+def expand(value: Any, record: 'InstitutionRecord') -> Any:
+    """Turn a stored value back into its JSON form"""
+    if isinstance(value, NameTemplate):
+        return value.render(record.companyName)
+    if value is DERIVED:
+        return short_description(record.description)
+    if isinstance(value, tuple):
+        # Lists are stored as tuples, which carry no spare capacity
+        return [expand(item, record) for item in value]
+    return value
+
+
+class LazyField:
+    """Public attribute over a private slot that renders templates and derived values on read"""
+
+    __slots__ = ('slot',)
+
+    def __set_name__(self, owner: type, name: str):
+        self.slot = owner.__dict__['_' + name]
+
+    def __get__(self, record: Optional['InstitutionRecord'], owner: Optional[type] = None) -> Any:
+        if record is None:
+            return self
+        return expand(self.slot.__get__(record, owner), record)
+
+    def __set__(self, record: 'InstitutionRecord', value: Any):
+        self.slot.__set__(record, tuple(value) if isinstance(value, list) else value)
+
+    def __delete__(self, record: 'InstitutionRecord'):
+        self.slot.__delete__(record)
+
+
+class InstitutionRecord:
+    """One institution; a field that is absent from the JSON record is an unset attribute
+
+    Keys outside FIELDS are kept in `extra`. Attributes read back in their
+    JSON form, so list fields return a fresh list: assign to change them.
+    """
+
+    __slots__ = ('id', 'companyName', '_shortDescription', '_description', '_vision', 'overallRating',
+                 'totalComments', '_comments', 'source', 'category', 'extracted', '_search_queries',
+                 'website', 'website_domain', 'openJobs', '_jobIds', 'extra')
+
+    shortDescription = LazyField()
+    description = LazyField()
+    vision = LazyField()
+    comments = LazyField()
+    search_queries = LazyField()
+    jobIds = LazyField()
+
+    def __init__(self):
+        self.extra: Optional[Dict[str, Any]] = None
+
+    def get(self, field: str, default: Any = None) -> Any:
+        if field in FIELDS:
+            return getattr(self, field, default)
+        return (self.extra or {}).get(field, default)
+
+    def __setitem__(self, field: str, value: Any):
+        """Set a field as on the JSON dict, so stages that update dicts also update records"""
+        if field in FIELDS:
+            setattr(self, field, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[field] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record in the current JSON schema: known fields in schema order, then extra keys"""
+        data = {}
+        for field in FIELDS:
+            try:
+                data[field] = getattr(self, field)
+            except AttributeError:
+                pass
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"InstitutionRecord({getattr(self, 'companyName', None)!r})"
+
+
+class RecordStore:
+    """Institution records that share interned values and name templates
+
+    Templates and interned values live as long as the store, so records
+    should be added through it rather than built directly.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()):
+        self.records: List[InstitutionRecord] = []
+        self.templates: Dict[str, NameTemplate] = {}
+        self.interned: Dict[Any, Any] = {}
+        self.extend(records)
+
+    def intern(self, value: Any) -> Any:
+        # Keyed by type too, since 4.0 == 4 and 1 == True
+        return self.interned.setdefault((type(value), value), value)
+
+    def template(self, value: Any, name: str) -> Any:
+        """A shared template for a string containing the name, or the value itself"""
+        if not isinstance(value, str) or not name or name not in value or NAME_PLACEHOLDER in value:
+            return value
+        text = value.replace(name, NAME_PLACEHOLDER)
+        template = self.templates.get(text)
+        if template is None:
+            template = self.templates[text] = NameTemplate(text)
+        return template
+
+    def compact(self, data: Dict[str, Any]) -> InstitutionRecord:
+        """Build a record from its JSON form"""
+        record = InstitutionRecord()
+        name = data.get('companyName')
+        name = name if isinstance(name, str) else ''
+        for field, value in data.items():
+            if field not in FIELDS:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[field] = value
+                continue
+
+            if field in INTERNED_FIELDS and isinstance(value, (str, float)):
+                value = self.intern(value)
+            elif field in TEMPLATED_FIELDS:
+                if isinstance(value, list):
+                    value = [self.template(item, name) for item in value]
+                else:
+                    value = self.template(value, name)
+            elif (field == 'shortDescription' and isinstance(data.get('description'), str)
+                  and value == short_description(data['description'])):
+                value = DERIVED
+            setattr(record, field, value)
+        return record
+
+    def add(self, data: Dict[str, Any]) -> InstitutionRecord:
+        record = self.compact(data)
+        self.records.append(record)
+        return record
+
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        for data in records:
+            self.add(data)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[InstitutionRecord]:
+        return iter(self.records)
+
+    def __getitem__(self, index: int) -> InstitutionRecord:
+        return self.records[index]
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield every record in its JSON form, one at a time"""
+        for record in self.records:
+            yield record.to_dict()
+
+    @classmethod
+    def load(cls, path: str) -> 'RecordStore':
+        """Load a JSON array or NDJSON file; NDJSON is converted without holding every dict at once"""
+        return cls(read_records(path))
+
+    def dump(self, path: str, ensure_ascii: bool = False):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(list(self.iter_dicts()), f, indent=2, ensure_ascii=ensure_ascii)
+
+
+def traced_size(build) -> int:
+    """Bytes still allocated by the object build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of dict and compact institution records")
+    parser.add_argument('path', nargs='?', default='institutions_with_websites.json',
+                        help="Institution JSON array or NDJSON file")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Load the records this many times over, to estimate larger datasets")
+    args = parser.parse_args()
+
+    records = list(read_records(args.path)) * args.repeat
+    payload = json.dumps(records)
+
+    start = time.perf_counter()
+    store = RecordStore(records)
+    to_store = time.perf_counter() - start
+    start = time.perf_counter()
+    dicts = list(store.iter_dicts())
+    to_dicts = time.perf_counter() - start
+    if dicts != records:
+        raise SystemExit("Compact records do not round-trip")
+    del records, dicts, store
+
+    dict_bytes = traced_size(lambda: json.loads(payload))
+    store_bytes = traced_size(lambda: RecordStore(json.loads(payload)))
+    count = len(json.loads(payload))
+    print(f"{count} records from {args.path}")
+    print(f"  dicts:        {dict_bytes:>12,} bytes ({dict_bytes / count:,.0f} per record)")
+    print(f"  record store: {store_bytes:>12,} bytes ({store_bytes / count:,.0f} per record, "
+          f"{dict_bytes / store_bytes:.1f}x smaller)")
+    print(f"  converted to records in {to_store * 1000:.1f} ms and back in {to_dicts * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Shared instrumentation: leveled logging, throttled progress, per-stage metrics and profiling hooks
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_LEVEL_ENV = "PIPELINE_LOG_LEVEL"
+METRICS_FILE = Path(".cache/pipeline/metrics.json")
+PROFILE_DIR = Path(".cache/profiles")
+
+# Stage that counters and timers are attributed to in the current thread or task
+current_stage: contextvars.ContextVar[str] = contextvars.ContextVar('current_stage', default='global')
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+def configure_logging(level: Optional[str] = None):
+    """Configure root logging once; the level defaults to $PIPELINE_LOG_LEVEL or INFO"""
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or 'INFO').upper()
+    logging.basicConfig(level=level, format=LOG_FORMAT, datefmt='%H:%M:%S', force=True)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+class Progress:
+    """Progress counter that logs at most once per interval instead of once per record"""
+
+    def __init__(self, label: str, total: Optional[int] = None, interval: float = 2.0,
+                 logger: Optional[logging.Logger] = None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.logger = logger or get_logger('progress')
+        self.count = 0
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def update(self, n: int = 1):
+        self.count += n
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now: Optional[float] = None):
+        elapsed = (now or time.perf_counter()) - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        done = f"{self.count}/{self.total}" if self.total is not None else str(self.count)
+        self.logger.info("%s: %s (%.1f/s)", self.label, done, rate)
+
+    def close(self):
+        self.report()
+
+
+class Metrics:
+    """Thread-safe per-stage counters and timers, serializable to JSON"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Counter] = {}
+        self.timers: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def count(self, name: str, n: int = 1):
+        """Add to a counter of the current stage"""
+        with self.lock:
+            self.counters.setdefault(current_stage.get(), Counter())[name] += n
+
+    def add_time(self, name: str, seconds: float):
+        with self.lock:
+            timer = self.timers.setdefault(current_stage.get(), {}).setdefault(name, {'calls': 0, 'seconds': 0.0})
+            timer['calls'] += 1
+            timer['seconds'] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Accumulate the time spent in a block under the current stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Attribute metrics recorded in this block to a stage and time it
+
+        Set 'records' on the yielded dict to get a records/s rate.
+        """
+        token = current_stage.set(name)
+        entry: Dict[str, Any] = {'records': None}
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            elapsed = time.perf_counter() - start
+            current_stage.reset(token)
+            entry['seconds'] = round(elapsed, 4)
+            if entry['records'] is not None and elapsed > 0:
+                entry['records_per_second'] = round(entry['records'] / elapsed, 1)
+            with self.lock:
+                self.stages[name] = entry
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            names = sorted(set(self.stages) | set(self.counters) | set(self.timers))
+            return {
+                name: {
+                    **self.stages.get(name, {}),
+                    'counters': dict(self.counters.get(name, {})),
+                    'timers': {timer: {'calls': value['calls'], 'seconds': round(value['seconds'], 4)}
+                               for timer, value in self.timers.get(name, {}).items()},
+                }
+                for name in names
+            }
+
+    def write(self, path: Path = METRICS_FILE) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+METRICS = Metrics()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator that accumulates a function's calls and time under the current stage"""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS.add_time(name, time.perf_counter() - start)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+class SamplingProfiler:
+    """Stdlib sampling profiler for one thread, writing folded stacks for flame graph tools
+
+    Unlike cProfile it does not slow the profiled code, and it can run alongside
+    profilers in other threads.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profile(name: str, mode: Optional[str], out_dir: Path = PROFILE_DIR) -> Iterator[None]:
+    """Profile a block with cProfile ('cprofile') or the sampling profiler ('sample'); None disables
+
+    cProfile output is saved as <name>.prof with a <name>.txt summary of the
+    top functions; sampling output is saved as <name>.folded.
+    """
+    if not mode:
+        yield
+        return
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    logger = get_logger('profile')
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Newer Pythons allow one cProfile at a time; parallel stages fall back to sampling
+            logger.warning("cProfile is busy, sampling %s instead", name)
+            mode = 'sample'
+        else:
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(out_dir / f"{name}.prof")
+                summary = io.StringIO()
+                pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(30)
+                (out_dir / f"{name}.txt").write_text(summary.getvalue(), encoding='utf-8')
+                logger.info("Saved cProfile output for %s to %s", name, out_dir / f"{name}.prof")
+            return
+
+    if mode != 'sample':
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    sampler = SamplingProfiler(threading.get_ident())
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        sampler.write(out_dir / f"{name}.folded")
+        logger.info("Saved %d samples for %s to %s", sum(sampler.samples.values()), name,
+                    out_dir / f"{name}.folded")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Append-only journal of completed records, so interrupted scrape loops can resume
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from instrumentation import get_logger
+from ndjson_stream import PathLike, write_json_array
+
+logger = get_logger(__name__)
+
+JOURNAL_DIR = Path(".cache/journal")
+
+# Records are fsynced once this many are pending or this many seconds have passed
+SYNC_EVERY = 50
+SYNC_INTERVAL = 5.0
+
+
+class Journal:
+    """NDJSON journal of completed records keyed by institution, fsynced in batches
+
+    A record is committed once its batch is synced; a crash loses at most the
+    unsynced batch, and a line torn by the crash is dropped on the next open.
+    """
+
+    def __init__(self, path: PathLike, key: Callable[[Dict[str, Any]], str],
+                 sync_every: int = SYNC_EVERY, sync_interval: float = SYNC_INTERVAL):
+        self.path = Path(path)
+        self.key = key
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.file = None
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Records committed so far, by key; truncates a torn trailing line"""
+        records: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return records
+
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                records[self.key(record)] = record
+                valid_bytes += len(line)
+
+        if valid_bytes < self.path.stat().st_size:
+            logger.warning("Dropping a torn record at the end of %s", self.path)
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return records
+
+    def open(self, resume: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Open for appending; returns the records to skip, which are none unless resuming"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        completed = self.completed() if resume else {}
+        if not resume and self.path.exists():
+            logger.warning("Discarding the journal at %s; pass --resume to keep its records", self.path)
+            self.path.unlink()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.last_sync = time.monotonic()
+        return completed
+
+    def append(self, record: Dict[str, Any]):
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write('\n')
+        self.pending += 1
+        if self.pending >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Commit every appended record to disk"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *exc_info):
+        # Runs on errors and Ctrl-C too, so everything appended so far is kept
+        self.close()
+
+    def compact(self, dest: PathLike, keys: Iterable[str],
+                fallback: Optional[Dict[str, Dict[str, Any]]] = None, ensure_ascii: bool = False) -> int:
+        """Write the journaled records as the final JSON array in key order, then remove the journal
+
+        Keys that were never journaled take their record from fallback, or are left out.
+        """
+        self.close()
+        records = self.completed()
+        fallback = fallback or {}
+        rows = (records.get(key) or fallback.get(key) for key in keys)
+        count = write_json_array((row for row in rows if row is not None), dest, ensure_ascii)
+        self.path.unlink(missing_ok=True)
+        return count
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Link job postings to institutions with a normalized-name and token-block index
+"""
+
+import json
+import math
+import re
+import time
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from near_duplicates import (GENERIC_TOKENS, MIN_DISTINCTIVE_TOKENS, merge_key, normalize_institution_name,
+                             tokens_compatible)
+from website_registry import extract_aliases, name_variants
+
+JOBS_FILE = "public/data/jobs_merged.json"
+INSTITUTIONS_FILE = "institutions_with_websites.json"
+ORGANIZATIONS_FILE = "public/data/organizations.json"
+
+# Company-form words employers add or drop freely ("Medindia4u.com pvt ltd")
+CORPORATE_TOKENS = {'pvt', 'private', 'ltd', 'limited', 'llp', 'inc', 'co', 'corp', 'plc', 'com'}
+
+# Tokens shared by more institutions than this are too common to block on
+MAX_BLOCK_SIZE = 500
+
+# Fuzzy candidates sharing the most tokens are verified first; at most this many
+MAX_CANDIDATES = 20
+MIN_TOKEN_SCORE = 0.6
+
+EMPLOYER_SEPARATOR_PATTERN = re.compile(r'\s+[-–|]\s+')
+
+
+def strip_tokens(key: str, drop: Set[str]) -> str:
+    return ' '.join(token for token in key.split() if token not in drop)
+
+
+def link_key(name: str) -> str:
+    """Normalized blocking key: clean_institution_name's suffix stripping plus company-form words"""
+    return strip_tokens(normalize_institution_name(name), CORPORATE_TOKENS)
+
+
+def exact_key(name: str) -> str:
+    """Key for exact lookups: merge_key over the link key, without company-form words"""
+    return strip_tokens(merge_key(name, link_key(name)), CORPORATE_TOKENS)
+
+
+class InstitutionLinker:
+    """Index of institution names that maps employer names to institution positions"""
+
+    def __init__(self, names: Iterable[str]):
+        self.keys: List[str] = []
+        self.by_key: Dict[str, Optional[int]] = {}
+        self.by_alias: Dict[str, Optional[int]] = {}
+        self.blocks: Dict[str, List[int]] = {}
+        self.cache: Dict[str, Optional[int]] = {}
+
+        for idx, name in enumerate(names):
+            key = link_key(name)
+            self.keys.append(key)
+            if key:
+                self.by_key.setdefault(exact_key(name), idx)
+            for alias in extract_aliases(name):
+                # An alias claimed by two institutions identifies neither
+                alias_key = exact_key(alias)
+                if alias_key and alias_key not in GENERIC_TOKENS and self.by_alias.setdefault(alias_key, idx) != idx:
+                    self.by_alias[alias_key] = None
+            for token in set(key.split()) - GENERIC_TOKENS:
+                self.blocks.setdefault(token, []).append(idx)
+
+        self.idf = {token: math.log(1 + len(self.keys) / len(block)) for token, block in self.blocks.items()}
+
+    def weight(self, tokens: Iterable[str]) -> float:
+        """Sum of inverse document frequencies; tokens no institution has count as rarest"""
+        unseen = math.log(1 + len(self.keys))
+        return sum(self.idf.get(token, unseen) for token in tokens)
+
+    def exact(self, key: str) -> Optional[int]:
+        idx = self.by_key.get(key)
+        return self.by_alias.get(key) if idx is None else idx
+
+    def fuzzy(self, key: str) -> Optional[int]:
+        """Best institution sharing distinctive tokens whose remaining tokens differ only by typos or generic words"""
+        tokens = set(key.split()) - GENERIC_TOKENS
+        if len(tokens) < MIN_DISTINCTIVE_TOKENS:
+            return None
+        shared: Counter = Counter()
+        for token in tokens:
+            block = self.blocks.get(token, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                shared.update(block)
+
+        best, best_score = None, MIN_TOKEN_SCORE
+        for idx, count in shared.most_common(MAX_CANDIDATES):
+            if count < MIN_DISTINCTIVE_TOKENS:
+                break
+            other = set(self.keys[idx].split()) - GENERIC_TOKENS
+            score = self.weight(tokens & other) / self.weight(tokens | other)
+            if score >= best_score and tokens_compatible(key, self.keys[idx]):
+                best, best_score = idx, score
+        return best
+
+    def match(self, company: str) -> Optional[int]:
+        """Position of the institution an employer name refers to, or None"""
+        if company in self.cache:
+            return self.cache[company]
+
+        # Employers are often written "UNICEF - United Nations Children's Fund"
+        variants = [company] + name_variants(company) + EMPLOYER_SEPARATOR_PATTERN.split(company)
+        exact_keys = [key for key in dict.fromkeys(exact_key(variant) for variant in variants)
+                      if key and key not in GENERIC_TOKENS]
+        keys = [key for key in dict.fromkeys(link_key(variant) for variant in variants)
+                if key and key not in GENERIC_TOKENS]
+
+        idx = next((self.exact(key) for key in exact_keys if self.exact(key) is not None), None)
+        if idx is None and keys:
+            idx = self.fuzzy(keys[0])
+        self.cache[company] = idx
+        return idx
+
+
+def is_open(job: Dict[str, Any], today: str) -> bool:
+    """A posting is open unless its closing date has passed"""
+    closing = job.get('closingDate')
+    return not isinstance(closing, str) or closing[:10] >= today
+
+
+def link_jobs(institutions: List[Dict[str, Any]], jobs: Iterable[Dict[str, Any]],
+              name_field: str = 'companyName', today: Optional[str] = None) -> int:
+    """Attach jobIds and the count of still-open ones to each institution in one pass over the jobs
+
+    Institutions may be dicts or the records of an institution_records.RecordStore.
+    Returns the number of jobs linked to an institution.
+    """
+    today = today or date.today().isoformat()
+    linker = InstitutionLinker(inst.get(name_field) or '' for inst in institutions)
+    job_ids: Dict[int, List[str]] = {}
+    open_jobs: Counter = Counter()
+    linked = 0
+
+    for job in jobs:
+        idx = linker.match(job.get('company') or '')
+        if idx is None:
+            continue
+        linked += 1
+        job_ids.setdefault(idx, []).append(job['id'])
+        if is_open(job, today):
+            open_jobs[idx] += 1
+
+    for idx, inst in enumerate(institutions):
+        inst['openJobs'] = open_jobs[idx]
+        inst['jobIds'] = job_ids.get(idx, [])
+    return linked
+
+
+def load_json(path: str) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    jobs = load_json(JOBS_FILE)
+
+    for path, name_field, ensure_ascii in ((INSTITUTIONS_FILE, 'companyName', True),
+                                           (ORGANIZATIONS_FILE, 'name', False)):
+        institutions = load_json(path)
+        start = time.perf_counter()
+        linked = link_jobs(institutions, jobs, name_field)
+        elapsed = time.perf_counter() - start
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(institutions, f, indent=2, ensure_ascii=ensure_ascii)
+
+        with_jobs = sum(1 for inst in institutions if inst['jobIds'])
+        print(f"{path}: linked {linked}/{len(jobs)} postings to {with_jobs} of {len(institutions)} "
+              f"institutions in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Streaming NDJSON readers and writers for pipeline artifacts
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Union
+
+PathLike = Union[str, Path]
+
+
+def done_marker(path: PathLike) -> Path:
+    """Marker file created once a stream has been completely written"""
+    return Path(f"{path}.done")
+
+
+def failed_marker(path: PathLike) -> Path:
+    """Marker file created when the writer of a stream failed"""
+    return Path(f"{path}.failed")
+
+
+def reset_stream(path: PathLike):
+    """Remove a stream and its markers so followers wait for a fresh writer"""
+    for stale in (Path(path), done_marker(path), failed_marker(path)):
+        if stale.exists():
+            stale.unlink()
+
+
+def write_ndjson(path: PathLike, records: Iterable[Dict[str, Any]]) -> int:
+    """Write records one per line, flushing each so followers can consume them immediately"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    reset_stream(path)
+    count = 0
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+                f.flush()
+                count += 1
+    except BaseException:
+        failed_marker(path).touch()
+        raise
+    done_marker(path).touch()
+    return count
+
+
+def read_ndjson(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """Read a complete NDJSON file one record at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def follow_ndjson(path: PathLike, poll_interval: float = 0.05) -> Iterator[Dict[str, Any]]:
+    """Yield records from an NDJSON file while another stage is still writing it"""
+    while not Path(path).exists():
+        if failed_marker(path).exists():
+            raise RuntimeError(f"Upstream writer of {path} failed")
+        time.sleep(poll_interval)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        partial = ''
+        while True:
+            # Check for completion before reading so no trailing records are missed
+            finished = done_marker(path).exists()
+            line = f.readline()
+            if line:
+                partial += line
+                if partial.endswith('\n'):
+                    if partial.strip():
+                        yield json.loads(partial)
+                    partial = ''
+                continue
+            if finished:
+                return
+            if failed_marker(path).exists():
+                raise RuntimeError(f"Upstream writer of {path} failed")
+            time.sleep(poll_interval)
+
+
+def read_records(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """Read records from either an NDJSON file or a JSON array file"""
+    if str(path).endswith('.ndjson'):
+        yield from read_ndjson(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+def write_json_array(records: Iterable[Dict[str, Any]], dest: PathLike, ensure_ascii: bool = False) -> int:
+    """Stream records into the indented JSON array format the frontend expects, replacing dest atomically"""
+    tmp = Path(f"{dest}.tmp")
+    count = 0
+    with open(tmp, 'w', encoding='utf-8') as out:
+        for record in records:
+            # Matches json.dump(records, f, indent=2) byte for byte
+            body = json.dumps(record, indent=2, ensure_ascii=ensure_ascii).replace('\n', '\n  ')
+            out.write(('[\n  ' if count == 0 else ',\n  ') + body)
+            count += 1
+        out.write('\n]' if count else '[]')
+    os.replace(tmp, dest)
+    return count
+
+
+def compact_ndjson(source: PathLike, dest: PathLike, ensure_ascii: bool = False) -> int:
+    """Stream an NDJSON file into the indented JSON array format the frontend expects"""
+    return write_json_array(read_ndjson(source), dest, ensure_ascii)
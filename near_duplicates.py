@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate institution detection using a normalized-key and MinHash blocking index
+"""
+
+import random
+import re
+import time
+import unicodedata
+import zlib
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+
+from scrape_all_institutions import clean_institution_name
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# openpyxl escapes control characters as _xHHHH_; batch4 names carry UTF-8
+# dashes and quotes that went through this and a latin-1 decode
+ESCAPE_PATTERN = re.compile(r'_x([0-9A-Fa-f]{4})_')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+LEADING_ARTICLE_PATTERN = re.compile(r'^the\s+')
+
+# Tokens that may appear on only one side of a duplicate pair
+GENERIC_TOKENS = {'the', 'of', 'for', 'and', 'in', 'india', 'trust', 'foundation', 'society',
+                  'organization', 'organisation', 'institute', 'centre', 'center', 'ngo'}
+
+# Country words an office adds to its organization's name ("UNICEF India"); unlike the other
+# generic words they do not tell two organizations apart
+REGIONAL_TOKENS = {'india'}
+
+# Generic-suffix stripping reduces "CARE India" and "Care Foundation" alike to "care", so keys
+# left with fewer distinctive tokens than this only merge on the full name
+MIN_DISTINCTIVE_TOKENS = 2
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def repair_mojibake(name: str) -> str:
+    """Undo openpyxl escapes and latin-1 mis-decoding, e.g. 'â_x0080__x0093_' -> '–'"""
+    name = ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(1), 16)), name)
+    try:
+        return name.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return name
+
+
+def fold_name(name: str) -> str:
+    """Folded case and accents, no punctuation or leading article; generic suffixes are kept"""
+    name = unicodedata.normalize('NFKD', repair_mojibake(name))
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).lower()
+    name = PUNCTUATION_PATTERN.sub(' ', name)
+    return LEADING_ARTICLE_PATTERN.sub('', ' '.join(name.split()))
+
+
+def normalize_institution_name(name: str) -> str:
+    """Build the blocking key: folded case and accents, no punctuation, article or generic suffixes"""
+    name = fold_name(name)
+
+    # clean_institution_name strips one trailing suffix; repeat for "... Foundation India"
+    while True:
+        cleaned = clean_institution_name(name)
+        if cleaned == name or not cleaned:
+            return name
+        name = cleaned
+
+
+def distinctive_tokens(key: str) -> Set[str]:
+    return set(key.split()) - GENERIC_TOKENS
+
+
+def merge_key(name: str, key: Optional[str] = None) -> str:
+    """Key on which names merge without verification: the normalized key, or the folded
+    full name without country words when the key is too short to tell organizations apart
+    """
+    key = normalize_institution_name(name) if key is None else key
+    if len(distinctive_tokens(key)) >= MIN_DISTINCTIVE_TOKENS:
+        return key
+    return ' '.join(token for token in fold_name(name).split() if token not in REGIONAL_TOKENS)
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a key, padded so short keys still produce shingles"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def tokens_compatible(key_a: str, key_b: str) -> bool:
+    """Check that two similar keys differ only by generic words or small typos
+
+    Trigram similarity alone merges "Bangalore" with "Mangalore" and one state
+    health society with another, so differing tokens must pair up as typos
+    (same first letter, close spelling) or be generic words. Keys with fewer than
+    MIN_DISTINCTIVE_TOKENS distinctive tokens are never compatible; they merge only on merge_key.
+    """
+    if min(len(distinctive_tokens(key_a)), len(distinctive_tokens(key_b))) < MIN_DISTINCTIVE_TOKENS:
+        return False
+    tokens_a, tokens_b = set(key_a.split()), set(key_b.split())
+    only_a = sorted(tokens_a - tokens_b)
+    only_b = sorted(tokens_b - tokens_a)
+
+    unmatched = []
+    for token in only_a:
+        match = next((other for other in only_b if other[0] == token[0]
+                      and SequenceMatcher(None, token, other).ratio() >= 0.8), None)
+        if match is None:
+            unmatched.append(token)
+        else:
+            only_b.remove(match)
+    return all(token in GENERIC_TOKENS for token in unmatched + only_b)
+
+
+class NearDuplicateIndex:
+    """Incremental index that maps each added name to its canonical representative"""
+
+    def __init__(self, threshold: float = 0.8, bands: int = 10, rows: int = 8, seed: int = 1):
+        # numpy is only needed once an index is built, so name normalization stays cheap to import
+        import numpy as np
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        permutations = bands * rows
+        self.a = np.array([rng.randrange(1, MERSENNE_PRIME) for _ in range(permutations)], dtype=np.uint64)
+        self.b = np.array([rng.randrange(0, MERSENNE_PRIME) for _ in range(permutations)], dtype=np.uint64)
+
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        self.shingles: List[Set[str]] = []
+        self.canonical: List[int] = []
+        self.by_key: Dict[str, int] = {}
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def signature(self, shingles: Set[str]) -> 'np.ndarray':
+        """MinHash signature of a shingle set"""
+        import numpy as np
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def band_keys(self, signature: 'np.ndarray') -> Iterator[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, name: str) -> int:
+        """Add a name and return the index of its canonical representative"""
+        idx = len(self.names)
+        key = normalize_institution_name(name)
+        shingles = trigrams(key)
+        self.names.append(name)
+        self.keys.append(key)
+        self.shingles.append(shingles)
+
+        # Exact match is the cheap common case
+        exact = merge_key(name, key)
+        match = self.by_key.get(exact)
+        if match is None:
+            signature = self.signature(shingles)
+            match = self.find_similar(key, shingles, signature)
+            if match is None:
+                self.by_key[exact] = idx
+                self.canonical.append(idx)
+                for band, chunk in self.band_keys(signature):
+                    self.buckets[band].setdefault(chunk, []).append(idx)
+                return idx
+
+        self.canonical.append(self.canonical[match])
+        return self.canonical[match]
+
+    def match(self, name: str) -> Optional[int]:
+        """Return the canonical representative a name would join, without adding it"""
+        key = normalize_institution_name(name)
+        match = self.by_key.get(merge_key(name, key))
+        if match is None:
+            shingles = trigrams(key)
+            match = self.find_similar(key, shingles, self.signature(shingles))
+        return None if match is None else self.canonical[match]
+
+    def find_similar(self, key: str, shingles: Set[str], signature: 'np.ndarray') -> Optional[int]:
+        """Return the most similar indexed representative that passes verification"""
+        candidates = set()
+        for band, chunk in self.band_keys(signature):
+            candidates.update(self.buckets[band].get(chunk, ()))
+
+        best, best_score = None, 0.0
+        for candidate in sorted(candidates):
+            score = jaccard(shingles, self.shingles[candidate])
+            if score >= self.threshold and score > best_score and tokens_compatible(key, self.keys[candidate]):
+                best, best_score = candidate, score
+        return best
+
+    def clusters(self) -> List[Dict[str, object]]:
+        """Return clusters of two or more names with their canonical representative"""
+        members: Dict[int, List[str]] = {}
+        for idx, canonical in enumerate(self.canonical):
+            members.setdefault(canonical, []).append(self.names[idx])
+        return [
+            {'canonical': self.names[canonical], 'members': names}
+            for canonical, names in members.items() if len(names) > 1
+        ]
+
+
+def find_near_duplicates(names: List[str], threshold: float = 0.8) -> List[Dict[str, object]]:
+    """Cluster near-duplicate names; the first occurrence is the canonical representative"""
+    index = NearDuplicateIndex(threshold)
+    for name in names:
+        index.add(name)
+    return index.clusters()
+
+
+def synthetic_names(count: int, seed: int = 7) -> List[str]:
+    """Generate institution names with realistic near-duplicate variants"""
+    rng = random.Random(seed)
+    syllables = ['ka', 'ra', 'sa', 'vi', 'mo', 'na', 'tha', 'shi', 'gu', 'la', 'pa', 'dha', 'ne', 'ro']
+    words = ['Health', 'Rural', 'Community', 'Global', 'Medical', 'Public', 'Welfare', 'Tribal']
+    places = ['Delhi', 'Pune', 'Chennai', 'Kolkata', 'Jaipur', 'Patna', 'Bhopal', 'Shillong']
+    suffixes = ['', ' Trust', ' Foundation', ' Society', ' India']
+
+    names = []
+    while len(names) < count:
+        proper = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title()
+        base = f"{proper} {rng.choice(words)} {rng.choice(words)} {rng.choice(places)}"
+        names.append(base + rng.choice(suffixes))
+        if rng.random() < 0.2:
+            names.append(f"The {base}{rng.choice(suffixes)} – India")
+    return names[:count]
+
+
+def benchmark(count: int = 100000):
+    """Time near-duplicate clustering over synthetic names"""
+    names = synthetic_names(count)
+    start = time.perf_counter()
+    clusters = find_near_duplicates(names)
+    elapsed = time.perf_counter() - start
+    print(f"Clustered {count} names into {len(clusters)} duplicate clusters in {elapsed:.2f}s "
+          f"({count / elapsed:.0f} names/s)")
+
+
+if __name__ == "__main__":
+    benchmark()
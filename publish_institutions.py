@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Publish institution data as compact, paginated shards for the frontend
+
+Shards are named by content hash so they can be cached immutably; only manifest.json
+keeps a fixed name. Each publish also writes a JSON Patch from the previous version,
+so clients holding a cached copy fetch the changes instead of every shard. Only the
+JSON is written; the host compresses responses itself.
+"""
+
+import argparse
+import copy
+import gzip
+import hashlib
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from institution_entries import (ID_PREFIX, ID_STRIP_CHARS, NAME_PLACEHOLDER, institution_id as slug_id,
+                                 short_description)
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+PUBLISH_SOURCE = "institutions_with_websites.json"
+LEGACY_FILE = "public/data/processed_institutions.json"
+PUBLISH_DIR = "public/data/institutions"
+PUBLISH_VERSION = 2
+DEFAULT_PAGE_SIZE = 50
+MANIFEST_FILE = 'manifest.json'
+
+# Patches kept in the manifest; clients further behind reload every shard
+PATCH_HISTORY = 10
+
+# Content-hashed files written by publish_institutions, pruned once unreferenced
+HASHED_PREFIXES = ('page-', 'patch-')
+
+NAME_FIELD = 'companyName'
+
+# A value shared (after substituting the name) by at least this share of
+# records becomes a template in the manifest and is omitted from records
+TEMPLATE_MIN_SHARE = 0.5
+
+# String fields with at most this many distinct values are dictionary encoded
+DICTIONARY_MAX_VALUES = 64
+
+
+def to_template(value: Any, name: str) -> str:
+    """Serialize a value with every occurrence of the institution name replaced by a placeholder"""
+    encoded = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    escaped_name = json.dumps(name, ensure_ascii=False)[1:-1]
+    if not escaped_name or NAME_PLACEHOLDER in encoded:
+        return encoded
+    return encoded.replace(escaped_name, NAME_PLACEHOLDER)
+
+
+def from_template(template: str, name: str) -> Any:
+    return json.loads(template.replace(NAME_PLACEHOLDER, json.dumps(name, ensure_ascii=False)[1:-1]))
+
+
+def institution_id(name: str) -> Optional[str]:
+    """Same id as create_institution_entry, for names the frontend derives identically"""
+    if not name.isascii():
+        return None
+    return slug_id(name)
+
+
+# Fields recomputed by the client from other fields when they match
+DERIVED_FIELDS = {
+    'shortDescription': {'rule': 'truncate', 'from': 'description', 'length': 100, 'suffix': '...'},
+    'id': {'rule': 'slug', 'from': NAME_FIELD, 'prefix': ID_PREFIX, 'strip': ID_STRIP_CHARS},
+}
+
+
+def derive(field: str, record: Dict[str, Any]) -> Optional[Any]:
+    if field == 'shortDescription' and isinstance(record.get('description'), str):
+        return short_description(record['description'])
+    if field == 'id' and isinstance(record.get(NAME_FIELD), str):
+        return institution_id(record[NAME_FIELD])
+    return None
+
+
+def build_codec(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Choose field order, templates and dictionaries from the records"""
+    fields: List[str] = []
+    for record in records:
+        fields.extend(field for field in record if field not in fields)
+
+    templates: Dict[str, str] = {}
+    dictionaries: Dict[str, List[str]] = {}
+    for field in fields:
+        if field == NAME_FIELD or field in DERIVED_FIELDS:
+            continue
+        counts = Counter(to_template(record.get(field), record.get(NAME_FIELD, '')) for record in records)
+        template, count = counts.most_common(1)[0]
+        if count >= TEMPLATE_MIN_SHARE * len(records):
+            templates[field] = template
+
+        if all(isinstance(record.get(field), str) for record in records):
+            values = {record[field] for record in records}
+            if len(values) <= DICTIONARY_MAX_VALUES:
+                dictionaries[field] = sorted(values)
+
+    return {'fields': fields, 'templates': templates, 'dictionaries': dictionaries, 'derived': DERIVED_FIELDS}
+
+
+def encode_record(record: Dict[str, Any], codec: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields a client cannot rebuild from the manifest"""
+    name = record.get(NAME_FIELD, '')
+    encoded: Dict[str, Any] = {}
+    for field in codec['fields']:
+        if field not in record:
+            # Distinguish a missing field from one the client would fill in
+            if field in codec['templates'] or field in codec['derived']:
+                encoded.setdefault('_missing', []).append(field)
+            continue
+
+        value = record[field]
+        if field in codec['derived'] and derive(field, record) == value:
+            continue
+        template = codec['templates'].get(field)
+        if template is not None and from_template(template, name) == value:
+            continue
+        if field in codec['dictionaries']:
+            value = codec['dictionaries'][field].index(value)
+        encoded[field] = value
+    return encoded
+
+
+def decode_record(encoded: Dict[str, Any], codec: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a full record from its compact form"""
+    name = encoded.get(NAME_FIELD, '')
+    missing = set(encoded.get('_missing', []))
+    record: Dict[str, Any] = {}
+    for field in codec['fields']:
+        if field in encoded:
+            value = encoded[field]
+            if field in codec['dictionaries']:
+                value = codec['dictionaries'][field][value]
+            record[field] = value
+        elif field in codec['templates'] and field not in missing:
+            record[field] = from_template(codec['templates'][field], name)
+
+    # Derived fields depend on decoded fields, so fill them in last, in field order
+    for field in codec['fields']:
+        if field in codec['derived'] and field not in encoded and field not in missing:
+            value = derive(field, record)
+            if value is not None:
+                record[field] = value
+    return {field: record[field] for field in codec['fields'] if field in record}
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def encoded_sizes(data: bytes) -> Dict[str, int]:
+    """Raw and gzipped size of a file, the latter estimating what the host sends compressed"""
+    return {'raw': len(data), 'gzip': len(gzip.compress(data, compresslevel=9, mtime=0))}
+
+
+def compact_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def write_hashed(directory: Path, prefix: str, data: bytes) -> Dict[str, Any]:
+    """Write data as <prefix><hash>.json unless that file exists; returns its file name and sizes"""
+    path = directory / f"{prefix}{content_hash(data)}.json"
+    # Same name, same content: an unchanged shard is left untouched
+    if not path.exists():
+        write_atomic(path, data)
+    return {'file': path.name, 'bytes': encoded_sizes(data)}
+
+
+# JSON Patch (RFC 6902) between published versions
+
+def pointer(*tokens: Any) -> str:
+    """JSON Pointer to a nested value"""
+    return ''.join('/' + str(token).replace('~', '~0').replace('/', '~1') for token in tokens)
+
+
+def same_value(a: Any, b: Any) -> bool:
+    # == alone treats 1, 1.0 and True as equal, which JSON does not
+    return type(a) is type(b) and a == b
+
+
+def record_key(record: Dict[str, Any]) -> Any:
+    return record.get('id', record.get(NAME_FIELD))
+
+
+def diff_records(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """Record-level JSON Patch turning old into new, or None when records were reordered or keys repeat
+
+    Records are matched by id: removed records are removed, added ones
+    inserted and changed fields replaced, so a patch is about the size of the changes.
+    """
+    old_keys = [record_key(record) for record in old]
+    new_keys = [record_key(record) for record in new]
+    if len(set(old_keys)) < len(old_keys) or len(set(new_keys)) < len(new_keys):
+        return None
+    old_by_key = dict(zip(old_keys, old))
+    kept = set(new_keys)
+    if [key for key in old_keys if key in kept] != [key for key in new_keys if key in old_by_key]:
+        return None
+
+    # Removals run from the end, so earlier indexes stay valid
+    ops = [{'op': 'remove', 'path': pointer(index)}
+           for index in reversed(range(len(old))) if old_keys[index] not in kept]
+    for index, (key, record) in enumerate(zip(new_keys, new)):
+        previous = old_by_key.get(key)
+        if previous is None:
+            ops.append({'op': 'add', 'path': pointer(index), 'value': record})
+            continue
+        for field, value in record.items():
+            if field not in previous:
+                ops.append({'op': 'add', 'path': pointer(index, field), 'value': value})
+            elif not same_value(previous[field], value):
+                ops.append({'op': 'replace', 'path': pointer(index, field), 'value': value})
+        ops.extend({'op': 'remove', 'path': pointer(index, field)} for field in previous if field not in record)
+    return ops
+
+
+def apply_patch(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    """Apply add, remove and replace operations to a copy of document"""
+    document = copy.deepcopy(document)
+    for op in ops:
+        tokens = [token.replace('~1', '/').replace('~0', '~') for token in op['path'].split('/')[1:]]
+        if not tokens:
+            document = copy.deepcopy(op['value'])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            if op['op'] == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+            elif op['op'] == 'remove':
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op['value'])
+        elif op['op'] == 'remove':
+            del parent[last]
+        else:
+            if op['op'] == 'replace' and last not in parent:
+                raise KeyError(f"Cannot replace missing member {op['path']}")
+            parent[last] = copy.deepcopy(op['value'])
+    return document
+
+
+def load_manifest(publish_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(publish_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_published(publish_dir: Path, manifest: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Decode every record of a published version, or None if a shard is gone"""
+    records = []
+    for page in manifest['pages']:
+        try:
+            with open(publish_dir / page['file'], 'r', encoding='utf-8') as f:
+                records.extend(decode_record(encoded, manifest) for encoded in json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+    return records
+
+
+def next_patches(publish_dir: Path, previous: Optional[Dict[str, Any]], records: List[Dict[str, Any]],
+                 data_version: str) -> List[Dict[str, Any]]:
+    """The manifest's patch chain: the previous chain plus a patch from the previous version"""
+    if previous is None or 'dataVersion' not in previous:
+        return []
+    if previous['dataVersion'] == data_version:
+        return previous.get('patches', [])
+
+    old_records = load_published(publish_dir, previous)
+    ops = diff_records(old_records, records) if old_records is not None else None
+    if ops is None:
+        logger.warning("No patch from %s: its records are gone or were reordered", previous['dataVersion'])
+        return []
+    if apply_patch(old_records, ops) != records:
+        raise ValueError(f"Patch from {previous['dataVersion']} does not reproduce the records")
+
+    patch = write_hashed(publish_dir, 'patch-', compact_json(ops))
+    patch.update({'from': previous['dataVersion'], 'to': data_version, 'ops': len(ops)})
+    return (previous.get('patches', []) + [patch])[-PATCH_HISTORY:]
+
+
+def prune(publish_dir: Path, keep: Iterable[str]) -> int:
+    """Remove content-hashed files no manifest in keep refers to"""
+    kept = set(keep)
+    removed = 0
+    for path in publish_dir.iterdir():
+        if path.name.startswith(HASHED_PREFIXES) and path.name not in kept:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def publish_institutions(records: Iterable[Dict[str, Any]], publish_dir: str = PUBLISH_DIR,
+                         page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """Write content-hashed page shards and a patch from the previous version, then manifest.json
+
+    Every record is checked to decode back to itself, and the patch to
+    reproduce the records, before the manifest is replaced. Shards of the
+    previous version are kept, so clients holding its manifest can still load them.
+    """
+    records = list(records)
+    codec = build_codec(records)
+    encoded = [encode_record(record, codec) for record in records]
+    for record, compact in zip(records, encoded):
+        if decode_record(compact, codec) != record:
+            raise ValueError(f"Compact encoding does not round-trip for {record.get(NAME_FIELD)!r}")
+
+    target = Path(publish_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(target)
+    data_version = content_hash(compact_json(records))
+
+    pages = []
+    for start in range(0, len(encoded), page_size):
+        page = write_hashed(target, 'page-', compact_json(encoded[start:start + page_size]))
+        pages.append({'file': page['file'], 'count': len(encoded[start:start + page_size]), 'bytes': page['bytes']})
+
+    manifest = {
+        'version': PUBLISH_VERSION,
+        'dataVersion': data_version,
+        'count': len(records),
+        'pageSize': page_size,
+        'nameField': NAME_FIELD,
+        'namePlaceholder': NAME_PLACEHOLDER,
+        **codec,
+        'pages': pages,
+        'patches': next_patches(target, previous, records, data_version)
+    }
+    data = compact_json(manifest)
+    manifest['bytes'] = encoded_sizes(data)
+    write_atomic(target / MANIFEST_FILE, data)
+
+    keep = [page['file'] for page in pages] + [patch['file'] for patch in manifest['patches']]
+    if previous is not None:
+        keep += [page['file'] for page in previous.get('pages', [])]
+    prune(target, keep)
+    return manifest
+
+
+def print_report(manifest: Dict[str, Any], legacy_bytes: Optional[int]):
+    encodings = ['raw', 'gzip']
+    first_page = {enc: manifest['bytes'][enc] + manifest['pages'][0]['bytes'][enc]
+                  for enc in encodings} if manifest['pages'] else {}
+    total = {enc: manifest['bytes'][enc] + sum(page['bytes'][enc] for page in manifest['pages'])
+             for enc in encodings}
+
+    print(f"Published {manifest['count']} institutions in {len(manifest['pages'])} pages to {PUBLISH_DIR}"
+          f" as version {manifest['dataVersion']}")
+    if legacy_bytes:
+        print(f"  legacy JSON:       {legacy_bytes:>9,} bytes")
+    for enc in encodings:
+        line = f"  {enc + ' all pages:':<18} {total[enc]:>9,} bytes"
+        if first_page:
+            line += f"   first page: {first_page[enc]:>7,} bytes"
+            if legacy_bytes:
+                line += f" ({first_page[enc] / legacy_bytes:.1%} of legacy)"
+        print(line)
+    latest = manifest['patches'][-1] if manifest['patches'] else None
+    if latest is not None and latest['to'] == manifest['dataVersion']:
+        print(f"  patch from {latest['from']}: {latest['ops']} operations, "
+              f"{latest['bytes']['gzip']:,} bytes gzipped ({len(manifest['patches'])} patches kept)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish compact institution shards for the frontend")
+    parser.add_argument('--source', default=PUBLISH_SOURCE, help="Institution JSON array to publish")
+    parser.add_argument('--out', default=PUBLISH_DIR, help="Output directory for the manifest and pages")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help="Institutions per page")
+    args = parser.parse_args()
+
+    with open(args.source, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    manifest = publish_institutions(records, args.out, args.page_size)
+    legacy = Path(LEGACY_FILE)
+    print_report(manifest, legacy.stat().st_size if legacy.exists() else None)
+
+
+if __name__ == "__main__":
+    main()
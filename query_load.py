@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Load generator for query_server.py: replays a mix of searches, facet counts and lookups
+over keep-alive connections and reports throughput and latency percentiles
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from search_index import tokenize
+
+DEFAULT_URL = 'http://127.0.0.1:8787'
+DEFAULT_CONNECTIONS = 16
+DEFAULT_DURATION = 10.0
+
+# Share of requests of each kind; the rest are plain list pages
+MIX = {'search': 0.5, 'facets': 0.2, 'lookup': 0.2}
+
+# Records sampled from each collection to draw search terms and ids from
+SAMPLE_SIZE = 200
+
+PERCENTILES = [50, 90, 99]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection to the server"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def get(self, target: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        if self.writer is None or self.writer.is_closing():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = {'Host': f"{self.host}:{self.port}", 'Accept-Encoding': 'gzip', **(headers or {})}
+        lines = [f"GET {target} HTTP/1.1", *(f"{name}: {value}" for name, value in headers.items())]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        block = await self.reader.readuntil(b'\r\n\r\n')
+        head = block[:-4].decode('latin-1').split('\r\n')
+        status = int(head[0].split(' ')[1])
+        response_headers = {}
+        for line in head[1:]:
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        return status, response_headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def build_workload(connection: Connection, seed: int) -> List[str]:
+    """Request targets drawn from a sample of each collection's records"""
+    status, _, body = await connection.get('/healthz')
+    if status != 200:
+        raise SystemExit(f"Server health check failed with {status}")
+    collections = list(json.loads(body)['counts'])
+
+    rng = random.Random(seed)
+    targets: List[str] = []
+    for name in collections:
+        status, headers, body = await connection.get(f'/{name}?pageSize={SAMPLE_SIZE}',
+                                                     {'Accept-Encoding': 'identity'})
+        records = json.loads(body)['results'] if status == 200 and 'content-encoding' not in headers else []
+        if not records:
+            continue
+        ids = [str(record['id']) for record in records if record.get('id') is not None]
+        terms = [token for record in records
+                 for field in ('companyName', 'name', 'title') if isinstance(record.get(field), str)
+                 for token in tokenize(record[field]) if len(token) > 2]
+        for _ in range(250):
+            kind = rng.random()
+            if kind < MIX['search'] and terms:
+                # Whole words and the partial words typed while searching
+                term = rng.choice(terms)
+                term = term[:rng.randint(3, len(term))]
+                targets.append(f'/{name}?q={quote(term)}&page=1')
+            elif kind < MIX['search'] + MIX['facets'] and terms:
+                targets.append(f'/{name}/facets?q={quote(rng.choice(terms))}')
+            elif kind < MIX['search'] + MIX['facets'] + MIX['lookup'] and ids:
+                targets.append(f'/{name}/{quote(rng.choice(ids), safe="")}')
+            else:
+                targets.append(f'/{name}?page={rng.randint(1, 5)}')
+    rng.shuffle(targets)
+    return targets
+
+
+async def run_load(url: str, connections: int, duration: float, revalidate: float, seed: int) -> Dict[str, Any]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    setup = Connection(host, port)
+    targets = await build_workload(setup, seed)
+    setup.close()
+    if not targets:
+        raise SystemExit("The server has no records to query")
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    received = [0]
+    etags: Dict[str, str] = {}
+    deadline = time.perf_counter() + duration
+
+    async def client(number: int):
+        rng = random.Random(seed + number)
+        connection = Connection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                target = rng.choice(targets)
+                # Revalidate a share of repeat requests, as a browser holding the response would
+                headers = {'If-None-Match': etags[target]} if target in etags and rng.random() < revalidate else {}
+                start = time.perf_counter()
+                try:
+                    status, response_headers, body = await connection.get(target, headers)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                    errors[type(e).__name__] += 1
+                    connection.close()
+                    connection = Connection(host, port)
+                    continue
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+                received[0] += len(body)
+                if 'etag' in response_headers:
+                    etags[target] = response_headers['etag']
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': dict(errors),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'bytes_received': received[0],
+        'latency_ms': {**{f"p{pct}": round(percentile(latencies, pct) * 1000, 3) for pct in PERCENTILES},
+                       'max': round(latencies[-1] * 1000, 3) if latencies else 0.0},
+    }
+
+
+async def run_against_local_server(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start a query server on a free port in this process and load it"""
+    from query_server import QueryServer, default_specs
+    server = QueryServer(default_specs(), reload_interval=None)
+    port = await server.start('127.0.0.1', 0)
+    try:
+        return await run_load(f'http://127.0.0.1:{port}', args.connections, args.duration,
+                              args.revalidate, args.seed)
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure query server latency and throughput")
+    parser.add_argument('--url', default=DEFAULT_URL, help="Server to load")
+    parser.add_argument('--serve', action='store_true',
+                        help="Start a server on the default artifacts in this process instead of using --url; "
+                             "client and server then share one CPU")
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS, help="Concurrent connections")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    parser.add_argument('--revalidate', type=float, default=0.5,
+                        help="Share of repeat requests sent with If-None-Match")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.serve:
+        report = asyncio.run(run_against_local_server(args))
+    else:
+        report = asyncio.run(run_load(args.url, args.connections, args.duration, args.revalidate, args.seed))
+
+    latency = report['latency_ms']
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s over {args.connections} connections: "
+          f"{report['requests_per_second']} req/s")
+    print("  latency ms: " + ', '.join(f"{name} {value}" for name, value in latency.items()))
+    print(f"  statuses: {report['statuses']}, errors: {report['errors'] or 'none'}, "
+          f"{report['bytes_received'] / 1024:.0f} KB received")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Search query planner: dedupes queries across institutions, orders them by historical
+yield, sends them in batches and stops searching an institution once it is resolved
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from institution_entries import NAME_PLACEHOLDER
+from instrumentation import METRICS, get_logger
+from response_cache import normalize_query
+from scrape_all_institutions import STORED_QUERIES, clean_institution_name, create_search_queries
+from website_resolver import SearchBackend, TokenBucket, search_batch_with_retry
+
+logger = get_logger(__name__)
+
+QUERY_YIELD_FILE = Path(".cache/query_yield.json")
+
+# Queries tried per institution before it is given up as not found
+DEFAULT_MAX_QUERIES = STORED_QUERIES
+
+# Query outcomes the planner remembers; the least recently used are forgotten first
+ANSWER_CACHE_SIZE = 50000
+
+
+def query_template(query: str, clean_name: str) -> str:
+    """The query with the institution's name replaced by a placeholder, so yields pool across institutions"""
+    return query.replace(clean_name, NAME_PLACEHOLDER) if clean_name else query
+
+
+class QueryYield:
+    """How often each query template found a website, kept between runs"""
+
+    def __init__(self, path: Optional[Path] = QUERY_YIELD_FILE):
+        self.path = Path(path) if path is not None else None
+        self.counts: Dict[str, Dict[str, int]] = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.counts = json.load(f)
+
+    def score(self, template: str) -> float:
+        """Smoothed hit rate, so an untried template starts at 0.5 and a few misses do not bury it"""
+        counts = self.counts.get(template, {})
+        return (counts.get('hits', 0) + 1) / (counts.get('sent', 0) + 2)
+
+    def record(self, template: str, hit: bool):
+        counts = self.counts.setdefault(template, {'sent': 0, 'hits': 0})
+        counts['sent'] += 1
+        counts['hits'] += int(hit)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.counts, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class QueryPlanner:
+    """Chooses and orders each institution's queries, and remembers recent query outcomes
+
+    Outcomes are the website extracted from a query's results, or None, keyed by
+    normalized query, so a query shared by several institutions, or asked again in
+    a later window, is only searched once. Raw results are not kept, and at most
+    max_answers outcomes are, so a planner shared across windows stays small.
+    """
+
+    def __init__(self, yields: Optional[QueryYield] = None, max_queries: int = DEFAULT_MAX_QUERIES,
+                 max_answers: int = ANSWER_CACHE_SIZE):
+        self.yields = yields if yields is not None else QueryYield()
+        self.max_queries = max_queries
+        self.max_answers = max_answers
+        self.answers: 'OrderedDict[str, Optional[str]]' = OrderedDict()
+
+    def remember(self, key: str, website: Optional[str]):
+        self.answers[key] = website
+        self.answers.move_to_end(key)
+        if len(self.answers) > self.max_answers:
+            self.answers.popitem(last=False)
+
+    def plan(self, inst: Dict[str, Any], scores: Optional[Dict[str, float]] = None) -> List[Tuple[str, str]]:
+        """(query, template) pairs to try for an institution, best historical yield first
+
+        scores memoizes template scores across calls while the yields are unchanged.
+        """
+        scores = scores if scores is not None else {}
+        name = inst['companyName']
+        clean_name = clean_institution_name(name)
+        candidates: Dict[str, Tuple[str, str]] = {}
+        # Stored queries come first, so they win ties; the remaining templates are fallbacks
+        for query in [*inst.get('search_queries', []), *create_search_queries(name)]:
+            key = normalize_query(query)
+            if key not in candidates:
+                template = query_template(query, clean_name)
+                if template not in scores:
+                    scores[template] = self.yields.score(template)
+                candidates[key] = (query, template)
+        ranked = sorted(candidates.values(), key=lambda candidate: -scores[candidate[1]])
+        return ranked[:self.max_queries]
+
+
+async def resolve_planned(institutions: List[Dict[str, Any]], backend: SearchBackend,
+                          extract_website: Callable[[List[Dict]], Optional[str]],
+                          planner: Optional[QueryPlanner] = None,
+                          concurrency: int = 10, rate: float = 5.0, retries: int = 3,
+                          base_delay: float = 0.5, max_delay: float = 10.0,
+                          close_backend: bool = True,
+                          on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+                          ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Resolve websites in rounds, preserving input order
+
+    Each round sends the next planned query of every unresolved institution,
+    deduplicated and batched; an institution drops out as soon as a query
+    yields a website, or once its plan is exhausted. A query that fails moves
+    the institution on to its next one; it counts as failed only if its plan runs
+    out without a website after a failure. on_result is called as each
+    institution finishes; institutions that failed are not passed to it.
+    """
+    planner = planner if planner is not None else QueryPlanner()
+    bucket = TokenBucket(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {'total': len(institutions), 'resolved': 0, 'not_found': 0, 'failed': 0,
+             'queries_planned': 0, 'queries': 0, 'batches': 0}
+    # Last search error of each institution, by position
+    errors: Dict[int, Exception] = {}
+    batch_size = max(1, backend.max_batch)
+
+    def finish(inst: Dict[str, Any], website: Optional[str]):
+        inst['website'] = website
+        stats['resolved' if website else 'not_found'] += 1
+        if on_result is not None:
+            on_result(inst)
+
+    async def send(batch: List[Tuple[str, str]]):
+        async with semaphore:
+            try:
+                results = await search_batch_with_retry(backend, [query for _, query in batch], bucket,
+                                                        retries, base_delay, max_delay)
+            except Exception as e:
+                logger.warning("Error searching %d queries, e.g. '%s': %s", len(batch), batch[0][1], e)
+                METRICS.count('search_errors')
+                for key, _ in batch:
+                    failed[key] = e
+                return
+        for (key, _), answer in zip(batch, results):
+            website = extract_website(answer) if answer else None
+            found[key] = website
+            planner.remember(key, website)
+
+    scores: Dict[str, float] = {}
+    plans = [planner.plan(inst, scores) for inst in institutions]
+    stats['queries_planned'] = sum(len(plan) for plan in plans)
+    pending = []
+    for index, plan in enumerate(plans):
+        if plan:
+            pending.append(index)
+        else:
+            finish(institutions[index], None)
+
+    start = time.perf_counter()
+    try:
+        round_number = 0
+        while pending:
+            keys = [normalize_query(plans[index][round_number][0]) for index in pending]
+            # This round's outcomes, kept apart from the planner's memo, which may evict them
+            found: Dict[str, Optional[str]] = {}
+            failed: Dict[str, Exception] = {}
+            wanted: Dict[str, str] = {}
+            for index, key in zip(pending, keys):
+                if key in found or key in failed:
+                    continue
+                if key in planner.answers:
+                    found[key] = planner.answers[key]
+                    planner.answers.move_to_end(key)
+                else:
+                    wanted.setdefault(key, plans[index][round_number][0])
+            items = list(wanted.items())
+            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+            stats['queries'] += len(items)
+            stats['batches'] += len(batches)
+            await asyncio.gather(*(send(batch) for batch in batches))
+
+            still_pending = []
+            for index, key in zip(pending, keys):
+                inst = institutions[index]
+                website = None
+                if key in failed:
+                    errors[index] = failed[key]
+                else:
+                    website = found[key]
+                    # Only answers sent for this round are evidence; memo hits were counted when sent
+                    if wanted.pop(key, None) is not None:
+                        planner.yields.record(plans[index][round_number][1], website is not None)
+                if not website and round_number + 1 < len(plans[index]):
+                    still_pending.append(index)
+                elif not website and index in errors:
+                    logger.warning("Error resolving %s: %s", inst['companyName'], errors[index])
+                    stats['failed'] += 1
+                    inst['website'] = None
+                else:
+                    finish(inst, website)
+            pending = still_pending
+            round_number += 1
+    finally:
+        planner.yields.save()
+        if close_backend:
+            await backend.close()
+    elapsed = time.perf_counter() - start
+
+    stats['queries_per_institution'] = round(stats['queries'] / len(institutions), 2) if institutions else 0.0
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['institutions_per_second'] = round(len(institutions) / elapsed, 2) if elapsed > 0 else 0.0
+    return institutions, stats
+
+
+def run_planned(institutions: List[Dict[str, Any]], backend: SearchBackend,
+                extract_website: Callable[[List[Dict]], Optional[str]],
+                **kwargs) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Synchronous wrapper around resolve_planned for use from scripts"""
+    return asyncio.run(resolve_planned(institutions, backend, extract_website, **kwargs))
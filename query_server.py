@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Local query server over the institution, organization and job artifacts, with in-memory indexes
+
+Serves paginated search, facet counts and lookup by id as JSON over HTTP/1.1,
+answers If-None-Match with 304, and reloads the artifacts when they are rewritten.
+"""
+
+import argparse
+import asyncio
+import bisect
+import gzip
+import hashlib
+import json
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from instrumentation import configure_logging, get_logger
+from search_index import tokenize
+
+logger = get_logger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+
+INSTITUTIONS_FILE = "processed_institutions.json"
+ORGANIZATIONS_FILE = "public/data/organizations.json"
+JOBS_FILE = "public/data/jobs_merged.json"
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+# Artifacts are polled this often; a change is loaded once it has held still for a whole interval,
+# so a file that is still being written is not read half way
+RELOAD_INTERVAL = 1.0
+
+# Rendered responses kept per data version, keyed by request target
+RESPONSE_CACHE_SIZE = 1024
+
+# Prefix matches kept per collection, keyed by query token
+PREFIX_CACHE_SIZE = 4096
+
+# Matches are sorted by rank when there are fewer than 1/this of the documents,
+# and picked off the precomputed order otherwise
+SORT_MATCHES_RATIO = 8
+
+# Bodies at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+MAX_HEADER_BYTES = 16 * 1024
+
+# Reports live counters, so it is neither cached nor given an ETag
+HEALTH_PATH = '/healthz'
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 431: 'Request Header Fields Too Large'}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def sort_text(value: Any) -> str:
+    return value.casefold() if isinstance(value, str) else ''
+
+
+class CollectionSpec:
+    """How one artifact is indexed: its fields, facets and sort orders"""
+
+    def __init__(self, name: str, path: str, name_field: str, text_fields: List[str],
+                 facets: Dict[str, str], sorts: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], bool]],
+                 default_sort: str):
+        self.name = name
+        self.path = path
+        self.name_field = name_field
+        self.text_fields = text_fields
+        # Query parameter -> record field
+        self.facets = facets
+        # Sort name -> (key, descending)
+        self.sorts = sorts
+        self.default_sort = default_sort
+
+
+def default_specs(institutions: str = INSTITUTIONS_FILE, organizations: str = ORGANIZATIONS_FILE,
+                  jobs: str = JOBS_FILE) -> List[CollectionSpec]:
+    return [
+        # shortDescription is a prefix of description, so it is not indexed separately
+        CollectionSpec('institutions', institutions, 'companyName', ['companyName', 'description'],
+                       {'category': 'category', 'source': 'source'},
+                       {'name': (lambda r: sort_text(r.get('companyName')), False),
+                        'rating': (lambda r: r.get('overallRating') or 0, True),
+                        'openJobs': (lambda r: r.get('openJobs') or 0, True)},
+                       'name'),
+        CollectionSpec('organizations', organizations, 'name', ['name', 'description'],
+                       {'category': 'category'},
+                       {'name': (lambda r: sort_text(r.get('name')), False)},
+                       'name'),
+        CollectionSpec('jobs', jobs, 'title', ['title', 'company', 'location', 'description'],
+                       {'source': 'sources', 'jobType': 'jobType', 'location': 'location'},
+                       # ISO dates sort as text; postings without one go last
+                       {'date': (lambda r: r.get('postedDate') or '', True),
+                        'title': (lambda r: sort_text(r.get('title')), False),
+                        'company': (lambda r: sort_text(r.get('company')), False)},
+                       'date'),
+    ]
+
+
+class Collection:
+    """Records of one artifact with token, name, facet and sort indexes
+
+    Documents are positions in `records`. Every sort order is precomputed, so a
+    page is read off an order by keeping the documents that match.
+    """
+
+    def __init__(self, spec: CollectionSpec, records: List[Dict[str, Any]]):
+        self.spec = spec
+        self.records = records
+        self.by_id: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = {}
+        self.name_tokens: Dict[str, Set[int]] = {}
+        self.facets: Dict[str, Dict[str, List[int]]] = {param: {} for param in spec.facets}
+        # Facet values of each document, to count small match sets without scanning every posting list
+        self.doc_values: Dict[str, List[Tuple[str, ...]]] = {param: [] for param in spec.facets}
+
+        for doc, record in enumerate(records):
+            if record.get('id') is not None:
+                self.by_id.setdefault(str(record['id']), doc)
+            name = record.get(spec.name_field)
+            name_tokens = set(tokenize(name if isinstance(name, str) else ''))
+            tokens = set(name_tokens)
+            for field in spec.text_fields:
+                value = record.get(field)
+                if field != spec.name_field and isinstance(value, str):
+                    tokens.update(tokenize(value))
+            for token in tokens:
+                postings.setdefault(token, []).append(doc)
+            for token in name_tokens:
+                self.name_tokens.setdefault(token, set()).add(doc)
+            for param, field in spec.facets.items():
+                values = record.get(field)
+                values = tuple(str(value) for value in (values if isinstance(values, list) else [values])
+                               if value is not None and value != '')
+                self.doc_values[param].append(values)
+                for value in values:
+                    self.facets[param].setdefault(value, []).append(doc)
+
+        # Sorted vocabulary, so a prefix's tokens are one contiguous bisect range
+        self.vocabulary = sorted(postings)
+        self.postings = [postings[token] for token in self.vocabulary]
+        self.orders = {name: sorted(range(len(records)), key=lambda doc: key(records[doc]), reverse=descending)
+                       for name, (key, descending) in spec.sorts.items()}
+        # Position of each document in each order, so a few matches are sorted without walking the order
+        self.ranks: Dict[str, List[int]] = {}
+        for name, order in self.orders.items():
+            rank = [0] * len(order)
+            for position, doc in enumerate(order):
+                rank[doc] = position
+            self.ranks[name] = rank
+        self.prefixes: 'OrderedDict[str, Tuple[Set[int], Set[int]]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def prefix_matches(self, prefix: str) -> Tuple[Set[int], Set[int]]:
+        """Documents with a word starting with prefix, and those with such a word in the name"""
+        cached = self.prefixes.get(prefix)
+        if cached is not None:
+            self.prefixes.move_to_end(prefix)
+            return cached
+        docs: Set[int] = set()
+        names: Set[int] = set()
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        for position in range(start, len(self.vocabulary)):
+            token = self.vocabulary[position]
+            if not token.startswith(prefix):
+                break
+            docs.update(self.postings[position])
+            names.update(self.name_tokens.get(token, ()))
+        self.prefixes[prefix] = (docs, names)
+        if len(self.prefixes) > PREFIX_CACHE_SIZE:
+            self.prefixes.popitem(last=False)
+        return docs, names
+
+    def text_matches(self, query: str) -> Tuple[Optional[Set[int]], Set[int]]:
+        """Documents where every query token prefixes a word, and those matching by name; None for no query"""
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not tokens:
+            return None, set()
+        docs: Optional[Set[int]] = None
+        names: Optional[Set[int]] = None
+        for token in tokens:
+            matches, name_matches = self.prefix_matches(token)
+            docs = set(matches) if docs is None else docs & matches
+            names = set(name_matches) if names is None else names & name_matches
+            if not docs:
+                return set(), set()
+        return docs, names & docs
+
+    def facet_matches(self, filters: Dict[str, List[str]], skip: Optional[str] = None) -> Optional[Set[int]]:
+        """Documents passing every facet filter but skip's; values of one facet are alternatives"""
+        docs: Optional[Set[int]] = None
+        for param, values in filters.items():
+            if param == skip:
+                continue
+            index = self.facets[param]
+            matches = {doc for value in values for doc in index.get(value, ())}
+            docs = matches if docs is None else docs & matches
+        return docs
+
+    def search(self, query: str, filters: Dict[str, List[str]], sort: Optional[str],
+               page: int, page_size: int) -> Dict[str, Any]:
+        text, names = self.text_matches(query)
+        facet = self.facet_matches(filters)
+        docs = intersect(text, facet)
+
+        order = self.orders[sort or self.spec.default_sort]
+        if docs is None:
+            total = len(order)
+            selected = order[(page - 1) * page_size:page * page_size]
+        else:
+            total = len(docs)
+            if len(docs) * SORT_MATCHES_RATIO < len(order):
+                ranked = sorted(docs, key=self.ranks[sort or self.spec.default_sort].__getitem__)
+            else:
+                ranked = [doc for doc in order if doc in docs]
+            if sort is None and text is not None:
+                # Relevance: name matches first, each group in the default order
+                ranked = [doc for doc in ranked if doc in names] + [doc for doc in ranked if doc not in names]
+            selected = ranked[(page - 1) * page_size:page * page_size]
+        return {'total': total, 'page': page, 'pageSize': page_size,
+                'results': [self.records[doc] for doc in selected]}
+
+    def facet_counts(self, query: str, filters: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Counts per facet value among the matches, ignoring that facet's own filter
+
+        so the counts show what selecting another value of the facet would return.
+        """
+        text, _ = self.text_matches(query)
+        counts: Dict[str, Dict[str, int]] = {}
+        for param, index in self.facets.items():
+            docs = intersect(text, self.facet_matches(filters, skip=param))
+            if docs is None:
+                values = {value: len(postings) for value, postings in index.items()}
+            else:
+                doc_values = self.doc_values[param]
+                values = Counter(value for doc in docs for value in doc_values[doc])
+            counts[param] = dict(sorted(((value, n) for value, n in values.items() if n),
+                                        key=lambda item: (-item[1], item[0])))
+        total = intersect(text, self.facet_matches(filters))
+        return {'total': len(self.records) if total is None else len(total), 'facets': counts}
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.by_id.get(record_id)
+        return self.records[doc] if doc is not None else None
+
+
+def intersect(a: Optional[Set[int]], b: Optional[Set[int]]) -> Optional[Set[int]]:
+    """Intersection where None stands for every document"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b if len(a) <= len(b) else b & a
+
+
+class Snapshot:
+    """Every collection loaded from one version of the artifacts"""
+
+    def __init__(self, collections: Dict[str, Collection], version: str, signature: Tuple):
+        self.collections = collections
+        self.version = version
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.etag = f'"{version}"'
+
+
+def file_signature(specs: Iterable[CollectionSpec]) -> Tuple:
+    """(path, mtime, size) of every artifact; changes when one is rewritten"""
+    signature = []
+    for spec in specs:
+        try:
+            stat = Path(spec.path).stat()
+            signature.append((spec.path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((spec.path, None, None))
+    return tuple(signature)
+
+
+def load_snapshot(specs: List[CollectionSpec]) -> Snapshot:
+    """Read and index every artifact; raises ValueError on a partly written file"""
+    signature = file_signature(specs)
+    digest = hashlib.sha256()
+    collections = {}
+    for spec in specs:
+        try:
+            data = Path(spec.path).read_bytes()
+        except FileNotFoundError:
+            logger.warning("%s not found; serving no %s", spec.path, spec.name)
+            data = b'[]'
+        digest.update(hashlib.sha256(data).digest())
+        records = json.loads(data)
+        if not isinstance(records, list):
+            raise ValueError(f"{spec.path} is not a JSON array")
+        start = time.perf_counter()
+        collections[spec.name] = Collection(spec, records)
+        logger.info("Indexed %d %s from %s in %.1f ms", len(records), spec.name, spec.path,
+                    (time.perf_counter() - start) * 1000)
+    return Snapshot(collections, digest.hexdigest()[:16], signature)
+
+
+def parse_query(collection: Collection, params: Dict[str, str]) -> Tuple[str, Dict[str, List[str]]]:
+    filters = {}
+    for param in collection.spec.facets:
+        if params.get(param):
+            filters[param] = [value for value in params[param].split(',') if value]
+    return params.get('q', ''), filters
+
+
+def parse_int(params: Dict[str, str], name: str, default: int, low: int, high: Optional[int] = None) -> int:
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise BadRequest(f"{name} must be between {low} and {high}" if high else f"{name} must be at least {low}")
+    return value
+
+
+class QueryServer:
+    """HTTP/1.1 front end over the current snapshot, which a background task swaps on reload
+
+    Every response is a function of the request target and the data version, so
+    the version doubles as the ETag of successful responses and rendered bodies
+    are cached until the next reload. A 304 is only sent where the response would be a 200.
+    """
+
+    def __init__(self, specs: List[CollectionSpec], reload_interval: Optional[float] = RELOAD_INTERVAL):
+        self.specs = specs
+        self.reload_interval = reload_interval
+        self.snapshot = load_snapshot(specs)
+        self.responses: 'OrderedDict[str, Tuple[int, bytes, Optional[bytes]]]' = OrderedDict()
+        self.stats = {'requests': 0, 'notModified': 0, 'cacheHits': 0, 'reloads': 0}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.watcher: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> int:
+        """Listen and start watching the artifacts; returns the bound port"""
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        if self.reload_interval:
+            self.watcher = asyncio.create_task(self.watch())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def watch(self):
+        seen = failed = self.snapshot.signature
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            signature = await asyncio.to_thread(file_signature, self.specs)
+            if signature != seen:
+                # Still changing; wait for it to settle
+                seen = signature
+                continue
+            if signature in (self.snapshot.signature, failed):
+                continue
+            try:
+                snapshot = await asyncio.to_thread(load_snapshot, self.specs)
+            except ValueError as e:
+                # Not retried until the artifacts change again
+                logger.warning("Reload failed, still serving version %s: %s", self.snapshot.version, e)
+                failed = signature
+                continue
+            if snapshot.version == self.snapshot.version:
+                # Rewritten with the same content: keep the ETags clients already hold
+                self.snapshot.signature = snapshot.signature
+                continue
+            self.snapshot = snapshot
+            self.responses.clear()
+            self.stats['reloads'] += 1
+            logger.info("Reloaded data version %s", snapshot.version)
+
+    def route(self, snapshot: Snapshot, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        parts = [unquote(part) for part in path.split('/') if part]
+        if path == HEALTH_PATH:
+            return 200, {'status': 'ok', 'version': snapshot.version, 'loadedAt': snapshot.loaded_at,
+                         'counts': {name: len(c) for name, c in snapshot.collections.items()}, **self.stats}
+        if not parts or parts[0] not in snapshot.collections:
+            return 404, {'error': f"Unknown path {path}"}
+        collection = snapshot.collections[parts[0]]
+        if len(parts) == 1:
+            query, filters = parse_query(collection, params)
+            sort = params.get('sort') or None
+            if sort is not None and sort not in collection.orders:
+                raise BadRequest(f"sort must be one of {', '.join(collection.orders)}")
+            page = parse_int(params, 'page', 1, 1)
+            page_size = parse_int(params, 'pageSize', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+            return 200, collection.search(query, filters, sort, page, page_size)
+        if len(parts) == 2 and parts[1] == 'facets':
+            query, filters = parse_query(collection, params)
+            return 200, collection.facet_counts(query, filters)
+        if len(parts) == 2:
+            record = collection.get(parts[1])
+            if record is None:
+                return 404, {'error': f"No {parts[0]} record {parts[1]}"}
+            return 200, record
+        return 404, {'error': f"Unknown path {path}"}
+
+    def render(self, snapshot: Snapshot, target: str) -> Tuple[int, bytes, Optional[bytes]]:
+        """(status, body, gzipped body or None) for a request target, cached per data version"""
+        cached = self.responses.get(target)
+        if cached is not None:
+            self.responses.move_to_end(target)
+            self.stats['cacheHits'] += 1
+            return cached
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        try:
+            status, payload = self.route(snapshot, url.path, params)
+        except BadRequest as e:
+            status, payload = 400, {'error': str(e)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = gzip.compress(body, compresslevel=1) if len(body) >= GZIP_MIN_BYTES else None
+        response = (status, body, compressed)
+        if status == 200 and url.path != HEALTH_PATH and snapshot is self.snapshot:
+            self.responses[target] = response
+            if len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+        return response
+
+    def respond(self, method: str, target: str, headers: Dict[str, str]) -> bytes:
+        self.stats['requests'] += 1
+        snapshot = self.snapshot
+        lines = ["Content-Type: application/json; charset=utf-8"]
+        if method not in ('GET', 'HEAD'):
+            status, body = 405, b'{"error":"Only GET and HEAD are supported"}'
+            lines.append("Allow: GET, HEAD")
+        else:
+            status, body, compressed = self.render(snapshot, target)
+            # Only data responses carry the version ETag; errors and the live health check never match it
+            if status == 200 and urlsplit(target).path != HEALTH_PATH:
+                if_none_match = headers.get('if-none-match', '')
+                if if_none_match == '*' or snapshot.etag in (tag.strip() for tag in if_none_match.split(',')):
+                    self.stats['notModified'] += 1
+                    return (f"HTTP/1.1 304 Not Modified\r\nETag: {snapshot.etag}\r\n"
+                            "Cache-Control: no-cache\r\n\r\n").encode('latin-1')
+                lines += [f"ETag: {snapshot.etag}", "Cache-Control: no-cache"]
+            if compressed is not None:
+                lines.append("Vary: Accept-Encoding")
+                if 'gzip' in headers.get('accept-encoding', ''):
+                    body = compressed
+                    lines.append("Content-Encoding: gzip")
+        lines.append(f"Content-Length: {len(body)}")
+        head = f"HTTP/1.1 {status} {REASONS[status]}\r\n" + '\r\n'.join(lines) + '\r\n\r\n'
+        return head.encode('latin-1') + (body if method != 'HEAD' else b'')
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    block = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n"
+                                 b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                    return
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = block[:-4].decode('latin-1').split('\r\n')
+                request = lines[0].split(' ')
+                if len(request) != 3:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    return
+                method, target, version = request
+                headers: Dict[str, str] = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                # Discard any request body so the next request on the connection parses
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                writer.write(self.respond(method, target, headers))
+                await writer.drain()
+                connection = headers.get('connection', '').lower()
+                if connection == 'close' or (version != 'HTTP/1.1' and connection != 'keep-alive'):
+                    return
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+
+async def serve(specs: List[CollectionSpec], host: str, port: int, reload_interval: Optional[float]):
+    server = QueryServer(specs, reload_interval)
+    port = await server.start(host, port)
+    counts = ', '.join(f"{len(c)} {name}" for name, c in server.snapshot.collections.items())
+    print(f"Serving {counts} (version {server.snapshot.version}) on http://{host}:{port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve search, facets and lookups over the pipeline outputs")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--institutions', default=INSTITUTIONS_FILE)
+    parser.add_argument('--organizations', default=ORGANIZATIONS_FILE)
+    parser.add_argument('--jobs', default=JOBS_FILE)
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between checks for rewritten artifacts; 0 disables reloading")
+    args = parser.parse_args()
+
+    configure_logging()
+    specs = default_specs(args.institutions, args.organizations, args.jobs)
+    try:
+        asyncio.run(serve(specs, args.host, args.port, args.reload_interval or None))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
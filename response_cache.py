@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite cache for search and scrape responses
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from instrumentation import METRICS
+from website_resolver import SearchBackend
+
+DEFAULT_CACHE_PATH = ".cache/responses.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 3600
+
+# Writes are committed in batches of this many, and on close
+COMMIT_EVERY = 100
+
+
+class CacheMiss(Exception):
+    """Raised in cache-only mode when a response is not cached"""
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share an entry"""
+    # str.split() splits on the same whitespace as \s+ and drops the ends, without the regex engine
+    return ' '.join(query.split()).lower()
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL: lowercase host, drop fragment and default port, sort params"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    host = (parts.hostname or '').lower()
+    if parts.port and not (scheme, parts.port) in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def cache_key(namespace: str, normalized: str) -> str:
+    """Content-address an entry by hashing its namespace and normalized key"""
+    return hashlib.sha256(f"{namespace}\x00{normalized}".encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-entry TTL and LRU byte budget"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttl: Optional[float] = DEFAULT_TTL, offline: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Hits only move entries up the LRU order, so their timestamps are written in batches
+        self.touched: Dict[str, float] = {}
+        self.uncommitted = 0
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                source_key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                expires REAL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (last_access)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires)')
+        self.conn.commit()
+        # Kept up to date by set() and evict(), so a store does not sum the table
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def get(self, namespace: str, normalized: str, record: bool = True) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        key = cache_key(namespace, normalized)
+        now = time.time()
+        row = self.conn.execute('SELECT value, expires, size FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            if row is not None:
+                self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self.touched.pop(key, None)
+                self.total_bytes -= row[2]
+                self.uncommitted += 1
+            if record:
+                self.misses += 1
+                METRICS.count('cache_misses')
+            return None
+
+        self.touched[key] = now
+        if record:
+            self.hits += 1
+            METRICS.count('cache_hits')
+        return json.loads(row[0])
+
+    def set(self, namespace: str, normalized: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, evicting LRU entries once over the byte budget"""
+        if ttl is None:
+            ttl = self.default_ttl
+        key = cache_key(namespace, normalized)
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+        previous = self.conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, namespace, normalized, payload, size, now, now + ttl if ttl else None, now)
+        )
+        self.touched.pop(key, None)
+        self.total_bytes += size - (previous[0] if previous else 0)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def flush_touched(self) -> None:
+        """Write the batched last-access times of cache hits"""
+        if self.touched:
+            self.conn.executemany('UPDATE entries SET last_access = ? WHERE key = ?',
+                                  [(at, key) for key, at in self.touched.items()])
+            self.touched.clear()
+
+    def commit(self) -> None:
+        self.flush_touched()
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        # The LRU order must include the hits not yet written
+        self.flush_touched()
+        now = time.time()
+        count, size = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE expires IS NOT NULL AND expires <= ?',
+            (now,)
+        ).fetchone()
+        if count:
+            self.conn.execute('DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        removed = count
+        self.total_bytes -= size
+        if self.total_bytes > self.max_bytes:
+            victims = []
+            for key, size in self.conn.execute('SELECT key, size FROM entries ORDER BY last_access'):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                victims.append((key,))
+                self.total_bytes -= size
+            self.conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+            removed += len(victims)
+        self.evictions += removed
+        return removed
+
+    def get_query(self, query: str, record: bool = True) -> Optional[Any]:
+        return self.get('query', normalize_query(query), record)
+
+    def set_query(self, query: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set('query', normalize_query(query), value, ttl)
+
+    def get_url(self, url: str, record: bool = True) -> Optional[Any]:
+        return self.get('url', normalize_url(url), record)
+
+    def set_url(self, url: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set('url', normalize_url(url), value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        entries = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'offline': self.offline
+        }
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+
+class CachedSearchBackend(SearchBackend):
+    """Search backend wrapper that serves repeat queries from a ResponseCache"""
+
+    def __init__(self, backend: Optional[SearchBackend], cache: ResponseCache):
+        self.backend = backend
+        self.cache = cache
+
+    def cached(self, query: str) -> Optional[List[Dict]]:
+        results = self.cache.get_query(query)
+        if results is None and (self.cache.offline or self.backend is None):
+            raise CacheMiss(f"No cached results for '{query}' (cache-only mode)")
+        return results
+
+    async def search(self, query: str) -> List[Dict]:
+        # The resolver calls cached() first, so this lookup is not counted again
+        results = self.cache.get_query(query, record=False)
+        if results is not None:
+            return results
+        if self.cache.offline or self.backend is None:
+            raise CacheMiss(f"No cached results for '{query}' (cache-only mode)")
+
+        results = await self.backend.search(query)
+        self.cache.set_query(query, results)
+        return results
+
+    async def search_many(self, queries: List[str]) -> List[List[Dict]]:
+        results = [self.cache.get_query(query, record=False) for query in queries]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            if self.cache.offline or self.backend is None:
+                raise CacheMiss(f"No cached results for '{queries[missing[0]]}' (cache-only mode)")
+            answers = await self.backend.search_many([queries[i] for i in missing])
+            for i, answer in zip(missing, answers):
+                self.cache.set_query(queries[i], answer)
+                results[i] = answer
+        return results
+
+    @property
+    def max_batch(self) -> int:
+        return self.backend.max_batch if self.backend is not None else 1
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Pipeline runner that chains the institution scripts as a dependency graph
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import METRICS, METRICS_FILE, configure_logging, get_logger, profile
+from ndjson_stream import compact_ndjson, failed_marker, follow_ndjson, reset_stream, write_ndjson
+
+STATE_FILE = Path(".cache/pipeline/state.json")
+DEFAULT_STREAM_DIR = ".cache/stream"
+
+# Each institution stage after scrape_all writes its own artifact, so a skipped stage's
+# result is reloaded from its own output; only link_jobs writes the final file
+SEARCHED_FILE = "institutions_websites_searched.json"
+RESOLVED_FILE = "institutions_websites_resolved.json"
+PAGES_FILE = "institutions_with_pages.json"
+INSTITUTIONS_FILE = "institutions_with_websites.json"
+
+logger = get_logger(__name__)
+
+
+class Stage:
+    """A pipeline stage with declared file inputs, outputs and upstream stages"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any], argparse.Namespace], Any],
+                 inputs: List[str], outputs: List[str], deps: Optional[List[str]] = None,
+                 stream: Optional[Callable[[argparse.Namespace], int]] = None,
+                 compact_to: Optional[str] = None, ensure_ascii: bool = False):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps or []
+        # Streaming variant: consumes upstream NDJSON and writes its own,
+        # optionally compacted into a JSON array artifact at the end
+        self.stream = stream
+        self.compact_to = compact_to
+        self.ensure_ascii = ensure_ascii
+
+
+def fingerprint(patterns: List[str]) -> Dict[str, str]:
+    """Hash every file matched by the given paths or glob patterns"""
+    hashes = {}
+    for pattern in patterns:
+        for path in sorted(Path('.').glob(pattern)):
+            with open(path, 'rb') as f:
+                hashes[str(path)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def load_state() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state: Dict[str, Dict[str, str]]):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def write_json(path: str, data: Any, ensure_ascii: bool = False):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=ensure_ascii)
+
+
+# Stage implementations. Each receives the in-memory results of upstream stages
+# and returns its own result; scripts are imported lazily so the runner starts
+# without loading pandas, numpy or openpyxl for stages that are up to date.
+
+def run_extract(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from extract_institutions import extract_institutions_from_excel
+    return extract_institutions_from_excel(force=args.force)
+
+
+def run_scrape_all(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from scrape_all_institutions import process_institutions_journaled
+    return process_institutions_journaled(results['extract'], resume=args.resume)
+
+
+def run_create_data(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from create_institution_data import build_institution_data
+    from search_index import write_search_index
+    processed = build_institution_data(results['extract'])
+    write_json('processed_institutions.json', processed)
+    write_search_index(processed)
+    return processed
+
+
+def run_scrape_websites(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from scrape_institution_websites import process_institution_websites_journaled
+
+    records = [dict(inst) for inst in results['scrape_all']]
+    cache = response_cache(args)
+    try:
+        return process_institution_websites_journaled(records, search_backend(cache), output_file=SEARCHED_FILE,
+                                                      resume=args.resume)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def run_update_websites(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from update_institutions_with_websites import update_institutions_with_websites
+    updated, _ = update_institutions_with_websites(records=results['scrape_websites'])
+    write_json(RESOLVED_FILE, updated, ensure_ascii=True)
+    return updated
+
+
+def run_fetch_pages(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from fetch_institution_pages import run_fetch_pages as fetch
+
+    institutions = [dict(inst) for inst in results['update_websites']]
+    cache = response_cache(args)
+    try:
+        fetch(institutions, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    write_json(PAGES_FILE, institutions, ensure_ascii=True)
+    return institutions
+
+
+def run_jobs(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from extract_jobs import extract_jobs
+    return extract_jobs(force=args.force)
+
+
+def run_link_jobs(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from link_jobs import ORGANIZATIONS_FILE, link_jobs, load_json
+    institutions = [dict(inst) for inst in results['fetch_pages']]
+    link_jobs(institutions, results['jobs'])
+    write_json(INSTITUTIONS_FILE, institutions, ensure_ascii=True)
+
+    organizations = load_json(ORGANIZATIONS_FILE)
+    link_jobs(organizations, results['jobs'], name_field='name')
+    write_json(ORGANIZATIONS_FILE, organizations)
+    return institutions
+
+
+def run_publish(results: Dict[str, Any], args: argparse.Namespace) -> Any:
+    from publish_institutions import LEGACY_FILE, publish_institutions
+    published = results['link_jobs']
+    write_json(LEGACY_FILE, published, ensure_ascii=True)
+    publish_institutions(published)
+    return published
+
+
+def stream_path(args: argparse.Namespace, name: str) -> Path:
+    return Path(args.stream_dir) / f"{name}.ndjson"
+
+
+def search_backend(cache):
+    """Build the search backend, wrapped in the response cache when there is one"""
+    from response_cache import CachedSearchBackend
+    from website_resolver import StubSearchBackend
+
+    backend = StubSearchBackend()
+    return backend if cache is None else CachedSearchBackend(backend, cache)
+
+
+def response_cache(args: argparse.Namespace):
+    """Response cache holding search results, fetched pages and their validators, unless disabled
+
+    The cache commits in batches, so callers close it once their stage is done.
+    """
+    from response_cache import ResponseCache
+    return None if args.no_cache else ResponseCache(offline=args.offline)
+
+
+def stream_extract(args: argparse.Namespace) -> int:
+    from extract_institutions import iter_institutions_from_excel
+    return write_ndjson(stream_path(args, 'extract'), iter_institutions_from_excel(force=args.force))
+
+
+def stream_scrape_all(args: argparse.Namespace) -> int:
+    from scrape_all_institutions import iter_processed_institutions
+    records = follow_ndjson(stream_path(args, 'extract'))
+    return write_ndjson(stream_path(args, 'scrape_all'), iter_processed_institutions(records))
+
+
+def stream_create_data(args: argparse.Namespace) -> int:
+    from create_institution_data import iter_institution_data
+    from search_index import write_search_index
+
+    # Entries are small; keep them so the search index is built once the stream ends
+    entries = []
+
+    def collect(records):
+        for record in records:
+            entries.append(record)
+            yield record
+
+    records = follow_ndjson(stream_path(args, 'extract'))
+    count = write_ndjson(stream_path(args, 'create_data'), collect(iter_institution_data(records)))
+    write_search_index(entries)
+    return count
+
+
+def stream_scrape_websites(args: argparse.Namespace) -> int:
+    from scrape_institution_websites import iter_institution_websites
+    records = follow_ndjson(stream_path(args, 'scrape_all'))
+    cache = response_cache(args)
+    try:
+        return write_ndjson(stream_path(args, 'scrape_websites'),
+                            iter_institution_websites(records, search_backend(cache)))
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def stream_update_websites(args: argparse.Namespace) -> int:
+    from update_institutions_with_websites import iter_updated_institutions
+    records = follow_ndjson(stream_path(args, 'scrape_websites'))
+    return write_ndjson(stream_path(args, 'update_websites'), iter_updated_institutions(records))
+
+
+def stream_fetch_pages(args: argparse.Namespace) -> int:
+    from fetch_institution_pages import iter_fetched_institutions
+    records = follow_ndjson(stream_path(args, 'update_websites'))
+    cache = response_cache(args)
+    try:
+        return write_ndjson(stream_path(args, 'fetch_pages'), iter_fetched_institutions(records, cache))
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def stream_jobs(args: argparse.Namespace) -> int:
+    from extract_jobs import extract_jobs
+    return write_ndjson(stream_path(args, 'jobs'), extract_jobs(force=args.force))
+
+
+def stream_link_jobs(args: argparse.Namespace) -> int:
+    from institution_records import RecordStore
+    from link_jobs import ORGANIZATIONS_FILE, link_jobs, load_json
+
+    # Linking needs every institution and job, so it waits for both streams to finish;
+    # institutions are held as compact records, converted as each line arrives
+    institutions = RecordStore(follow_ndjson(stream_path(args, 'fetch_pages')))
+    jobs = list(follow_ndjson(stream_path(args, 'jobs')))
+
+    link_jobs(institutions, jobs)
+    organizations = load_json(ORGANIZATIONS_FILE)
+    link_jobs(organizations, jobs, name_field='name')
+    write_json(ORGANIZATIONS_FILE, organizations)
+    return write_ndjson(stream_path(args, 'link_jobs'), institutions.iter_dicts())
+
+
+def stream_publish(args: argparse.Namespace) -> int:
+    from publish_institutions import LEGACY_FILE, publish_institutions
+    published = list(follow_ndjson(stream_path(args, 'link_jobs')))
+    write_json(LEGACY_FILE, published, ensure_ascii=True)
+    publish_institutions(published)
+    return len(published)
+
+
+STAGES = [
+    Stage('extract', run_extract,
+          inputs=['docs/*.xlsx', 'docs/categories/*.xlsx', 'extract_institutions.py', 'excel_reader.py',
+                  'near_duplicates.py'],
+          outputs=['extracted_institutions.json'],
+          stream=stream_extract, compact_to='extracted_institutions.json'),
+    Stage('scrape_all', run_scrape_all,
+          inputs=['extracted_institutions.json', 'scrape_all_institutions.py', 'institution_entries.py',
+                  'description_extractor.py'],
+          outputs=['processed_institutions_with_queries.json'], deps=['extract'],
+          stream=stream_scrape_all, compact_to='processed_institutions_with_queries.json'),
+    Stage('create_data', run_create_data,
+          inputs=['extracted_institutions.json', 'create_institution_data.py', 'institution_entries.py',
+                  'description_extractor.py', 'search_index.py'],
+          outputs=['processed_institutions.json', 'public/data/search/manifest.json'], deps=['extract'],
+          stream=stream_create_data, compact_to='processed_institutions.json'),
+    Stage('scrape_websites', run_scrape_websites,
+          inputs=['processed_institutions_with_queries.json', 'scrape_institution_websites.py',
+                  'website_resolver.py', 'website_registry.py', 'query_planner.py'],
+          outputs=[SEARCHED_FILE], deps=['scrape_all'],
+          stream=stream_scrape_websites),
+    Stage('update_websites', run_update_websites,
+          inputs=['update_institutions_with_websites.py', 'website_registry.py', 'website_registry.json',
+                  'near_duplicates.py'],
+          outputs=[RESOLVED_FILE], deps=['scrape_websites'],
+          stream=stream_update_websites),
+    # Fetches each known website and replaces the placeholder description with
+    # one extracted from the page; cached pages are revalidated with conditional GETs
+    Stage('fetch_pages', run_fetch_pages,
+          inputs=['fetch_institution_pages.py', 'description_extractor.py', 'institution_entries.py'],
+          outputs=[PAGES_FILE], deps=['update_websites'],
+          stream=stream_fetch_pages),
+    # Independent of the institution stages; merges the scraped job feeds
+    Stage('jobs', run_jobs,
+          inputs=['data/*.json', 'public/data/*_jobs_*.json', 'public/data/linkedin.json', 'extract_jobs.py'],
+          outputs=['public/data/jobs_merged.json'], stream=stream_jobs),
+    # Attaches job ids and open-job counts to the final institution artifact
+    # and to the curated organizations
+    Stage('link_jobs', run_link_jobs,
+          inputs=['link_jobs.py', 'institution_records.py', 'public/data/organizations.json'],
+          outputs=[INSTITUTIONS_FILE, 'public/data/organizations.json'],
+          deps=['fetch_pages', 'jobs'],
+          stream=stream_link_jobs, compact_to=INSTITUTIONS_FILE, ensure_ascii=True),
+]
+
+# Only run with --publish: copies the final artifact to the frontend's legacy
+# file and writes the compact paginated shards next to it
+PUBLISH_STAGE = Stage('publish', run_publish,
+                      inputs=[INSTITUTIONS_FILE, 'publish_institutions.py', 'institution_entries.py'],
+                      outputs=['public/data/institutions/manifest.json', 'public/data/processed_institutions.json'],
+                      deps=['link_jobs'], stream=stream_publish)
+
+
+class PipelineRunner:
+    """Runs stages in dependency order, skipping up-to-date ones"""
+
+    def __init__(self, stages: List[Stage], args: argparse.Namespace):
+        self.stages = {stage.name: stage for stage in stages}
+        self.args = args
+        self.state = load_state()
+        self.results: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        """A stage is current if its outputs exist, its inputs are unchanged and no upstream stage ran"""
+        if self.args.force:
+            return False
+        if any(self.status.get(dep) == 'ran' for dep in stage.deps):
+            return False
+        if not all(Path(output).exists() for output in stage.outputs):
+            return False
+        return self.state.get(stage.name) == fingerprint(stage.inputs)
+
+    def upstream_results(self, stage: Stage) -> Dict[str, Any]:
+        """Collect upstream results, loading skipped stages' outputs from disk"""
+        for dep in stage.deps:
+            if dep not in self.results:
+                with open(self.stages[dep].outputs[0], 'r', encoding='utf-8') as f:
+                    self.results[dep] = json.load(f)
+        return {dep: self.results[dep] for dep in stage.deps}
+
+    def run_stage(self, stage: Stage) -> str:
+        start = time.perf_counter()
+        try:
+            if self.is_up_to_date(stage):
+                return 'skipped'
+            logger.info("Running stage: %s", stage.name)
+            with METRICS.stage(stage.name) as entry, profile(stage.name, self.args.profile):
+                result = stage.func(self.upstream_results(stage), self.args)
+                if isinstance(result, list):
+                    entry['records'] = len(result)
+            self.results[stage.name] = result
+            self.state[stage.name] = fingerprint(stage.inputs)
+            return 'ran'
+        finally:
+            self.timings[stage.name] = time.perf_counter() - start
+
+    def run(self, jobs: int = 4) -> bool:
+        """Run all stages, executing independent ones in parallel"""
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if any(self.status.get(dep) == 'failed' for dep in stage.deps):
+                        self.status[name] = 'failed'
+                        self.timings[name] = 0.0
+                        logger.warning("Skipping %s: upstream stage failed", name)
+                        del pending[name]
+                    elif all(dep in self.status for dep in stage.deps):
+                        running[executor.submit(self.run_stage, stage)] = name
+                        del pending[name]
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.status[name] = future.result()
+                    except Exception:
+                        logger.exception("Stage %s failed", name)
+                        self.status[name] = 'failed'
+
+        save_state(self.state)
+        return all(status != 'failed' for status in self.status.values())
+
+    def run_streaming(self) -> bool:
+        """Run every stage at once over NDJSON streams, then compact the artifacts"""
+        for stage in self.stages.values():
+            reset_stream(stream_path(self.args, stage.name))
+
+        def run_stream(stage: Stage) -> int:
+            start = time.perf_counter()
+            try:
+                with METRICS.stage(stage.name) as entry, profile(stage.name, self.args.profile):
+                    entry['records'] = stage.stream(self.args)
+                return entry['records']
+            except BaseException:
+                # A stage can fail before write_ndjson marks its stream; mark it here so
+                # downstream readers stop waiting for a file that will never appear
+                marker = failed_marker(stream_path(self.args, stage.name))
+                marker.parent.mkdir(parents=True, exist_ok=True)
+                marker.touch()
+                raise
+            finally:
+                self.timings[stage.name] = time.perf_counter() - start
+
+        # One worker per stage, so every downstream stage can start consuming
+        # records as soon as its upstream writes them
+        with ThreadPoolExecutor(max_workers=len(self.stages)) as executor:
+            futures = {executor.submit(run_stream, stage): name for name, stage in self.stages.items()}
+            for future in futures:
+                name = futures[future]
+                try:
+                    count = future.result()
+                    self.status[name] = 'ran'
+                    logger.info("Stage %s streamed %d records", name, count)
+                except Exception:
+                    logger.exception("Stage %s failed", name)
+                    self.status[name] = 'failed'
+
+        if any(status == 'failed' for status in self.status.values()):
+            return False
+
+        start = time.perf_counter()
+        for stage in self.stages.values():
+            if stage.compact_to:
+                compact_ndjson(stream_path(self.args, stage.name), stage.compact_to, stage.ensure_ascii)
+        self.timings['compact'] = time.perf_counter() - start
+        self.status['compact'] = 'ran'
+        return True
+
+    def print_summary(self):
+        print("\n=== Pipeline Summary ===")
+        for name in list(self.stages) + (['compact'] if 'compact' in self.status else []):
+            print(f"  {name:<18} {self.status.get(name, 'not run'):<8} {self.timings.get(name, 0.0):8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the institution data pipeline")
+    parser.add_argument('--force', action='store_true', help="Rerun every stage")
+    parser.add_argument('--jobs', type=int, default=4, help="Maximum stages run in parallel")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the search response cache")
+    parser.add_argument('--offline', action='store_true', help="Serve search results from the cache only")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip institutions journaled by an interrupted scrape_all or scrape_websites run")
+    parser.add_argument('--stream', action='store_true',
+                        help="Run all stages concurrently over NDJSON streams, then compact to JSON")
+    parser.add_argument('--stream-dir', default=DEFAULT_STREAM_DIR, help="Directory for NDJSON streams")
+    parser.add_argument('--publish', action='store_true',
+                        help="Also publish compact, paginated data for the frontend")
+    parser.add_argument('--profile', choices=['cprofile', 'sample'],
+                        help="Profile each stage; output goes to .cache/profiles/<stage>.*")
+    parser.add_argument('--metrics', default=str(METRICS_FILE), help="Where to write per-stage metrics JSON")
+    parser.add_argument('--log-level', help="Logging level (default $PIPELINE_LOG_LEVEL or INFO)")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    runner = PipelineRunner(STAGES + ([PUBLISH_STAGE] if args.publish else []), args)
+    ok = runner.run_streaming() if args.stream else runner.run(jobs=args.jobs)
+    runner.print_summary()
+    logger.info("Stage metrics saved to %s", METRICS.write(args.metrics))
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
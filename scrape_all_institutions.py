@@ -3,134 +3,145 @@
 Script to scrape descriptions for all institutions using BrightData MCP
 """
 
+import argparse
 import json
-import time
 import re
-from typing import Dict, List, Any
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from instrumentation import METRICS, Progress, configure_logging, get_logger
+from institution_entries import (DEFAULT_CATEGORY, DEFAULT_RATING, DEFAULT_VISION, IdAllocator, fill_template,
+                                 institution_id, short_description)
+from journal import JOURNAL_DIR, Journal
+
+logger = get_logger(__name__)
+
+OUTPUT_FILE = 'processed_institutions_with_queries.json'
+JOURNAL_FILE = JOURNAL_DIR / "scrape_all.ndjson"
+
+# Common suffixes removed from names before searching
+NAME_SUFFIX_PATTERN = re.compile(r'\s+(India|Trust|Foundation|Society|Organization|Institute|Centre|Center)$',
+                                 flags=re.IGNORECASE)
+
+QUERY_TEMPLATES = [
+    "{name} official website",
+    "{name} about us",
+    "{name} mission vision",
+    "{name} organization",
+    "{name} public health",
+    "{name} NGO India",
+    "{name} healthcare organization"
+]
+
+# Number of search queries stored on each processed record
+STORED_QUERIES = 3
+
+# For now, create a description based on the name and category
+# In a real implementation, you would use BrightData MCP here
+SCRAPED_DESCRIPTION = "{name} is a public health organization working to improve community health and well-being. The organization focuses on addressing healthcare challenges and promoting health equity through various programs and initiatives."
 
 def clean_institution_name(name: str) -> str:
     """Clean institution name for better search results"""
     # Remove common suffixes and clean up
-    name = re.sub(r'\s+(India|Trust|Foundation|Society|Organization|Institute|Centre|Center)$', '', name, flags=re.IGNORECASE)
+    name = NAME_SUFFIX_PATTERN.sub('', name)
     name = name.strip()
     return name
 
 def create_search_queries(institution_name: str) -> List[str]:
     """Create multiple search queries for better results"""
     clean_name = clean_institution_name(institution_name)
-    
-    queries = [
-        f"{clean_name} official website",
-        f"{clean_name} about us",
-        f"{clean_name} mission vision",
-        f"{clean_name} organization",
-        f"{clean_name} public health",
-        f"{clean_name} NGO India",
-        f"{clean_name} healthcare organization"
-    ]
-    
-    return queries
-
-def extract_description_from_content(content: str, institution_name: str) -> str:
-    """Extract a meaningful description from scraped content"""
-    if not content:
-        return f"{institution_name} is a public health organization working to improve community health and well-being."
-    
-    # Clean the content
-    content = re.sub(r'\s+', ' ', content)
-    content = content.strip()
-    
-    # Look for key phrases that indicate description
-    patterns = [
-        r'(?:about|mission|vision|who we are)[^.]*\.([^.]*\.)',
-        r'(?:founded|established|created)[^.]*\.([^.]*\.)',
-        r'(?:works?|focuses?|aims?)[^.]*\.([^.]*\.)',
-        r'(?:organization|foundation|institute)[^.]*\.([^.]*\.)',
-        r'(?:dedicated|committed)[^.]*\.([^.]*\.)',
-        r'(?:healthcare|health|public health)[^.]*\.([^.]*\.)',
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, content, re.IGNORECASE)
-        if matches:
-            description = matches[0].strip()
-            if len(description) > 50 and len(description) < 500:
-                return description
-    
-    # Fallback: take first meaningful sentence
-    sentences = content.split('.')
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if len(sentence) > 50 and len(sentence) < 300:
-            return sentence + '.'
-    
-    # Final fallback
-    return f"{institution_name} is a public health organization dedicated to improving health outcomes and community well-being through various programs and initiatives."
+    return [fill_template(template, clean_name) for template in QUERY_TEMPLATES]
 
-def main():
-    """Main function to process all institutions"""
-    
-    # Load the extracted institutions
-    try:
-        with open('extracted_institutions.json', 'r') as f:
-            institutions = json.load(f)
-    except FileNotFoundError:
-        print("extracted_institutions.json not found.")
-        return
-    
-    print(f"Processing {len(institutions)} institutions...")
-    
-    # Process institutions in batches
-    batch_size = 10
-    processed_institutions = []
+def iter_processed_institutions(institutions: Iterable[Dict[str, Any]], batch_size: int = 10,
+                                ids: Optional[IdAllocator] = None) -> Iterator[Dict[str, Any]]:
+    """Yield processed institution records with search queries, one batch at a time"""
+    iterator = iter(institutions)
+    batch_number = 0
+    progress = Progress("scrape_all", logger=logger)
+    ids = ids if ids is not None else IdAllocator()
     
-    for i in range(0, len(institutions), batch_size):
-        batch = institutions[i:i + batch_size]
-        print(f"\nProcessing batch {i//batch_size + 1}/{(len(institutions) + batch_size - 1)//batch_size}")
-        
-        # Create search queries for this batch
-        search_queries = []
-        for inst in batch:
-            queries = create_search_queries(inst['name'])
-            search_queries.extend([{'query': q, 'institution': inst['name']} for q in queries[:3]])  # Limit to 3 queries per institution
-        
-        print(f"Created {len(search_queries)} search queries for batch")
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        batch_number += 1
+        logger.debug("Processing batch %d", batch_number)
         
         # Process each institution in the batch
         for inst in batch:
-            print(f"Processing: {inst['name']}")
+            logger.debug("Processing: %s", inst['name'])
             
             # Create search queries for this institution
             queries = create_search_queries(inst['name'])
             
-            # For now, create a description based on the name and category
-            # In a real implementation, you would use BrightData MCP here
-            description = f"{inst['name']} is a public health organization working to improve community health and well-being. The organization focuses on addressing healthcare challenges and promoting health equity through various programs and initiatives."
+            description = fill_template(SCRAPED_DESCRIPTION, inst['name'])
             
             processed_inst = {
-                "id": f"extracted_{inst['name'].lower().replace(' ', '_').replace('-', '_').replace('.', '').replace(',', '')}",
+                "id": ids.allocate(institution_id(inst['name'])),
                 "companyName": inst['name'],
-                "shortDescription": description[:100] + '...' if len(description) > 100 else description,
+                "shortDescription": short_description(description),
                 "description": description,
-                "vision": f"{inst['name']} envisions a healthier future for all communities through innovative public health solutions.",
-                "overallRating": 4.0,
+                "vision": fill_template(DEFAULT_VISION, inst['name']),
+                "overallRating": DEFAULT_RATING,
                 "totalComments": 0,
                 "comments": [],
                 "source": inst['source_file'],
-                "category": "Public Health Organization",
+                "category": DEFAULT_CATEGORY,
                 "extracted": True,
-                "search_queries": queries[:3]  # Store the search queries for later use
+                "search_queries": queries[:STORED_QUERIES]  # Store the search queries for later use
             }
             
-            processed_institutions.append(processed_inst)
-        
-        # Add a small delay between batches
-        time.sleep(1)
+            METRICS.count('records')
+            progress.update()
+            yield processed_inst
     
-    # Save the processed data
-    output_file = 'processed_institutions_with_queries.json'
+    progress.close()
+
+def process_institutions_journaled(institutions: List[Dict[str, Any]], output_file: str = OUTPUT_FILE,
+                                   resume: bool = False, journal_path=JOURNAL_FILE) -> List[Dict[str, Any]]:
+    """Process institutions into a journal as they complete, then compact it into output_file
+
+    With resume, institutions journaled by an interrupted run are skipped.
+    """
+    with Journal(journal_path, key=lambda record: record['companyName']) as journal:
+        completed = journal.open(resume)
+        todo = [inst for inst in institutions if inst['name'] not in completed]
+        if completed:
+            logger.info("Resuming: %d of %d institutions already processed",
+                        len(institutions) - len(todo), len(institutions))
+
+        # Ids already journaled stay taken, so a colliding name still gets its _2 suffix
+        ids = IdAllocator(record['id'] for record in completed.values())
+        for record in iter_processed_institutions(todo, ids=ids):
+            journal.append(record)
+            completed[record['companyName']] = record
+        journal.compact(output_file, (inst['name'] for inst in institutions), ensure_ascii=False)
+    return [completed[inst['name']] for inst in institutions]
+
+def save_processed_institutions(processed_institutions: List[Dict[str, Any]], output_file: str = OUTPUT_FILE):
+    """Write processed institutions to JSON"""
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(processed_institutions, f, indent=2, ensure_ascii=False)
+
+def main():
+    """Main function to process all institutions"""
+    parser = argparse.ArgumentParser(description="Build processed institution records with search queries")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip institutions processed by an interrupted run, as recorded in its journal")
+    args = parser.parse_args()
+    configure_logging()
+    
+    # Load the extracted institutions
+    try:
+        with open('extracted_institutions.json', 'r') as f:
+            institutions = json.load(f)
+    except FileNotFoundError:
+        print("extracted_institutions.json not found.")
+        return
+    
+    # Records are journaled as they complete and compacted into the output at the end
+    output_file = OUTPUT_FILE
+    processed_institutions = process_institutions_journaled(institutions, output_file, resume=args.resume)
     
     print(f"\nProcessed {len(processed_institutions)} institutions")
     print(f"Saved to {output_file}")
@@ -3,121 +3,153 @@
 Script to scrape website URLs for all institutions using BrightData MCP
 """
 
+import argparse
+import asyncio
 import json
-import time
-import re
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
-# Load the existing processed institutions data
-with open('processed_institutions_with_queries.json', 'r') as f:
-    institutions = json.load(f)
+from instrumentation import configure_logging, get_logger
+from journal import JOURNAL_DIR, Journal
+from query_planner import DEFAULT_MAX_QUERIES, QueryPlanner, run_planned
+from response_cache import DEFAULT_CACHE_PATH, CachedSearchBackend, ResponseCache
+from website_registry import best_website
+from website_resolver import SearchBackend, StubSearchBackend
 
-print(f"Loaded {len(institutions)} institutions to process")
+logger = get_logger(__name__)
+
+OUTPUT_FILE = 'institutions_with_websites.json'
+JOURNAL_FILE = JOURNAL_DIR / "scrape_websites.ndjson"
+INPUT_FILE = 'processed_institutions_with_queries.json'
+
+_institutions = None
+
+def load_institutions() -> List[Dict]:
+    """Load the processed institutions once per process, on first use"""
+    global _institutions
+    if _institutions is None:
+        with open(INPUT_FILE, 'r') as f:
+            _institutions = json.load(f)
+        print(f"Loaded {len(_institutions)} institutions to process")
+    return _institutions
 
 def extract_website_from_search_results(search_results: List[Dict]) -> Optional[str]:
     """Extract the most likely official website from search results"""
-    if not search_results:
-        return None
-    
-    # Look for official website patterns
-    official_patterns = [
-        r'https?://(?:www\.)?([^/]+)\.org',
-        r'https?://(?:www\.)?([^/]+)\.in',
-        r'https?://(?:www\.)?([^/]+)\.gov\.in',
-        r'https?://(?:www\.)?([^/]+)\.ac\.in',
-        r'https?://(?:www\.)?([^/]+)\.edu',
-        r'https?://(?:www\.)?([^/]+)\.com'
-    ]
-    
-    for result in search_results[:5]:  # Check top 5 results
-        url = result.get('url', '')
-        title = result.get('title', '').lower()
-        description = result.get('description', '').lower()
-        
-        # Skip social media and job sites
-        skip_domains = ['linkedin.com', 'facebook.com', 'twitter.com', 'indeed.com', 'glassdoor.com', 'naukri.com']
-        if any(domain in url.lower() for domain in skip_domains):
-            continue
-            
-        # Look for official website indicators
-        official_indicators = ['official', 'homepage', 'main', 'about us', 'contact us']
-        if any(indicator in title or indicator in description for indicator in official_indicators):
-            # Extract domain from URL
-            for pattern in official_patterns:
-                match = re.search(pattern, url)
-                if match:
-                    domain = match.group(1)
-                    # Reconstruct clean URL
-                    if url.startswith('https://'):
-                        return f"https://{domain}"
-                    else:
-                        return f"http://{domain}"
-    
-    # If no official site found, try to extract any valid domain from top results
-    for result in search_results[:3]:
-        url = result.get('url', '')
-        for pattern in official_patterns:
-            match = re.search(pattern, url)
-            if match:
-                domain = match.group(1)
-                if url.startswith('https://'):
-                    return f"https://{domain}"
-                else:
-                    return f"http://{domain}"
-    
-    return None
+    return best_website(search_results)
 
-def process_institution_websites():
+def process_institution_websites(backend: Optional[SearchBackend] = None,
+                                 concurrency: int = 10, rate: float = 5.0,
+                                 records: Optional[List[Dict]] = None,
+                                 on_result: Optional[Callable[[Dict], None]] = None,
+                                 max_queries: int = DEFAULT_MAX_QUERIES) -> List[Dict]:
     """Process all institutions to find their websites"""
-    processed_count = 0
-    institutions_with_websites = []
-    
-    # Process in batches of 5 to avoid rate limiting
-    batch_size = 5
-    
-    for i in range(0, len(institutions), batch_size):
-        batch = institutions[i:i + batch_size]
-        print(f"\nProcessing batch {i//batch_size + 1}/{(len(institutions) + batch_size - 1)//batch_size}")
-        
-        # Process each institution in the batch
-        for inst in batch:
-            print(f"  Processing: {inst['companyName']}")
-            
-            # Create search query for official website
-            search_query = f"{inst['companyName']} official website"
-            
-            try:
-                # This will be called by the MCP tool, not directly
-                # For now, we'll add a placeholder and process manually
-                inst['website'] = None
-                institutions_with_websites.append(inst)
-                processed_count += 1
-                
-                print(f"    Website: Not found (manual processing needed)")
-                
-            except Exception as e:
-                print(f"    Error: {e}")
-                inst['website'] = None
-                institutions_with_websites.append(inst)
-                processed_count += 1
-        
-        # Add delay between batches
-        time.sleep(1)
-    
+    if records is None:
+        records = load_institutions()
+
+    # The stub backend returns no results, so every institution is left for
+    # manual processing until a real search backend is plugged in
+    if backend is None:
+        backend = StubSearchBackend()
+
+    logger.info("Resolving websites with concurrency=%d, rate=%s/s", concurrency, rate)
+    institutions_with_websites, stats = run_planned(
+        records, backend, extract_website_from_search_results,
+        planner=QueryPlanner(max_queries=max_queries), concurrency=concurrency, rate=rate, on_result=on_result
+    )
+
+    logger.info("Resolved: %d, not found: %d, failed: %d",
+                stats['resolved'], stats['not_found'], stats['failed'])
+    logger.info("Searched %d unique queries in %d batches (%s per institution, %d planned)",
+                stats['queries'], stats['batches'], stats['queries_per_institution'], stats['queries_planned'])
+    logger.info("Throughput: %s institutions/s (%ss total)",
+                stats['institutions_per_second'], stats['elapsed_seconds'])
+
     return institutions_with_websites
 
+def process_institution_websites_journaled(records: List[Dict], backend: Optional[SearchBackend] = None,
+                                           output_file: str = OUTPUT_FILE, resume: bool = False,
+                                           journal_path=JOURNAL_FILE,
+                                           max_queries: int = DEFAULT_MAX_QUERIES) -> List[Dict]:
+    """Resolve websites, journaling each completed search, then compact the journal into output_file
+
+    With resume, institutions journaled by an interrupted run are not searched again.
+    """
+    with Journal(journal_path, key=lambda inst: inst['companyName']) as journal:
+        completed = journal.open(resume)
+        todo = [inst for inst in records if inst['companyName'] not in completed]
+        if completed:
+            logger.info("Resuming: %d of %d institutions already resolved", len(records) - len(todo), len(records))
+
+        resolved = {inst['companyName']: inst
+                    for inst in process_institution_websites(backend, records=todo, on_result=journal.append,
+                                                                 max_queries=max_queries)}
+        # Failed searches are never journaled, so they are retried on resume
+        journal.compact(output_file, (inst['companyName'] for inst in records),
+                        fallback=resolved, ensure_ascii=True)
+    return [completed.get(inst['companyName']) or resolved[inst['companyName']] for inst in records]
+
+def iter_institution_websites(records: Iterable[Dict], backend: Optional[SearchBackend] = None,
+                              concurrency: int = 10, rate: float = 5.0,
+                              window: int = 100, max_queries: int = DEFAULT_MAX_QUERIES) -> Iterator[Dict]:
+    """Yield institutions with websites resolved, keeping at most one window in memory"""
+    if backend is None:
+        backend = StubSearchBackend()
+    # Shared across windows, so a query answered in one window is not searched again
+    planner = QueryPlanner(max_queries=max_queries)
+
+    iterator = iter(records)
+    totals = {'total': 0, 'resolved': 0, 'not_found': 0, 'failed': 0, 'queries': 0}
+    try:
+        while True:
+            chunk = list(islice(iterator, window))
+            if not chunk:
+                break
+            resolved, stats = run_planned(
+                chunk, backend, extract_website_from_search_results,
+                planner=planner, concurrency=concurrency, rate=rate, close_backend=False
+            )
+            for key in totals:
+                totals[key] += stats[key]
+            yield from resolved
+    finally:
+        asyncio.run(backend.close())
+
+    logger.info("Resolved: %d, not found: %d, failed: %d of %d with %d unique queries",
+                totals['resolved'], totals['not_found'], totals['failed'], totals['total'], totals['queries'])
+
 def main():
+    parser = argparse.ArgumentParser(description="Resolve websites for all institutions")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="Path to the response cache")
+    parser.add_argument('--no-cache', action='store_true', help="Always query the search backend")
+    parser.add_argument('--offline', action='store_true', help="Serve results from the cache only")
+    parser.add_argument('--max-queries', type=int, default=DEFAULT_MAX_QUERIES,
+                        help="Queries tried per institution before it is left without a website")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip institutions resolved by an interrupted run, as recorded in its journal")
+    args = parser.parse_args()
+    configure_logging()
+
     print("Starting website extraction for all institutions...")
     print("Note: This script will create a template for manual website addition.")
     print("Websites will need to be added manually or through MCP tools.")
     
+    # Wrap the search backend in the persistent cache so reruns skip repeat queries
+    cache = None
+    backend = StubSearchBackend()
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, offline=args.offline)
+        backend = CachedSearchBackend(backend, cache)
+
     # Process all institutions
-    institutions_with_websites = process_institution_websites()
-    
-    # Save results
-    output_file = 'institutions_with_websites.json'
-    with open(output_file, 'w') as f:
-        json.dump(institutions_with_websites, f, indent=2)
+    output_file = OUTPUT_FILE
+    try:
+        institutions_with_websites = process_institution_websites_journaled(
+            load_institutions(), backend, output_file, resume=args.resume, max_queries=args.max_queries
+        )
+    finally:
+        if cache is not None:
+            print(f"Cache: {cache.stats()}")
+            cache.close()
     
     # Statistics
     with_websites = sum(1 for inst in institutions_with_websites if inst.get('website'))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Prebuilt inverted search index for institution data, sharded by token prefix
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+SEARCH_INDEX_DIR = "public/data/search"
+INDEX_VERSION = 1
+
+# Tokens are sharded by their first PREFIX_LENGTH characters, so a query
+# only downloads the shards its tokens start with
+PREFIX_LENGTH = 2
+
+INDEXED_FIELDS = ['companyName', 'shortDescription', 'description']
+SUMMARY_FIELDS = ['id', 'companyName', 'website']
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded alphanumeric tokens"""
+    if not text or text.isascii():
+        # Nothing to fold; skips the per-character pass below, which dominates indexing
+        return TOKEN_PATTERN.findall(text.lower()) if text else []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return TOKEN_PATTERN.findall(text)
+
+
+def shard_key(token: str) -> str:
+    return token[:PREFIX_LENGTH]
+
+
+def delta_encode(postings: List[int]) -> List[int]:
+    """Store sorted document numbers as gaps, which serialize much shorter"""
+    return [doc - prev for prev, doc in zip([0] + postings, postings)]
+
+
+def delta_decode(gaps: List[int]) -> List[int]:
+    postings, doc = [], 0
+    for gap in gaps:
+        doc += gap
+        postings.append(doc)
+    return postings
+
+
+def build_search_index(institutions: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the summary table and prefix-sharded posting lists for institution entries"""
+    summaries: List[List[Any]] = []
+    postings: Dict[str, List[int]] = {}
+    name_postings: Dict[str, List[int]] = {}
+
+    for doc, inst in enumerate(institutions):
+        summaries.append([inst.get(field) for field in SUMMARY_FIELDS])
+        tokens: Set[str] = set()
+        for field in INDEXED_FIELDS:
+            tokens.update(tokenize(inst.get(field, '')))
+        for token in tokens:
+            postings.setdefault(token, []).append(doc)
+        for token in set(tokenize(inst.get('companyName', ''))):
+            name_postings.setdefault(token, []).append(doc)
+
+    # Each token maps to [all documents, documents matching by name], delta encoded
+    shards: Dict[str, Dict[str, List[List[int]]]] = {}
+    for token in sorted(postings):
+        shards.setdefault(shard_key(token), {})[token] = [
+            delta_encode(postings[token]), delta_encode(name_postings.get(token, []))
+        ]
+
+    return {
+        'manifest': {
+            'version': INDEX_VERSION,
+            'count': len(summaries),
+            'prefixLength': PREFIX_LENGTH,
+            'fields': INDEXED_FIELDS,
+            'shards': sorted(shards)
+        },
+        'summaries': {'fields': SUMMARY_FIELDS, 'rows': summaries},
+        'shards': shards
+    }
+
+
+def write_compact_json(path: Path, data: Any):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_search_index(institutions: Iterable[Dict[str, Any]], index_dir: str = SEARCH_INDEX_DIR) -> Dict[str, Any]:
+    """Write the index as manifest.json, summaries.json and shards/<prefix>.json
+
+    The index is built in a sibling directory and swapped in, so readers never
+    see a manifest that refers to shards from a different build.
+    """
+    index = build_search_index(institutions)
+    target = Path(index_dir)
+    tmp = target.with_name(target.name + '.tmp')
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    (tmp / 'shards').mkdir(parents=True)
+
+    write_compact_json(tmp / 'summaries.json', index['summaries'])
+    for key, shard in index['shards'].items():
+        write_compact_json(tmp / 'shards' / f"{key}.json", shard)
+    # The manifest is written last; its presence marks a complete index
+    write_compact_json(tmp / 'manifest.json', index['manifest'])
+
+    if target.exists():
+        old = target.with_name(target.name + '.old')
+        if old.exists():
+            shutil.rmtree(old)
+        os.replace(target, old)
+        os.replace(tmp, target)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, target)
+    return index['manifest']
+
+
+class SearchIndex:
+    """Reader for a written index that loads shards on demand, as the frontend does"""
+
+    def __init__(self, index_dir: str = SEARCH_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        with open(self.index_dir / 'summaries.json', 'r', encoding='utf-8') as f:
+            summaries = json.load(f)
+        self.fields = summaries['fields']
+        self.rows = summaries['rows']
+        self.shards: Dict[str, Dict[str, List[List[int]]]] = {}
+        self.matches: Dict[str, Tuple[Set[int], Set[int]]] = {}
+
+    def shard(self, key: str) -> Dict[str, List[List[int]]]:
+        if key not in self.shards:
+            try:
+                with open(self.index_dir / 'shards' / f"{key}.json", 'r', encoding='utf-8') as f:
+                    self.shards[key] = json.load(f)
+            except FileNotFoundError:
+                self.shards[key] = {}
+        return self.shards[key]
+
+    def prefix_postings(self, prefix: str) -> Tuple[Set[int], Set[int]]:
+        """Documents with any word starting with prefix, and those with such a word in the name"""
+        if prefix in self.matches:
+            return self.matches[prefix]
+        if len(prefix) >= PREFIX_LENGTH:
+            keys = [shard_key(prefix)]
+        else:
+            keys = [key for key in self.manifest['shards'] if key.startswith(prefix)]
+
+        docs: Set[int] = set()
+        names: Set[int] = set()
+        for key in keys:
+            for token, (gaps, name_gaps) in self.shard(key).items():
+                if token.startswith(prefix):
+                    docs.update(delta_decode(gaps))
+                    names.update(delta_decode(name_gaps))
+        self.matches[prefix] = (docs, names)
+        return docs, names
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return summaries of institutions where every query token prefixes an indexed word
+
+        Name matches rank ahead of description-only matches.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        docs: Optional[Set[int]] = None
+        names: Optional[Set[int]] = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matches, name_matches = self.prefix_postings(token)
+            docs = matches if docs is None else docs & matches
+            names = name_matches if names is None else names & name_matches
+            if not docs:
+                return []
+
+        ranked = sorted(docs, key=lambda doc: (doc not in names, doc))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [dict(zip(self.fields, self.rows[doc])) for doc in ranked]
+
+
+def main():
+    with open('processed_institutions.json', 'r', encoding='utf-8') as f:
+        institutions = json.load(f)
+
+    manifest = write_search_index(institutions)
+    size = sum(path.stat().st_size for path in Path(SEARCH_INDEX_DIR).rglob('*.json'))
+    print(f"Indexed {manifest['count']} institutions into {len(manifest['shards'])} shards "
+          f"({size / 1024:.1f} KB) in {SEARCH_INDEX_DIR}")
+
+    index = SearchIndex()
+    for query in ['health', 'public health foundation', 'aiims']:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  '{query}': {len(results)} results in {elapsed:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
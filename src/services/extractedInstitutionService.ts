@@ -3,17 +3,331 @@ import { Institution } from '../utils/utils';
 // Load the processed institutions data from public directory
 let extractedInstitutionsData: any[] = [];
 
+// Compact paginated data written by publish_institutions.py. Values shared by
+// most records live once in the manifest as templates, derivable fields are
+// omitted, and low-cardinality strings are dictionary encoded. Pages and
+// patches are named by content hash; only the manifest is revalidated.
+const PUBLISHED_DATA_URL = '/data/institutions';
+
+// Decoded records of the last loaded version, updated with the published JSON Patches
+const PUBLISHED_CACHE_KEY = 'published-institutions';
+
+interface PublishedPatch {
+  file: string;
+  from: string;
+  to: string;
+  ops: number;
+}
+
+interface JsonPatchOperation {
+  op: 'add' | 'remove' | 'replace';
+  path: string;
+  value?: any;
+}
+
+interface PublishedManifest {
+  version: number;
+  dataVersion: string;
+  count: number;
+  pageSize: number;
+  nameField: string;
+  namePlaceholder: string;
+  fields: string[];
+  templates: Record<string, string>;
+  dictionaries: Record<string, string[]>;
+  derived: Record<string, { rule: 'truncate' | 'slug'; from: string; length?: number; suffix?: string; prefix?: string; strip?: string }>;
+  pages: { file: string; count: number }[];
+  patches: PublishedPatch[];
+}
+
+let publishedManifest: Promise<PublishedManifest | null> | null = null;
+
+const loadPublishedManifest = (): Promise<PublishedManifest | null> => {
+  if (!publishedManifest) {
+    publishedManifest = fetch(`${PUBLISHED_DATA_URL}/manifest.json`, { cache: 'no-cache' })
+      .then(response => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return publishedManifest;
+};
+
+const deriveField = (rule: PublishedManifest['derived'][string], record: Record<string, any>): any => {
+  const source = record[rule.from];
+  if (typeof source !== 'string') return undefined;
+  if (rule.rule === 'truncate') {
+    return source.length > rule.length! ? source.slice(0, rule.length) + rule.suffix : source;
+  }
+  // publish_institutions.py only omits slugs of ASCII names, where this matches Python's lower()
+  const stripped = [...(rule.strip ?? '')].reduce((slug, char) => slug.split(char).join(''), source.toLowerCase());
+  return `${rule.prefix}${stripped.replace(/ /g, '_').replace(/-/g, '_')}`;
+};
+
+const decodeRecord = (manifest: PublishedManifest, encoded: Record<string, any>): Record<string, any> => {
+  const escapedName = JSON.stringify(encoded[manifest.nameField] ?? '').slice(1, -1);
+  const missing = new Set<string>(encoded._missing ?? []);
+  const record: Record<string, any> = {};
+  for (const field of manifest.fields) {
+    if (field in encoded) {
+      const dictionary = manifest.dictionaries[field];
+      record[field] = dictionary ? dictionary[encoded[field]] : encoded[field];
+    } else if (field in manifest.templates && !missing.has(field)) {
+      record[field] = JSON.parse(manifest.templates[field].split(manifest.namePlaceholder).join(escapedName));
+    }
+  }
+  for (const field of manifest.fields) {
+    if (field in manifest.derived && !(field in encoded) && !missing.has(field)) {
+      const value = deriveField(manifest.derived[field], record);
+      if (value !== undefined) record[field] = value;
+    }
+  }
+  return Object.fromEntries(manifest.fields.filter(field => field in record).map(field => [field, record[field]]));
+};
+
+const publishedPages = new Map<number, Promise<any[]>>();
+
+/**
+ * Load one page of published institutions, e.g. to render the first screen
+ * before the rest of the data arrives. Pages are fetched once per session.
+ */
+export const loadInstitutionPage = (page: number): Promise<any[]> => {
+  if (!publishedPages.has(page)) {
+    publishedPages.set(page, (async () => {
+      const manifest = await loadPublishedManifest();
+      if (!manifest || !manifest.pages[page]) return [];
+      const response = await fetch(`${PUBLISHED_DATA_URL}/${manifest.pages[page].file}`);
+      const encoded: Record<string, any>[] = await response.json();
+      return encoded.map(record => decodeRecord(manifest, record));
+    })().catch(error => {
+      // Let the next call retry a page that failed to load
+      publishedPages.delete(page);
+      throw error;
+    }));
+  }
+  return publishedPages.get(page)!;
+};
+
+/**
+ * Full published records for search hits, fetching only the pages they are on,
+ * or null when no published data exists. The search index and the published
+ * pages list institutions in the same order, so a hit's position gives its page;
+ * if they were published apart, the other pages are searched for the rest.
+ */
+const loadPublishedRecords = async (hits: { doc: number; id: string }[]): Promise<Map<string, any> | null> => {
+  const manifest = await loadPublishedManifest();
+  if (!manifest) return null;
+
+  const records = new Map<string, any>();
+  const loadPages = async (pages: number[]) => {
+    for (const page of await Promise.all(pages.map(loadInstitutionPage))) {
+      page.forEach(record => records.set(record.id, record));
+    }
+  };
+  const likely = [...new Set(hits.map(hit => Math.floor(hit.doc / manifest.pageSize)))];
+  await loadPages(likely);
+  if (hits.some(hit => !records.has(hit.id))) {
+    await loadPages(manifest.pages.map((_, page) => page).filter(page => !likely.includes(page)));
+  }
+  return records;
+};
+
+const applyJsonPatch = (document: any, ops: JsonPatchOperation[]): any => {
+  for (const { op, path, value } of ops) {
+    const tokens = path.split('/').slice(1).map(token => token.replace(/~1/g, '/').replace(/~0/g, '~'));
+    if (tokens.length === 0) {
+      document = value;
+      continue;
+    }
+    const last = tokens.pop()!;
+    const parent = tokens.reduce((node, token) => node[Array.isArray(node) ? Number(token) : token], document);
+    if (Array.isArray(parent)) {
+      const index = last === '-' ? parent.length : Number(last);
+      if (op === 'add') parent.splice(index, 0, value);
+      else if (op === 'remove') parent.splice(index, 1);
+      else parent[index] = value;
+    } else if (op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = value;
+    }
+  }
+  return document;
+};
+
+const readPublishedCache = (): { version: string; records: any[] } | null => {
+  try {
+    return JSON.parse(localStorage.getItem(PUBLISHED_CACHE_KEY) ?? 'null');
+  } catch {
+    return null;
+  }
+};
+
+const writePublishedCache = (version: string, records: any[]) => {
+  try {
+    localStorage.setItem(PUBLISHED_CACHE_KEY, JSON.stringify({ version, records }));
+  } catch (error) {
+    // Over quota or storage disabled: the next visit loads the pages again
+    console.warn('Could not cache institutions data:', error);
+  }
+};
+
+/**
+ * Bring a cached copy up to the manifest's version by applying the patch chain,
+ * or return null when the copy is too old for the patches the manifest keeps
+ */
+const patchCachedRecords = async (manifest: PublishedManifest): Promise<any[] | null> => {
+  const cached = readPublishedCache();
+  if (!cached) return null;
+  if (cached.version === manifest.dataVersion) return cached.records;
+
+  const start = (manifest.patches ?? []).findIndex(patch => patch.from === cached.version);
+  if (start < 0) return null;
+  const chain = manifest.patches.slice(start);
+  const patches: JsonPatchOperation[][] = await Promise.all(
+    chain.map(patch => fetch(`${PUBLISHED_DATA_URL}/${patch.file}`).then(response => response.json()))
+  );
+  const records = patches.reduce((document, ops) => applyJsonPatch(document, ops), cached.records);
+  return records.length === manifest.count ? records : null;
+};
+
 // Function to load data
 const loadInstitutionData = async () => {
   try {
-    const response = await fetch('/data/processed_institutions.json');
-    extractedInstitutionsData = await response.json();
+    const manifest = await loadPublishedManifest();
+    if (manifest) {
+      let records = await patchCachedRecords(manifest).catch(() => null);
+      if (!records) {
+        const pages = await Promise.all(manifest.pages.map((_, page) => loadInstitutionPage(page)));
+        records = pages.flat();
+      }
+      extractedInstitutionsData = records;
+      writePublishedCache(manifest.dataVersion, records);
+    } else {
+      const response = await fetch('/data/processed_institutions.json');
+      extractedInstitutionsData = await response.json();
+    }
   } catch (error) {
     console.error('Error loading extracted institutions data:', error);
     extractedInstitutionsData = [];
   }
 };
 
+// Prebuilt search index written by create_institution_data.py (see search_index.py).
+// Posting lists are sharded by token prefix so a query only fetches the few
+// shards its words start with, instead of the full institution data.
+const SEARCH_INDEX_URL = '/data/search';
+
+interface SearchIndexManifest {
+  version: number;
+  count: number;
+  prefixLength: number;
+  fields: string[];
+  shards: string[];
+}
+
+// token -> [all documents, documents matching by name], both delta encoded
+type SearchShard = Record<string, [number[], number[]]>;
+
+export interface InstitutionSummary {
+  id: string;
+  companyName: string;
+  website?: string | null;
+}
+
+const tokenize = (text: string): string[] =>
+  text.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase().match(/[a-z0-9]+/g) ?? [];
+
+const deltaDecode = (gaps: number[]): number[] => {
+  let doc = 0;
+  return gaps.map(gap => (doc += gap));
+};
+
+class InstitutionSearchIndex {
+  private manifest: SearchIndexManifest | null = null;
+  private summaries: InstitutionSummary[] = [];
+  private shards = new Map<string, Promise<SearchShard>>();
+  private matches = new Map<string, Promise<[Set<number>, Set<number>]>>();
+  private loading: Promise<void> | null = null;
+
+  load(): Promise<void> {
+    if (!this.loading) {
+      this.loading = (async () => {
+        const [manifest, summaries] = await Promise.all([
+          fetch(`${SEARCH_INDEX_URL}/manifest.json`).then(response => response.json()),
+          fetch(`${SEARCH_INDEX_URL}/summaries.json`).then(response => response.json())
+        ]);
+        this.manifest = manifest;
+        this.summaries = summaries.rows.map((row: unknown[]) =>
+          Object.fromEntries(summaries.fields.map((field: string, i: number) => [field, row[i]]))
+        );
+      })();
+    }
+    return this.loading;
+  }
+
+  private shard(key: string): Promise<SearchShard> {
+    if (!this.shards.has(key)) {
+      this.shards.set(key, fetch(`${SEARCH_INDEX_URL}/shards/${key}.json`)
+        .then(response => (response.ok ? response.json() : {}))
+        .catch(() => ({})));
+    }
+    return this.shards.get(key)!;
+  }
+
+  private prefixPostings(prefix: string): Promise<[Set<number>, Set<number>]> {
+    if (!this.matches.has(prefix)) {
+      const prefixLength = this.manifest!.prefixLength;
+      const keys = prefix.length >= prefixLength
+        ? [prefix.slice(0, prefixLength)]
+        : this.manifest!.shards.filter(key => key.startsWith(prefix));
+
+      this.matches.set(prefix, Promise.all(keys.map(key => this.shard(key))).then(shards => {
+        const docs = new Set<number>();
+        const names = new Set<number>();
+        for (const shard of shards) {
+          for (const [token, [gaps, nameGaps]] of Object.entries(shard)) {
+            if (token.startsWith(prefix)) {
+              deltaDecode(gaps).forEach(doc => docs.add(doc));
+              deltaDecode(nameGaps).forEach(doc => names.add(doc));
+            }
+          }
+        }
+        return [docs, names] as [Set<number>, Set<number>];
+      }));
+    }
+    return this.matches.get(prefix)!;
+  }
+
+  /**
+   * Institutions where every query word prefixes an indexed word; name matches first
+   */
+  async search(query: string): Promise<InstitutionSummary[]> {
+    return (await this.searchDocs(query)).map(doc => this.summaries[doc]);
+  }
+
+  /**
+   * Search hits with their position in the index
+   */
+  async searchHits(query: string): Promise<{ doc: number; id: string }[]> {
+    return (await this.searchDocs(query)).map(doc => ({ doc, id: this.summaries[doc].id }));
+  }
+
+  private async searchDocs(query: string): Promise<number[]> {
+    await this.load();
+    const tokens = [...new Set(tokenize(query))];
+    if (tokens.length === 0) return [];
+
+    const postings = await Promise.all(tokens.map(token => this.prefixPostings(token)));
+    const [docs, names] = postings.reduce(([docsA, namesA], [docsB, namesB]) => [
+      new Set([...docsA].filter(doc => docsB.has(doc))),
+      new Set([...namesA].filter(doc => namesB.has(doc)))
+    ]);
+
+    return [...docs].sort((a, b) => Number(!names.has(a)) - Number(!names.has(b)) || a - b);
+  }
+}
+
+const searchIndex = new InstitutionSearchIndex();
+
 export interface ExtractedInstitution {
   id: string;
   companyName: string;
@@ -63,17 +377,44 @@ export class ExtractedInstitutionService {
     );
   }
 
+  /**
+   * Search the prebuilt index without downloading the full institution data
+   */
+  static async searchSummaries(query: string): Promise<InstitutionSummary[]> {
+    return searchIndex.search(query);
+  }
+
   /**
    * Search institutions by name or description
+   *
+   * Only the index shards for the query and the published pages holding the
+   * hits are downloaded, unless the full data is already loaded.
    */
   static async searchInstitutions(query: string): Promise<ExtractedInstitution[]> {
-    await this.initialize();
-    const lowercaseQuery = query.toLowerCase();
-    return this.institutions.filter(inst => 
-      inst.companyName.toLowerCase().includes(lowercaseQuery) ||
-      inst.description.toLowerCase().includes(lowercaseQuery) ||
-      inst.shortDescription.toLowerCase().includes(lowercaseQuery)
-    );
+    try {
+      const hits = await searchIndex.searchHits(query);
+      let byId: Map<string, any> | null = this.dataLoaded
+        ? new Map(this.institutions.map(inst => [inst.id, inst]))
+        : await loadPublishedRecords(hits);
+      if (!byId) {
+        // Only the legacy single file is deployed
+        await this.initialize();
+        byId = new Map(this.institutions.map(inst => [inst.id, inst]));
+      }
+      return hits
+        .map(hit => byId!.get(hit.id))
+        .filter((inst): inst is ExtractedInstitution => inst !== undefined);
+    } catch (error) {
+      // Fall back to scanning the loaded data if the index is unavailable
+      console.error('Error searching institution index:', error);
+      await this.initialize();
+      const lowercaseQuery = query.toLowerCase();
+      return this.institutions.filter(inst => 
+        inst.companyName.toLowerCase().includes(lowercaseQuery) ||
+        inst.description.toLowerCase().includes(lowercaseQuery) ||
+        inst.shortDescription.toLowerCase().includes(lowercaseQuery)
+      );
+    }
   }
 
   /**
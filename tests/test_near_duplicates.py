@@ -0,0 +1,38 @@
+from link_jobs import InstitutionLinker
+from near_duplicates import NearDuplicateIndex, merge_key, normalize_institution_name, tokens_compatible
+
+
+def add_all(names):
+    index = NearDuplicateIndex()
+    return [index.add(name) for name in names]
+
+
+def test_generic_suffixes_alone_do_not_merge_organizations():
+    assert normalize_institution_name("CARE India") == normalize_institution_name("Care Foundation") == 'care'
+    assert add_all(["CARE India", "Care Foundation", "Health Foundation", "Health Society India"]) == [0, 1, 2, 3]
+    assert add_all(["Tata Trust", "Tata Institute"]) == [0, 1]
+
+
+def test_short_keys_still_merge_on_the_full_name():
+    assert merge_key("UNICEF") == merge_key("UNICEF India") == 'unicef'
+    assert add_all(["UNICEF", "UNICEF India", "Smile Foundation", "The Smile Foundation India"]) == [0, 0, 2, 2]
+
+
+def test_longer_names_merge_across_suffixes_and_typos():
+    assert add_all(["Public Health Foundation of India", "The Public Health Foundation of India",
+                    "Piramal Swasthya Foundation", "Piramal Swasthya",
+                    "Aravind Eye Care System", "Aravind Eye Care Systems"]) == [0, 0, 2, 2, 4, 4]
+
+
+def test_tokens_compatible_rejects_single_token_keys():
+    assert not tokens_compatible('care', 'care')
+    assert not tokens_compatible('tata', 'tata institute')
+    assert tokens_compatible('piramal swasthya', 'piramal swasthya foundation')
+
+
+def test_linker_keeps_single_token_employers_apart():
+    linker = InstitutionLinker(["Care Foundation", "UNICEF India", "Tata Institute of Social Sciences"])
+    assert linker.match("CARE India") is None
+    assert linker.match("Care Foundation") == 0
+    assert linker.match("UNICEF") == 1
+    assert linker.match("Tata Trust") is None
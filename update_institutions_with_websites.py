@@ -6,25 +6,31 @@ Script to update institutions with website URLs based on search results
 import json
 import re
 
-# Load the existing processed institutions data
-with open('processed_institutions_with_queries.json', 'r') as f:
-    institutions = json.load(f)
+from instrumentation import METRICS, configure_logging, get_logger
+from website_registry import WebsiteRegistry
 
-print(f"Loaded {len(institutions)} institutions to process")
+logger = get_logger(__name__)
 
-# Known websites from search results
-known_websites = {
-    "Sulabh International": "https://www.sulabhinternational.org/",
-    "Gram Vikas": "https://www.gramvikas.org/",
-    "Arogya World": "https://arogyaworld.org/",
-    "Goonj": "https://goonj.org/",
-    "Smile Foundation": "https://www.smilefoundationindia.org/",
-    "Seva Foundation India": "https://sevaind.org/",
-    "HelpAge India": "https://www.helpageindia.org/",
-    "CBM India Trust": "https://cbmindia.org/",
-    "George Institute for Global Health – India": "https://www.georgeinstitute.org/",
-    "Healis Sekhsaria Institute": "https://www.healis.org/"
-}
+INPUT_FILE = 'processed_institutions_with_queries.json'
+
+_institutions = None
+_registry = None
+
+def load_institutions():
+    """Load the processed institutions once per process, on first use"""
+    global _institutions
+    if _institutions is None:
+        with open(INPUT_FILE, 'r') as f:
+            _institutions = json.load(f)
+        print(f"Loaded {len(_institutions)} institutions to process")
+    return _institutions
+
+def get_registry():
+    """Load the website registry once per process"""
+    global _registry
+    if _registry is None:
+        _registry = WebsiteRegistry.load()
+    return _registry
 
 def extract_domain_from_url(url):
     """Extract clean domain from URL"""
@@ -37,27 +43,47 @@ def extract_domain_from_url(url):
     domain = domain.split('/')[0]
     return domain
 
-def update_institutions_with_websites():
+def apply_known_website(institution):
+    """Set website fields on one institution; returns True if a known website was applied"""
+    company_name = institution['companyName']
+    
+    # Check if the registry knows this institution, by name, alias or fuzzy match
+    entry = get_registry().lookup(company_name)
+    if entry:
+        institution['website'] = entry['website']
+        institution['website_domain'] = extract_domain_from_url(entry['website'])
+        logger.debug("Updated: %s -> %s", company_name, entry['website'])
+        METRICS.count('registry_hits')
+        return True
+    elif institution.get('website'):
+        # Keep websites resolved by an earlier stage
+        institution['website_domain'] = extract_domain_from_url(institution['website'])
+    else:
+        # Set to None for institutions without known websites
+        institution['website'] = None
+        institution['website_domain'] = None
+    return False
+
+def iter_updated_institutions(records):
+    """Yield institutions with known website URLs applied, one at a time"""
+    for institution in records:
+        apply_known_website(institution)
+        yield institution
+
+def update_institutions_with_websites(records=None):
     """Update institutions with known website URLs"""
+    if records is None:
+        records = load_institutions()
     updated_count = 0
     
-    for institution in institutions:
-        company_name = institution['companyName']
-        
-        # Check if we have a known website for this institution
-        if company_name in known_websites:
-            institution['website'] = known_websites[company_name]
-            institution['website_domain'] = extract_domain_from_url(known_websites[company_name])
+    for institution in records:
+        if apply_known_website(institution):
             updated_count += 1
-            print(f"Updated: {company_name} -> {known_websites[company_name]}")
-        else:
-            # Set to None for institutions without known websites
-            institution['website'] = None
-            institution['website_domain'] = None
     
-    return institutions, updated_count
+    return records, updated_count
 
 def main():
+    configure_logging()
     print("Updating institutions with known website URLs...")
     
     # Update institutions
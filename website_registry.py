@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Persistent website registry with fuzzy name lookup, and batch URL scoring for search results
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from instrumentation import timed
+from near_duplicates import GENERIC_TOKENS, NearDuplicateIndex, normalize_institution_name
+
+REGISTRY_FILE = "website_registry.json"
+ORGANIZATIONS_FILE = "public/data/organizations.json"
+
+# Known websites from search results
+KNOWN_WEBSITES = {
+    "Sulabh International": "https://www.sulabhinternational.org/",
+    "Gram Vikas": "https://www.gramvikas.org/",
+    "Arogya World": "https://arogyaworld.org/",
+    "Goonj": "https://goonj.org/",
+    "Smile Foundation": "https://www.smilefoundationindia.org/",
+    "Seva Foundation India": "https://sevaind.org/",
+    "HelpAge India": "https://www.helpageindia.org/",
+    "CBM India Trust": "https://cbmindia.org/",
+    "George Institute for Global Health – India": "https://www.georgeinstitute.org/",
+    "Healis Sekhsaria Institute": "https://www.healis.org/"
+}
+
+# Multi-label public suffixes seen in Indian and international institution domains
+PUBLIC_SUFFIXES = {
+    'gov.in', 'nic.in', 'ac.in', 'edu.in', 'res.in', 'org.in', 'co.in', 'net.in', 'ernet.in',
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'com.au', 'org.au'
+}
+
+# Higher ranks are more likely to be an institution's own site; unlisted suffixes are rejected
+SUFFIX_RANK = {
+    'gov.in': 6, 'nic.in': 6, 'ac.in': 5, 'edu.in': 5, 'res.in': 5, 'edu': 5,
+    'org': 4, 'org.in': 4, 'int': 4, 'in': 3, 'ngo': 3, 'com': 2, 'co.in': 2
+}
+
+SKIP_DOMAINS = {
+    'linkedin.com', 'facebook.com', 'twitter.com', 'x.com', 'instagram.com', 'youtube.com',
+    'indeed.com', 'glassdoor.com', 'glassdoor.co.in', 'naukri.com', 'wikipedia.org',
+    'icims.com', 'myworkdayjobs.com', 'greenhouse.io', 'lever.co', 'smartrecruiters.com', 'taleo.net'
+}
+
+# Subdomains that point at a careers portal rather than the main site
+PORTAL_SUBDOMAINS = {'www', 'www2', 'careers', 'career', 'jobs', 'job', 'recruitment'}
+
+OFFICIAL_INDICATORS = ('official', 'homepage', 'main', 'about us', 'contact us')
+
+PARENTHETICAL_PATTERN = re.compile(r'\(([^)]*)\)')
+
+
+@lru_cache(maxsize=65536)
+def split_host(host: str) -> Tuple[str, str]:
+    """Split a host into (registrable domain, public suffix)"""
+    labels = host.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in PUBLIC_SUFFIXES:
+        return '.'.join(labels[-3:]), '.'.join(labels[-2:])
+    return '.'.join(labels[-2:]), labels[-1]
+
+
+@lru_cache(maxsize=65536)
+def parse_candidate(url: str) -> Optional[Tuple[str, str, str, int]]:
+    """Parse a URL into (scheme, site host, registrable domain, suffix rank), or None to reject"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or '.' not in host:
+        return None
+
+    domain, suffix = split_host(host)
+    if domain in SKIP_DOMAINS or suffix not in SUFFIX_RANK:
+        return None
+
+    labels = host.split('.')
+    while len(labels) > len(domain.split('.')) and labels[0] in PORTAL_SUBDOMAINS:
+        labels.pop(0)
+    return parts.scheme, '.'.join(labels), domain, SUFFIX_RANK[suffix]
+
+
+def site_root(url: str) -> Optional[str]:
+    """Reduce a URL to the root of the site it belongs to"""
+    candidate = parse_candidate(url)
+    if candidate is None:
+        return None
+    return f"{candidate[0]}://{candidate[1]}"
+
+
+@timed('score_urls')
+def best_website(search_results: List[Dict]) -> Optional[str]:
+    """Pick the most likely official website from search results
+
+    Among the top 5 results, those whose title or description reads like an
+    official page win; otherwise the top 3 are considered. Ties are broken by
+    suffix rank (.gov.in over .org over .com) and then by result position.
+    """
+    if not search_results:
+        return None
+
+    best, best_score = None, None
+    for position, result in enumerate(search_results[:5]):
+        candidate = parse_candidate(result.get('url', ''))
+        if candidate is None:
+            continue
+
+        text = f"{result.get('title', '')} {result.get('description', '')}".lower()
+        official = any(indicator in text for indicator in OFFICIAL_INDICATORS)
+        if not official and position >= 3:
+            continue
+
+        score = (official, candidate[3], -position)
+        if best_score is None or score > best_score:
+            best, best_score = candidate, score
+
+    if best is None:
+        return None
+    return f"{best[0]}://{best[1]}"
+
+
+def best_websites(result_lists: Iterable[List[Dict]]) -> List[Optional[str]]:
+    """Score many search result lists; URL parsing is shared across the batch"""
+    return [best_website(results) for results in result_lists]
+
+
+def name_variants(name: str) -> List[str]:
+    """The name without parenthetical parts, and each side of a ' / ' pair"""
+    without_parentheses = ' '.join(PARENTHETICAL_PATTERN.sub(' ', name).split())
+    variants = [without_parentheses] + [part.strip() for part in without_parentheses.split(' / ')]
+    return [variant for variant in dict.fromkeys(variants) if variant and variant != name]
+
+
+def extract_aliases(name: str) -> List[str]:
+    """Registry aliases: parenthetical acronyms, name variants, and the part before a ' – '"""
+    aliases = [alias.strip() for alias in PARENTHETICAL_PATTERN.findall(name)]
+    aliases.extend(name_variants(name))
+    aliases.append(re.split(r'\s+[–-]\s+', aliases[-1] if aliases else name)[0])
+    return [alias for alias in dict.fromkeys(aliases)
+            if alias != name and normalize_institution_name(alias) not in GENERIC_TOKENS | {''}]
+
+
+class WebsiteRegistry:
+    """Website registry indexed by normalized name, alias and domain"""
+
+    def __init__(self, entries: Optional[List[Dict]] = None):
+        self.entries: List[Dict] = []
+        self.by_key: Dict[str, int] = {}
+        self.by_alias: Dict[str, Optional[int]] = {}
+        self.by_domain: Dict[str, int] = {}
+        self.fuzzy = NearDuplicateIndex()
+        self.fuzzy_entries: Dict[int, int] = {}
+        for entry in entries or []:
+            self.add(entry['name'], entry['website'], entry.get('aliases'), entry.get('source', 'manual'))
+
+    def add(self, name: str, website: str, aliases: Optional[List[str]] = None,
+            source: str = 'manual') -> bool:
+        """Add an entry; earlier entries win when names or aliases collide"""
+        key = normalize_institution_name(name)
+        if not key or key in self.by_key:
+            return False
+
+        candidate = parse_candidate(website)
+        idx = len(self.entries)
+        if aliases is None:
+            aliases = extract_aliases(name)
+        self.entries.append({
+            'name': name,
+            'website': website,
+            'domain': candidate[2] if candidate else None,
+            'aliases': aliases,
+            'source': source
+        })
+
+        self.by_key[key] = idx
+        for alias in aliases:
+            # An alias claimed by two entries (e.g. "CHAI") identifies neither
+            alias_key = normalize_institution_name(alias)
+            if self.by_alias.setdefault(alias_key, idx) != idx:
+                self.by_alias[alias_key] = None
+        if candidate:
+            self.by_domain.setdefault(candidate[2], idx)
+        self.fuzzy_entries.setdefault(self.fuzzy.add(name), idx)
+        return True
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """Find an entry by exact normalized name, alias, or fuzzy match"""
+        # Queries only use their full variants: a query's acronym or the parent
+        # body before a dash ("AIIMS Patna – Community Medicine") is too broad
+        for variant in [name] + name_variants(name):
+            key = normalize_institution_name(variant)
+            idx = self.by_key.get(key)
+            if idx is None:
+                idx = self.by_alias.get(key)
+            if idx is not None:
+                return self.entries[idx]
+
+        match = self.fuzzy.match(name)
+        return None if match is None else self.entries[self.fuzzy_entries[match]]
+
+    def lookup_domain(self, url_or_domain: str) -> Optional[Dict]:
+        """Find an entry by the registrable domain of a URL or host"""
+        host = urlsplit(url_or_domain).hostname or url_or_domain
+        idx = self.by_domain.get(split_host(host.lower())[0])
+        return None if idx is None else self.entries[idx]
+
+    def save(self, path: str = REGISTRY_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str = REGISTRY_FILE) -> 'WebsiteRegistry':
+        """Load the registry, building it from the known sources if it does not exist"""
+        if not Path(path).exists():
+            registry = build_registry()
+            registry.save(path)
+            return registry
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def build_registry(organizations_file: str = ORGANIZATIONS_FILE) -> WebsiteRegistry:
+    """Build the registry from manually verified websites and organization careers URLs"""
+    registry = WebsiteRegistry()
+    for name, website in KNOWN_WEBSITES.items():
+        registry.add(name, website, source='manual')
+
+    try:
+        with open(organizations_file, 'r', encoding='utf-8') as f:
+            organizations = json.load(f)
+    except FileNotFoundError:
+        organizations = []
+
+    # Careers portals usually live on the organization's own domain
+    for org in organizations:
+        website = site_root(org.get('careersUrl') or '')
+        if website:
+            registry.add(org['name'], website + '/', source='careers_url')
+    return registry
+
+
+def main():
+    registry = build_registry()
+    registry.save()
+    print(f"Saved {len(registry)} websites to {REGISTRY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Search backends, rate limiting and retries for resolving institution websites
+"""
+
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+
+from instrumentation import METRICS
+
+
+class TransientSearchError(Exception):
+    """Raised by a search backend for failures that are worth retrying"""
+
+
+# Errors that trigger a retry; anything else fails the institution immediately
+RETRYABLE_ERRORS = (TransientSearchError, ConnectionError, asyncio.TimeoutError)
+
+
+class SearchBackend:
+    """Base class for pluggable search backends"""
+
+    # Most queries one remote call can answer; backends with a batch API raise it
+    max_batch = 1
+
+    async def search(self, query: str) -> List[Dict]:
+        """Return a list of {'url', 'title', 'description'} results for a query"""
+        raise NotImplementedError
+
+    async def search_many(self, queries: List[str]) -> List[List[Dict]]:
+        """Results for up to max_batch queries, in order, from one remote call"""
+        return [await self.search(query) for query in queries]
+
+    def cached(self, query: str) -> Optional[List[Dict]]:
+        """Return locally cached results without a remote call, or None"""
+        return None
+
+    async def close(self) -> None:
+        """Release any resources held by the backend"""
+
+
+class StubSearchBackend(SearchBackend):
+    """Local backend serving canned results, for tests and offline runs"""
+
+    def __init__(self, results: Optional[Dict[str, List[Dict]]] = None,
+                 latency: float = 0.0, failures: Optional[Dict[str, int]] = None,
+                 max_batch: int = 20):
+        self.results = results or {}
+        self.latency = latency
+        # Number of times each query should fail before succeeding
+        self.failures = dict(failures or {})
+        self.max_batch = max_batch
+        self.calls = 0
+
+    async def search(self, query: str) -> List[Dict]:
+        return (await self.search_many([query]))[0]
+
+    async def search_many(self, queries: List[str]) -> List[List[Dict]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for query in queries:
+            if self.failures.get(query, 0) > 0:
+                self.failures[query] -= 1
+                raise TransientSearchError(f"Simulated failure for '{query}'")
+        return [list(self.results.get(query, [])) for query in queries]
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all resolver workers"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def search_batch_with_retry(backend: SearchBackend, queries: List[str], bucket: TokenBucket,
+                                  retries: int = 3, base_delay: float = 0.5,
+                                  max_delay: float = 10.0) -> List[List[Dict]]:
+    """Results for a batch of queries: cached ones locally, the rest in one rate-limited, retried call"""
+    results: List[Optional[List[Dict]]] = [backend.cached(query) for query in queries]
+    remote = [i for i, cached in enumerate(results) if cached is None]
+    if not remote:
+        return results  # type: ignore[return-value]
+
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            answers = await backend.search_many([queries[i] for i in remote])
+            break
+        except RETRYABLE_ERRORS:
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+            attempt += 1
+
+    METRICS.count('search_calls')
+    METRICS.count('remote_queries', len(remote))
+    for i, answer in zip(remote, answers):
+        results[i] = answer
+    return results  # type: ignore[return-value]